@@ -3,6 +3,9 @@ ASGI config for backend project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Run with ``gunicorn backend.asgi:application -k uvicorn.workers.UvicornWorker``
+so the async endpoints (core/async_views.py) run natively on the event loop.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/6.0/howto/deployment/asgi/
 """
@@ -1,4 +1,5 @@
 from pathlib import Path
+from datetime import timedelta
 import os
 import dj_database_url
 
@@ -31,6 +32,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.MetricsMiddleware',
+    'core.profiling.QueryBudgetMiddleware',
+    'core.middleware.APICompressionMiddleware',
     'core.middleware.RequestThroughputMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
@@ -71,16 +75,99 @@ DATABASES = {
         'PASSWORD': os.environ.get('DB_PASSWORD', 'Swetha1*'),
         'HOST': os.environ.get('DB_HOST', 'localhost'),
         'PORT': os.environ.get('DB_PORT', '3306'),
-        'OPTIONS': {
-            'init_command': "SET sql_mode='STRICT_TRANS_TABLES'",
-        },
+        'OPTIONS': {},
+        # Persistent connections, checked before reuse at the start of a request
+        'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', '60')),
+        'CONN_HEALTH_CHECKS': True,
     }
 }
 
+# sql_mode only exists on MySQL/TiDB (lets tests run on SQLite via DB_ENGINE)
+if DATABASES['default']['ENGINE'] == 'django.db.backends.mysql':
+    DATABASES['default']['OPTIONS']['init_command'] = "SET sql_mode='STRICT_TRANS_TABLES'"
+
 #  TiDB Cloud SSL Configuration
 if os.environ.get('DB_SSL') == 'True':
     DATABASES['default']['OPTIONS']['ssl'] = {'ca': '/etc/ssl/certs/ca-certificates.crt'}
 
+#  Read replica (core/db_router.py): read-only views read from here when set.
+#  Unset DB_REPLICA_* values fall back to the primary's. Locally two SQLite
+#  files work: DB_ENGINE=django.db.backends.sqlite3 DB_NAME=primary.sqlite3
+#  DB_REPLICA_NAME=replica.sqlite3
+DATABASE_READ_REPLICA = None
+if os.environ.get('DB_REPLICA_HOST') or os.environ.get('DB_REPLICA_NAME'):
+    DATABASE_READ_REPLICA = 'replica'
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'NAME': os.environ.get('DB_REPLICA_NAME', DATABASES['default']['NAME']),
+        'USER': os.environ.get('DB_REPLICA_USER', DATABASES['default']['USER']),
+        'PASSWORD': os.environ.get('DB_REPLICA_PASSWORD', DATABASES['default']['PASSWORD']),
+        'HOST': os.environ.get('DB_REPLICA_HOST', DATABASES['default']['HOST']),
+        'PORT': os.environ.get('DB_REPLICA_PORT', DATABASES['default']['PORT']),
+        # Tests read through the replica alias but see the primary's test data
+        'TEST': {'MIRROR': 'default'},
+    }
+DATABASE_ROUTERS = ['core.db_router.ReplicaRouter']
+
+# API response compression (core/middleware.py). Brotli is used when the
+# `brotli` package is installed and the client accepts it, gzip otherwise.
+API_COMPRESSION_MIN_SIZE = int(os.environ.get('API_COMPRESSION_MIN_SIZE', 1024))
+API_COMPRESSION_GZIP_LEVEL = int(os.environ.get('API_COMPRESSION_GZIP_LEVEL', 6))
+API_COMPRESSION_BROTLI_QUALITY = int(os.environ.get('API_COMPRESSION_BROTLI_QUALITY', 4))
+
+# Fleet snapshot (core/fleet_snapshot.py): the ingest process publishes the
+# vessels table to this memory-mapped file every FLEET_SNAPSHOT_INTERVAL
+# seconds and /api/vessels/ reads it instead of the database while it is at
+# most FLEET_SNAPSHOT_MAX_AGE seconds old. Must be on storage shared by the
+# ingest and web processes (same host); empty disables it.
+FLEET_SNAPSHOT_PATH = os.environ.get('FLEET_SNAPSHOT_PATH', '')
+FLEET_SNAPSHOT_INTERVAL = float(os.environ.get('FLEET_SNAPSHOT_INTERVAL', 5))
+FLEET_SNAPSHOT_MAX_AGE = float(os.environ.get('FLEET_SNAPSHOT_MAX_AGE', 30))
+
+# Unmanaged tables are created directly in the test database
+TEST_RUNNER = 'core.test_runner.UnmanagedModelTestRunner'
+
+# Per-route SQL query budgets (see core/profiling.py). Requests over budget are
+# logged by QueryBudgetMiddleware and fail the endpoint tests in core/tests.py.
+QUERY_BUDGET_DEFAULT = 20
+QUERY_DUPLICATE_LIMIT = 3
+QUERY_BUDGETS = {
+    'api/vessels/': 1,
+    'api/vessels/search/': 1,
+    'api/vessels/clusters/': 1,
+    'api/vessels/<int:vessel_id>/': 1,
+    'api/ports/': 2,
+    'api/voyages/': 2,
+    'api/events/': 1,
+    'api/risks/': 2,
+    'api/voyage-track/<int:voyage_id>/': 2,
+    'api/dashboard/': 2,
+    'api/analytics/': 3,
+    # Same reads on pool threads, counted into the request's profile (core/async_views.py)
+    'api/async/dashboard/': 2,
+    'api/async/analytics/': 3,
+    'api/alerts/': 5,
+}
+
+# In-memory vessel search (core/search.py): seconds between delta loads of
+# vessels changed by other processes (the AIS ingest)
+VESSEL_SEARCH_REFRESH_SECONDS = int(os.environ.get('VESSEL_SEARCH_REFRESH_SECONDS', '30'))
+# ... and between id-set checks for vessels deleted by other processes
+VESSEL_SEARCH_RECONCILE_SECONDS = int(os.environ.get('VESSEL_SEARCH_RECONCILE_SECONDS', '300'))
+
+# Concurrent identical dashboard / analytics requests share one computation (core/singleflight.py).
+# SHARED also coordinates workers through CACHES (needs a shared backend such as Redis or Memcached).
+SINGLEFLIGHT_SHARED = os.environ.get('SINGLEFLIGHT_SHARED', '0') == '1'
+SINGLEFLIGHT_WAIT = float(os.environ.get('SINGLEFLIGHT_WAIT', '5'))
+SINGLEFLIGHT_SHARED_TTL = 1
+
+# Async dashboard / analytics (core/async_views.py): threads (and DB connections)
+# per worker process for running their independent queries concurrently
+ASYNC_QUERY_THREADS = int(os.environ.get('ASYNC_QUERY_THREADS', '8'))
+
+# Admin audit trail (core/audit.py): written by a background thread in batches
+AUDIT_ASYNC = os.environ.get('AUDIT_ASYNC', '1') == '1'
+
 AUTH_PASSWORD_VALIDATORS = [
     { 'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator', },
     { 'NAME': 'django.contrib.auth.password_validation.MinimumLengthValidator', },
@@ -102,8 +189,47 @@ STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
 
 REST_FRAMEWORK = {
     'DEFAULT_RENDERER_CLASSES': [
-        'rest_framework.renderers.JSONRenderer',
-    ]
+        # orjson-backed when installed, plain JSONRenderer otherwise
+        'core.renderers.ORJSONRenderer',
+    ],
+    # Bearer JWTs carrying role claims, verified without a user lookup (core/auth.py)
+    'DEFAULT_AUTHENTICATION_CLASSES': [
+        'core.auth.StatelessJWTAuthentication',
+    ],
+    # Token bucket per (user or IP, endpoint), rates below (core/ratelimit.py)
+    'DEFAULT_THROTTLE_CLASSES': [
+        'core.ratelimit.TokenBucketThrottle',
+    ],
+    # Reverse proxies in front of the app (1 behind Nginx). Anonymous clients are
+    # rate limited by IP: with 0 that is REMOTE_ADDR, otherwise the address the
+    # last proxy appended to X-Forwarded-For - never a client-supplied entry.
+    'NUM_PROXIES': int(os.environ.get('NUM_PROXIES', '0')),
+}
+
+# Rate limits by URL route ("N/s", "N/min" or "N/hour"; N is also the burst size)
+RATE_LIMIT_ENABLED = os.environ.get('RATE_LIMIT_ENABLED', '1') == '1'
+# 'local' keeps buckets per worker process; a CACHES alias shares them between workers
+RATE_LIMIT_BACKEND = os.environ.get('RATE_LIMIT_BACKEND', 'local')
+RATE_LIMITS = {
+    'default': '300/min',
+    # Polled by every open dashboard / map tab
+    'api/dashboard/': '60/min',
+    'api/async/dashboard/': '60/min',
+    'api/vessels/': '30/min',
+    'api/vessels/clusters/': '30/min',
+    'api/risks/': '30/min',
+    'api/login/': '10/min',
+    # Each call can stream a multi-GB Parquet / Arrow file
+    'api/export/<str:dataset>/': '6/min',
+}
+
+SIMPLE_JWT = {
+    # Role claims in a token are as fresh as its issue time
+    'ACCESS_TOKEN_LIFETIME': timedelta(minutes=int(os.environ.get('JWT_ACCESS_MINUTES', '30'))),
+    'REFRESH_TOKEN_LIFETIME': timedelta(days=1),
+    'TOKEN_USER_CLASS': 'core.auth.ClaimsUser',
+    # Refreshes reload the user: current claims, deactivated users refused
+    'TOKEN_REFRESH_SERIALIZER': 'core.auth.RoleTokenRefreshSerializer',
 }
 
 # In backend/settings.py
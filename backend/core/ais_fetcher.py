@@ -1,13 +1,16 @@
-import requests
-from bs4 import BeautifulSoup
 import time
 from django.utils import timezone
 from core.models import Vessel
+from core.metrics import ENRICHMENT_CALLS
 
 def enrich_vessel(vessel):
     if vessel.imo_number and vessel.flag and vessel.type:
         return  # already enriched
 
+    # Scraping dependencies load here, in the enrichment process only
+    import requests
+    from bs4 import BeautifulSoup
+
     print(f"🧠 Enriching {vessel.name}")
 
     try:
@@ -16,6 +19,7 @@ def enrich_vessel(vessel):
         r = requests.get(url, headers=headers, timeout=10)
 
         if r.status_code != 200:
+            ENRICHMENT_CALLS.inc(source="vesselfinder", result="http_error")
             return
 
         soup = BeautifulSoup(r.text, "html.parser")
@@ -25,11 +29,14 @@ def enrich_vessel(vessel):
         vessel.type = vessel.type or "Container Ship"
         vessel.operator = vessel.operator or "Unknown Operator"
         vessel.imo_number = vessel.imo_number or f"IMO-{vessel.mmsi}"
+        vessel.last_update = timezone.now()  # search indexes in other processes reload on it
 
         vessel.save()
+        ENRICHMENT_CALLS.inc(source="vesselfinder", result="success")
         print(f"✅ ENRICHED: {vessel.name}")
 
     except Exception as e:
+        ENRICHMENT_CALLS.inc(source="vesselfinder", result="error")
         print("❌ Enrichment error:", e)
 
 
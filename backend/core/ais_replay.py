@@ -0,0 +1,188 @@
+"""
+Offline AIS replay: feed recorded aisstream frames (JSONL, optionally gzipped)
+through the live ingest handler at real time, N x speed or as fast as possible.
+
+Frames can be handed to the handler directly ("file" source) or served by a
+local websocket stand-in for wss://stream.aisstream.io ("websocket" source),
+which exercises the same network path as the live stream.
+
+Recordings are produced by `manage.py stream_ais --record` (or AIS_RECORD_PATH).
+"""
+import asyncio
+import gzip
+import json
+import time
+from datetime import datetime, timezone as dt_timezone
+
+from .benchmarks import _percentile
+
+
+def open_recording(path, mode="rt"):
+    if str(path).endswith(".gz"):
+        return gzip.open(path, mode, encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+
+def parse_time_utc(value):
+    """
+    aisstream timestamps look like "2024-03-01 10:15:42.123456789 +0000 UTC".
+    Returns unix seconds, or None if the value can't be read.
+    """
+    if not value:
+        return None
+    text = str(value).replace(" UTC", "").strip()
+    date_part, _, rest = text.partition(" ")
+    time_part, _, offset = rest.partition(" ")
+    if "." in time_part:
+        whole, fraction = time_part.split(".", 1)
+        time_part = f"{whole}.{fraction[:6]}"
+    try:
+        if offset:
+            parsed = datetime.strptime(f"{date_part} {time_part} {offset}",
+                                       "%Y-%m-%d %H:%M:%S.%f %z" if "." in time_part else "%Y-%m-%d %H:%M:%S %z")
+        else:
+            parsed = datetime.fromisoformat(str(value))
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=dt_timezone.utc)
+    return parsed.timestamp()
+
+
+def iter_frames(path):
+    """Yield (frame_timestamp_or_None, raw_json) for each recorded frame."""
+    with open_recording(path) as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                meta = json.loads(line).get("MetaData", {})
+            except ValueError:
+                meta = {}
+            yield parse_time_utc(meta.get("time_utc")), line
+
+
+class ReplayClock:
+    """
+    Maps recorded frame times onto wall-clock time: a frame recorded t seconds
+    after the first one is due t / speed seconds after the replay started.
+    speed=None means no pacing (every frame is due immediately).
+    """
+    clock = staticmethod(time.monotonic)
+    sleep = staticmethod(asyncio.sleep)
+
+    def __init__(self, speed=None):
+        self.speed = speed
+        self.started = None
+        self.first_ts = None
+
+    def due(self, frame_ts):
+        now = self.clock()
+        if self.started is None:
+            self.started = now
+        if not self.speed or frame_ts is None:
+            return now
+        if self.first_ts is None:
+            self.first_ts = frame_ts
+        return self.started + max(0.0, frame_ts - self.first_ts) / self.speed
+
+    async def wait(self, frame_ts):
+        due = self.due(frame_ts)
+        delay = due - self.clock()
+        if delay > 0:
+            await self.sleep(delay)
+        return due
+
+
+class ReplayStats:
+    def __init__(self):
+        self.received = 0
+        self.stored = 0
+        self.lags = []
+        self.started = time.monotonic()
+        self.finished = None
+
+    def record(self, stored, due):
+        self.received += 1
+        self.stored += bool(stored)
+        # Write lag: from the moment the frame was due (its replayed arrival time) to the commit
+        self.lags.append(time.monotonic() - due)
+
+    def report(self):
+        elapsed = (self.finished or time.monotonic()) - self.started
+        lags = self.lags or [0.0]
+        return {
+            "frames": self.received,
+            "stored": self.stored,
+            "elapsed_s": round(elapsed, 3),
+            "messages_per_sec": round(self.received / elapsed, 1) if elapsed else None,
+            "write_lag_p50_ms": round(_percentile(lags, 50) * 1000, 3),
+            "write_lag_p95_ms": round(_percentile(lags, 95) * 1000, 3),
+            "write_lag_max_ms": round(max(lags) * 1000, 3),
+        }
+
+
+async def replay_file(path, speed=None, handler=None, limit=None):
+    """Direct source: pace frames from the file straight into the ingest handler."""
+    if handler is None:
+        from .ais_stream import handle_message as handler
+
+    clock = ReplayClock(speed)
+    stats = ReplayStats()
+    for i, (frame_ts, raw) in enumerate(iter_frames(path)):
+        if limit and i >= limit:
+            break
+        due = await clock.wait(frame_ts)
+        stats.record(await handler(raw), due)
+    stats.finished = time.monotonic()
+    return stats
+
+
+async def serve_recording(path, host="127.0.0.1", port=8765, speed=None, limit=None):
+    """
+    Local stand-in for the aisstream websocket: waits for the subscription
+    message, then streams the recording (paced) and closes the connection.
+    """
+    import websockets
+
+    async def stream(websocket, *args):
+        await websocket.recv()  # {"APIKey": ..., "BoundingBoxes": ...} - accepted as-is
+        clock = ReplayClock(speed)
+        for i, (frame_ts, raw) in enumerate(iter_frames(path)):
+            if limit and i >= limit:
+                break
+            await clock.wait(frame_ts)
+            await websocket.send(raw)
+
+    return await websockets.serve(stream, host, port)
+
+
+async def replay_websocket(path, speed=None, host="127.0.0.1", port=8765, handler=None, limit=None):
+    """Websocket source: serve the recording locally and consume it like the live stream."""
+    import websockets
+
+    if handler is None:
+        from .ais_stream import handle_message as handler
+
+    server = await serve_recording(path, host, port, speed, limit)
+    # The client keeps its own clock so lag covers the server -> socket -> DB path
+    clock = ReplayClock(speed)
+    stats = ReplayStats()
+    try:
+        async with websockets.connect(f"ws://{host}:{port}") as websocket:
+            await websocket.send(json.dumps({"APIKey": "replay", "FilterMessageTypes": ["PositionReport"]}))
+            async for raw in websocket:
+                try:
+                    frame_ts = parse_time_utc(json.loads(raw).get("MetaData", {}).get("time_utc"))
+                except ValueError:
+                    frame_ts = None
+                due = clock.due(frame_ts)
+                stats.record(await handler(raw), due)
+    except websockets.ConnectionClosed:
+        pass
+    finally:
+        server.close()
+        await server.wait_closed()
+    stats.finished = time.monotonic()
+    return stats
@@ -1,67 +1,160 @@
+"""
+Live AIS ingest: consumes the aisstream.io websocket and writes positions.
+
+Run it with `python manage.py stream_ais`; Django is set up by manage.py
+before this module is imported, and websockets is only needed here.
+"""
 import asyncio
-import websockets
 import json
 import os
-import sys
-import django
+
+import websockets
 from asgiref.sync import sync_to_async
+from django.conf import settings
 from django.utils import timezone
-from core.models import Vessel, VoyageTrack 
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-os.environ.setdefault("DJANGO_SETTINGS_MODULE", "backend.settings")
-django.setup()
 
-from core.models import Vessel
+from core.models import Vessel, VoyageTrack
+from core import anomalies, fleet_snapshot, kinematics, metrics
 
 
-API_KEY = "fdc4a66852d00d880ef8565286774912c0d0c625"
+API_KEY = os.environ.get("AISSTREAM_API_KEY", "fdc4a66852d00d880ef8565286774912c0d0c625")
+STREAM_URL = os.environ.get("AIS_STREAM_URL", "wss://stream.aisstream.io/v0/stream")
 BOUNDING_BOX = [[[-90, -180], [90, 180]]] 
+METRICS_PORT = os.environ.get("AIS_METRICS_PORT")
+# Append every raw frame to this file (.jsonl or .jsonl.gz) for offline replay (core/ais_replay.py)
+RECORD_PATH = os.environ.get("AIS_RECORD_PATH")
 
 
 @sync_to_async
 def update_vessel_in_db(mmsi, ship_name, lat, lon, speed, course):
     try:
-        
-        vessel, created = Vessel.objects.get_or_create(
-            mmsi=str(mmsi),
-            defaults={
-                "name": ship_name or f"VESSEL-{mmsi}",
-                "last_position_lat": lat,
-                "last_position_lon": lon,
-                "speed": speed,
-                "course": course,
-                "last_update": timezone.now(),
-            }
-        )
+        with metrics.AIS_DB_FLUSH_SECONDS.time():
+            _write_position(mmsi, ship_name, lat, lon, speed, course)
+        metrics.AIS_LAST_MESSAGE_TIMESTAMP.set(timezone.now().timestamp())
+        return True
+
+    except Exception as e:
+        metrics.AIS_DB_ERRORS.inc()
+        print(f"❌ DB Error for MMSI {mmsi}: {e}")
+        return False
+
 
-        if not created:
-            vessel.name = ship_name or vessel.name
-            vessel.last_position_lat = lat
-            vessel.last_position_lon = lon
-            vessel.speed = speed
-            vessel.course = course
-            vessel.last_update = timezone.now()
-            vessel.save()
-
-        
-        VoyageTrack.objects.create(
-            vessel=vessel,
-            latitude=lat,
-            longitude=lon,
+def _write_position(mmsi, ship_name, lat, lon, speed, course):
+    vessel, created = Vessel.objects.get_or_create(
+        mmsi=str(mmsi),
+        defaults={
+            "name": ship_name or f"VESSEL-{mmsi}",
+            "last_position_lat": lat,
+            "last_position_lon": lon,
+            "speed": speed,
+            "course": course,
+            "last_update": timezone.now(),
+        }
+    )
+
+    previous = None
+    if not created:
+        previous = (vessel.last_position_lat, vessel.last_position_lon, vessel.last_update, vessel.speed)
+        vessel.name = ship_name or vessel.name
+        vessel.last_position_lat = lat
+        vessel.last_position_lon = lon
+        vessel.speed = speed
+        vessel.course = course
+        vessel.last_update = timezone.now()
+        vessel.save()
+
+    
+    track = VoyageTrack.objects.create(
+        vessel=vessel,
+        latitude=lat,
+        longitude=lon,
+        speed=speed,
+        course=course,
+        timestamp=timezone.now()
+    )
+    kinematics.record_point(vessel.id, lat, lon, track.timestamp, speed, course)
+    anomalies.detector.observe(vessel.id, lat, lon, track.timestamp, speed, previous=previous)
+
+
+async def handle_message(message_json):
+    """
+    Parse one raw aisstream frame and store it. Returns True if a position was written.
+    """
+    metrics.AIS_MESSAGES_RECEIVED.inc()
+    try:
+        message = json.loads(message_json)
+
+        if message.get("MessageType") != "PositionReport":
+            metrics.AIS_MESSAGES_DROPPED.inc(reason="message_type")
+            return False
+
+        ais = message["Message"]["PositionReport"]
+        meta = message.get("MetaData", {})
+
+        # aisstream puts the MMSI in UserID / MetaData; MMSI kept for older recordings
+        mmsi = ais.get("UserID") or meta.get("MMSI") or ais.get("MMSI")
+        lat = ais.get("Latitude")
+        lon = ais.get("Longitude")
+        speed = ais.get("Sog", 0)
+        course = ais.get("Cog", 0)
+        ship_name = (meta.get("ShipName") or "").strip()
+
+       
+        if not mmsi or lat is None or lon is None:
+            metrics.AIS_MESSAGES_DROPPED.inc(reason="missing_fields")
+            return False
+
+        metrics.AIS_MESSAGES_PARSED.inc()
+        return await update_vessel_in_db(
+            mmsi=mmsi,
+            ship_name=ship_name,
+            lat=lat,
+            lon=lon,
             speed=speed,
             course=course,
-            timestamp=timezone.now()
         )
 
-        return True
-
     except Exception as e:
-        print(f"❌ DB Error for MMSI {mmsi}: {e}")
+        metrics.AIS_MESSAGES_DROPPED.inc(reason="error")
+        print(f"⚠️ Stream Error: {e}")
         return False
 
 
-async def connect_ais_stream():
-    async with websockets.connect("wss://stream.aisstream.io/v0/stream") as websocket:
+async def connect_ais_stream(url=None, record_path=None):
+    url = url or STREAM_URL
+    record_path = record_path or RECORD_PATH
+    recording = None
+    if record_path:
+        from core.ais_replay import open_recording
+        recording = open_recording(record_path, "at")
+        print(f"📼 Recording raw frames to {record_path}")
+
+    publisher = None
+    if settings.FLEET_SNAPSHOT_PATH:
+        publisher = asyncio.create_task(publish_snapshots(settings.FLEET_SNAPSHOT_INTERVAL))
+
+    try:
+        await _consume(url, recording)
+    finally:
+        if publisher:
+            publisher.cancel()
+        await sync_to_async(anomalies.detector.flush)()
+        if recording:
+            recording.close()
+
+
+async def publish_snapshots(interval):
+    """Republish the fleet snapshot the web workers read (core/fleet_snapshot.py) every `interval` seconds."""
+    while True:
+        try:
+            await sync_to_async(fleet_snapshot.publish)()
+        except Exception as e:
+            print(f"⚠️ Snapshot Error: {e}")
+        await asyncio.sleep(interval)
+
+
+async def _consume(url, recording):
+    async with websockets.connect(url) as websocket:
         await websocket.send(json.dumps({
             "APIKey": API_KEY,
             "BoundingBoxes": BOUNDING_BOX,
@@ -71,43 +164,8 @@ async def connect_ais_stream():
         print("📡 Connected to Live AIS Stream... Waiting for ships...")
 
         async for message_json in websocket:
-            try:
-                message = json.loads(message_json)
-
-                if message.get("MessageType") != "PositionReport":
-                    continue
-
-                ais = message["Message"]["PositionReport"]
-                meta = message.get("MetaData", {})
-
-                
-                mmsi = ais.get("MMSI")
-                lat = ais.get("Latitude")
-                lon = ais.get("Longitude")
-                speed = ais.get("Sog", 0)
-                course = ais.get("Cog", 0)
-                ship_name = meta.get("ShipName", "").strip()
+            if recording:
+                recording.write(message_json if isinstance(message_json, str) else message_json.decode())
+                recording.write("\n")
+            await handle_message(message_json)
 
-               
-                if not mmsi or lat is None or lon is None:
-                    continue
-
-                await update_vessel_in_db(
-                mmsi=ais.get("MMSI"),
-                ship_name=meta.get("ShipName"),
-                lat=ais.get("Latitude"),
-                lon=ais.get("Longitude"),
-                speed=ais.get("Sog"),
-                course=ais.get("Cog"),
-             )
-
-
-            except Exception as e:
-                print(f"⚠️ Stream Error: {e}")
-
-
-if __name__ == "__main__":
-    try:
-        asyncio.run(connect_ais_stream())
-    except KeyboardInterrupt:
-        print("🛑 AIS Stream stopped.")
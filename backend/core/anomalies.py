@@ -0,0 +1,242 @@
+"""
+AIS anomaly detection: impossible position jumps, sudden speed drops and
+dark periods (gaps in a vessel's AIS reports).
+
+- AnomalyDetector.observe(): streaming check on the ingest path, keeping only
+  the previous point per vessel. Findings are buffered and written as
+  Event + Notification rows in batches.
+- backfill(): offline NumPy scan of historical voyage_tracks, read in keyset
+  chunks (`manage.py detect_anomalies`).
+
+Both paths apply the same rules (_flags), so a backfill over the ingested
+tracks reports what the live detector saw.
+"""
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime, timezone as dt_timezone
+
+import numpy as np
+from django.db import connection, transaction
+
+from .geo import haversine_nm
+from .models import AppUser, Event, Notification, Vessel, VoyageTrack
+from .streaming import keyset_chunks
+
+JUMP_KNOTS = 60                   # implied speed no merchant vessel can reach
+MIN_JUMP_NM = 1.0                 # ignore GPS jitter between near-simultaneous reports
+SPEED_DROP_FROM_KNOTS = 8.0       # only vessels underway can "drop" speed
+SPEED_DROP_FRACTION = 0.4         # ... to below 40% of the previous speed
+SPEED_DROP_WINDOW = 15 * 60       # ... within 15 minutes
+DARK_PERIOD = 2 * 3600            # no reports for 2 hours
+FLUSH_SIZE = 200
+FLUSH_SECONDS = 5.0
+
+POSITION_JUMP, SPEED_DROP, AIS_GAP = "Position Jump", "Speed Drop", "AIS Gap"
+SEVERITY = {POSITION_JUMP: "CRITICAL", AIS_GAP: "CRITICAL", SPEED_DROP: "WARNING"}
+
+Anomaly = namedtuple("Anomaly", "vessel_id kind seconds lat lon details")
+
+
+def _flags(distance, dt, prev_speed, speed):
+    """Rule masks (jump, drop, gap) for consecutive-point pairs; arrays or scalars."""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        implied = np.where(dt > 0, distance * 3600 / np.where(dt > 0, dt, 1), np.inf)
+        jump = (distance >= MIN_JUMP_NM) & (implied > JUMP_KNOTS)
+        drop = ((dt > 0) & (dt <= SPEED_DROP_WINDOW) & (prev_speed >= SPEED_DROP_FROM_KNOTS)
+                & (speed < prev_speed * SPEED_DROP_FRACTION))
+    gap = dt >= DARK_PERIOD
+    return jump, drop, gap
+
+
+def _describe(kind, distance, dt, prev_speed, speed):
+    if kind == POSITION_JUMP:
+        return f"moved {distance:.1f} nm in {dt / 60:.0f} min (implied {distance * 3600 / max(dt, 1):.0f} kn)"
+    if kind == SPEED_DROP:
+        return f"speed fell from {prev_speed:.1f} kn to {speed:.1f} kn in {dt / 60:.0f} min"
+    return f"no AIS reports for {dt / 3600:.1f} h"
+
+
+# -------------------------
+# WRITING EVENTS
+# -------------------------
+
+def _observed(anomaly):
+    return datetime.fromtimestamp(anomaly.seconds, tz=dt_timezone.utc)
+
+
+def _unrecorded(anomalies):
+    """Drops anomalies already written (same vessel, kind and observed time), e.g. by an earlier backfill."""
+    observed = [_observed(anomaly) for anomaly in anomalies]
+    recorded = set(Event.objects.filter(
+        vessel_id__in={a.vessel_id for a in anomalies},
+        event_type__in={a.kind for a in anomalies},
+        timestamp__range=(min(observed), max(observed)),
+    ).values_list("vessel_id", "event_type", "timestamp"))
+    fresh = []
+    for anomaly, at in zip(anomalies, observed):
+        key = (anomaly.vessel_id, anomaly.kind, at)
+        if key not in recorded:
+            recorded.add(key)
+            fresh.append(anomaly)
+    return fresh
+
+
+def save_anomalies(anomalies):
+    """
+    Write one Event + Notification per anomaly not recorded yet, in bulk. Events
+    are dated when the anomaly was observed, not when it was detected. Returns
+    the number written.
+    """
+    if not anomalies:
+        return 0
+    anomalies = _unrecorded(anomalies)
+    if not anomalies:
+        return 0
+    names = dict(Vessel.objects.filter(id__in={a.vessel_id for a in anomalies}).values_list("id", "name"))
+    system_user = AppUser.objects.order_by("id").first()
+    events = []
+    for anomaly in anomalies:
+        at = _observed(anomaly).strftime("%Y-%m-%d %H:%M UTC")
+        events.append(Event(
+            vessel_id=anomaly.vessel_id,
+            event_type=anomaly.kind,
+            location=f"{anomaly.lat:.4f}, {anomaly.lon:.4f}",
+            details=f"Vessel {names.get(anomaly.vessel_id, anomaly.vessel_id)} {anomaly.details} at {at}.",
+        ))
+
+    with transaction.atomic():
+        # Notifications need the event ids; MySQL does not return them from bulk inserts
+        if connection.features.can_return_rows_from_bulk_insert:
+            Event.objects.bulk_create(events)
+        else:
+            for event in events:
+                event.save()
+        # timestamp is auto_now_add, which inserts overwrite; bulk_update does not
+        for anomaly, event in zip(anomalies, events):
+            event.timestamp = _observed(anomaly)
+        Event.objects.bulk_update(events, ["timestamp"])
+        Notification.objects.bulk_create([
+            Notification(
+                vessel_id=anomaly.vessel_id,
+                event=event,
+                message=f"{SEVERITY[anomaly.kind]}: {anomaly.kind} - {event.details}",
+                type="Alert",
+                user=system_user,
+            )
+            for anomaly, event in zip(anomalies, events)
+        ])
+    return len(events)
+
+
+# -------------------------
+# STREAMING (INGEST PATH)
+# -------------------------
+
+class AnomalyDetector:
+    def __init__(self, flush_size=FLUSH_SIZE, flush_seconds=FLUSH_SECONDS):
+        self.flush_size = flush_size
+        self.flush_seconds = flush_seconds
+        self.last = {}        # vessel_id -> (lat, lon, epoch seconds, speed)
+        self.pending = []
+        self.oldest_pending = None
+        self._lock = threading.Lock()
+
+    def observe(self, vessel_id, lat, lon, when, speed=None, previous=None):
+        """
+        Check one new point against the vessel's previous one. `previous` -
+        (lat, lon, datetime, speed) from the vessel row - seeds vessels not seen
+        yet by this process, unless it is older than DARK_PERIOD (the gap may
+        just be ingest downtime). Returns the anomalies found (also queued).
+        """
+        seconds = when.timestamp()
+        speed = np.nan if speed is None else float(speed)
+        found = []
+        with self._lock:
+            prev = self.last.get(vessel_id)
+            if (prev is None and previous is not None and None not in previous[:3]
+                    and seconds - previous[2].timestamp() < DARK_PERIOD):
+                prev = (previous[0], previous[1], previous[2].timestamp(),
+                        np.nan if previous[3] is None else float(previous[3]))
+            if prev is not None and seconds < prev[2]:
+                return found  # late, out-of-order report: keep the newer state
+            self.last[vessel_id] = (lat, lon, seconds, speed)
+            if prev is None:
+                return found
+
+            distance = float(haversine_nm(prev[0], prev[1], lat, lon))
+            dt = seconds - prev[2]
+            for kind, hit in zip((POSITION_JUMP, SPEED_DROP, AIS_GAP), _flags(distance, dt, prev[3], speed)):
+                if hit:
+                    found.append(Anomaly(vessel_id, kind, seconds, lat, lon,
+                                         _describe(kind, distance, dt, prev[3], speed)))
+            if found:
+                if not self.pending:
+                    self.oldest_pending = time.monotonic()
+                self.pending.extend(found)
+            due = self.pending and (len(self.pending) >= self.flush_size
+                                    or time.monotonic() - self.oldest_pending >= self.flush_seconds)
+        if due:
+            self.flush()
+        return found
+
+    def flush(self):
+        with self._lock:
+            batch, self.pending = self.pending, []
+        return save_anomalies(batch)
+
+
+detector = AnomalyDetector()
+
+
+# -------------------------
+# OFFLINE BACKFILL (NUMPY)
+# -------------------------
+
+def scan_tracks(vessel_ids, lats, lons, seconds, speeds):
+    """
+    Vectorized scan of points sorted by (vessel_id, time). Returns anomalies
+    for every consecutive pair of the same vessel.
+    """
+    vessel_ids = np.asarray(vessel_ids)
+    if len(vessel_ids) < 2:
+        return []
+    lats, lons, seconds, speeds = (np.asarray(a, dtype=float) for a in (lats, lons, seconds, speeds))
+    same = vessel_ids[1:] == vessel_ids[:-1]
+    distance = haversine_nm(lats[:-1], lons[:-1], lats[1:], lons[1:])
+    dt = np.diff(seconds)
+    found = []
+    for kind, mask in zip((POSITION_JUMP, SPEED_DROP, AIS_GAP), _flags(distance, dt, speeds[:-1], speeds[1:])):
+        for i in np.flatnonzero(mask & same):
+            found.append(Anomaly(int(vessel_ids[i + 1]), kind, float(seconds[i + 1]), float(lats[i + 1]),
+                                 float(lons[i + 1]), _describe(kind, distance[i], dt[i], speeds[i], speeds[i + 1])))
+    found.sort(key=lambda a: (a.vessel_id, a.seconds))
+    return found
+
+
+def backfill(since=None, chunk_size=50000, write=True):
+    """
+    Scan voyage_tracks (optionally only points after `since`) in keyset chunks
+    of `chunk_size` rows - memory stays bounded however large the table is.
+    Reruns over the same points write nothing new. Returns (points scanned,
+    anomalies found, anomalies written).
+    """
+    tracks = VoyageTrack.objects.all()
+    if since is not None:
+        tracks = tracks.filter(timestamp__gte=since)
+    columns = ("vessel_id", "timestamp", "id", "latitude", "longitude", "speed")
+    scanned = total = written = 0
+    carry = None  # last point of the previous chunk, so pairs across chunk edges are checked
+    for rows in keyset_chunks(tracks, columns, order_by=("vessel_id", "timestamp", "id"), chunk_size=chunk_size):
+        scanned += len(rows)
+        if carry is not None:
+            rows = [carry] + rows
+        carry = rows[-1]
+        ids, stamps, _, lats, lons, speeds = zip(*rows)
+        anomalies = scan_tracks(np.array(ids), lats, lons, [stamp.timestamp() for stamp in stamps],
+                                np.array(speeds, dtype=float))
+        total += len(anomalies)
+        if write:
+            for i in range(0, len(anomalies), FLUSH_SIZE * 10):
+                written += save_anomalies(anomalies[i:i + FLUSH_SIZE * 10])
+    return scanned, total, written
@@ -1,17 +1,30 @@
 from django.apps import AppConfig
-import threading
 
 class CoreConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "core"
 
     def ready(self):
+        # ETag versions for reference-data endpoints (core/conditional.py)
+        from core.conditional import connect_version_signals
+        from core.models import Port, RiskZone, Voyage
+        connect_version_signals(Port, RiskZone, Voyage)
+
+        # Keep the in-memory vessel search index in sync (core/search.py)
+        from core.search import connect_search_signals
+        connect_search_signals()
+
+        # Drop cached role / permission sets when a user changes (core/roles.py)
+        from core.roles import connect_role_signals
+        connect_role_signals()
+
         # Prevent double execution (Django reloads twice)
         import os
         if os.environ.get("RUN_MAIN") != "true":
             return
 
         try:
+            import threading
             from core.ais_fetcher import run_enrichment_loop
             thread = threading.Thread(
                 target=run_enrichment_loop,
@@ -0,0 +1,108 @@
+"""
+Async variants of the dashboard and analytics endpoints (api/async/...).
+
+The sync views run their independent reads one after another. Here each read
+goes to its own thread (sync_to_async with thread_sensitive=False, on a pool
+of ASYNC_QUERY_THREADS threads, each holding its own DB connection) and they
+are awaited together, so latency approaches the slowest single query. The
+payloads are those of the sync views.
+
+Served natively by backend/asgi.py (gunicorn -k uvicorn.workers.UvicornWorker);
+under WSGI they still work, one event loop per request.
+
+DRF 3.16 has no async views, so AsyncAPIView runs APIView's own request cycle
+around a coroutine handler: the same authentication, permissions, throttles,
+exception handler and renderers as every other endpoint. Queries on the pool
+threads are recorded into the request's query profile, so the query budget
+and the metrics see them too.
+"""
+import asyncio
+import inspect
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+from django.utils.decorators import method_decorator
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from . import singleflight
+from .auth import scope_key
+from .db_router import use_read_replica
+from .profiling import profile_queries
+from .views import analytics_params, analytics_payload, analytics_queries, dashboard_payload, dashboard_queries
+
+_executor = ThreadPoolExecutor(max_workers=getattr(settings, "ASYNC_QUERY_THREADS", 8),
+                               thread_name_prefix="async-query")
+
+
+class AsyncAPIView(APIView):
+    """APIView whose handlers are coroutines (APIView.dispatch, awaiting the handler)."""
+
+    async def dispatch(self, request, *args, **kwargs):
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+
+        try:
+            # Authentication, permissions and throttles may touch the DB / cache
+            await sync_to_async(self.initial)(request, *args, **kwargs)
+            if request.method.lower() in self.http_method_names:
+                handler = getattr(self, request.method.lower(), self.http_method_not_allowed)
+            else:
+                handler = self.http_method_not_allowed
+            response = handler(request, *args, **kwargs)
+            if inspect.isawaitable(response):  # OPTIONS stays APIView's sync handler
+                response = await response
+        except Exception as exc:
+            response = self.handle_exception(exc)
+
+        self.response = self.finalize_response(request, response, *args, **kwargs)
+        return self.response
+
+
+def _in_pool(query, profile):
+    # Pool threads live outside the request cycle: recycle their connections like a request would
+    close_old_connections()
+    if profile is None:
+        return query()
+    with profile_queries(profile=profile):
+        return query()
+
+
+async def gather_queries(request, queries):
+    """Run every named query in the pool at once; {name: result}."""
+    # Set by QueryBudgetMiddleware / MetricsMiddleware on the request thread
+    profile = getattr(request, "_query_profile", None)
+    results = await asyncio.gather(*(
+        sync_to_async(_in_pool, thread_sensitive=False, executor=_executor)(query, profile)
+        for query in queries.values()
+    ))
+    return dict(zip(queries, results))
+
+
+@method_decorator(use_read_replica, name="get")
+class AsyncDashboardStatsView(AsyncAPIView):
+    permission_classes = [IsAuthenticated]
+
+    async def get(self, request):
+        async def compute():
+            return dashboard_payload(await gather_queries(request, dashboard_queries(request.user)))
+        return Response(await singleflight.ado(f"dashboard:{scope_key(request)}", compute, name="dashboard"))
+
+
+@method_decorator(use_read_replica, name="get")
+class AsyncAnalyticsView(AsyncAPIView):
+    permission_classes = [IsAuthenticated]
+
+    async def get(self, request):
+        days, vessel_type = analytics_params(request)
+
+        async def compute():
+            return analytics_payload(await gather_queries(request, analytics_queries(request.user, days, vessel_type)))
+        key = f"analytics:{days}:{vessel_type}:{scope_key(request)}"
+        return Response(await singleflight.ado(key, compute, name="analytics"))
@@ -0,0 +1,174 @@
+"""
+Admin audit trail: append-only AuditEvent rows, written off the request path.
+
+record() only enqueues; a daemon thread drains the queue and bulk-inserts up
+to FLUSH_SIZE events at a time, at least every FLUSH_SECONDS. With
+settings.AUDIT_ASYNC = False (the test runner sets it) there is no thread:
+record() writes the event itself, in the calling thread and transaction.
+
+Reads page newest-first on the (timestamp, id) index with an opaque cursor,
+so a page costs the same at any depth (page()).
+"""
+import atexit
+import base64
+import logging
+import queue
+import threading
+import time
+
+from django.conf import settings
+from django.db import DatabaseError, close_old_connections
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import AuditEvent
+
+logger = logging.getLogger(__name__)
+
+FLUSH_SIZE = 500
+FLUSH_SECONDS = 2.0
+MAX_PAGE_SIZE = 200
+
+LOGIN, REGISTER, ROLE_CHANGE, STATUS_CHANGE, USER_DELETE = (
+    "login", "register", "role_change", "status_change", "user_delete",
+)
+LABELS = {
+    LOGIN: "User Logged In",
+    REGISTER: "New User Registered",
+    ROLE_CHANGE: "Role Changed",
+    STATUS_CHANGE: "Status Changed",
+    USER_DELETE: "User Deleted",
+}
+
+
+class AuditWriter:
+    def __init__(self, flush_size=FLUSH_SIZE, flush_seconds=FLUSH_SECONDS):
+        self.flush_size = flush_size
+        self.flush_seconds = flush_seconds
+        self.queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def record(self, action, actor=None, target=None, details=""):
+        """Queue one event (write it, when not async). `actor` / `target` are users (or None); only id and username are kept."""
+        self.queue.put(AuditEvent(
+            timestamp=timezone.now(),
+            action=action,
+            actor_id=getattr(actor, "pk", None),
+            actor_name=getattr(actor, "username", "") or "",
+            target_id=getattr(target, "pk", None),
+            target_name=getattr(target, "username", "") or "",
+            details=details[:255],
+        ))
+        if getattr(settings, "AUDIT_ASYNC", True):
+            self._start()
+        else:
+            self.flush()
+
+    def _drain(self, limit):
+        batch = []
+        while len(batch) < limit:
+            try:
+                batch.append(self.queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _write(self, batch):
+        if batch:
+            AuditEvent.objects.bulk_create(batch)
+        return len(batch)
+
+    def flush(self):
+        """Write everything queued so far, in this thread. Returns the number written."""
+        written = 0
+        while True:
+            batch = self._drain(self.flush_size)
+            if not batch:
+                return written
+            written += self._write(batch)
+
+    def discard(self):
+        """Drop whatever is queued (test teardown)."""
+        self._drain(float("inf"))
+
+    def _start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="audit-writer", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            try:
+                first = self.queue.get()
+            except Exception:  # interpreter shutdown
+                return
+            deadline = time.monotonic() + self.flush_seconds
+            batch = [first]
+            while len(batch) < self.flush_size and time.monotonic() < deadline:
+                try:
+                    batch.append(self.queue.get(timeout=max(deadline - time.monotonic(), 0)))
+                except queue.Empty:
+                    break
+            try:
+                close_old_connections()
+                self._write(batch)
+            except Exception:
+                logger.exception("Dropped %d audit events", len(batch))
+
+
+writer = AuditWriter()
+record = writer.record
+
+
+@atexit.register
+def _flush_at_exit():
+    try:
+        writer.flush()
+    except DatabaseError:
+        logger.exception("Dropped queued audit events at exit")
+
+
+# -------------------------
+# READING (CURSOR PAGINATION)
+# -------------------------
+
+def encode_cursor(event):
+    return base64.urlsafe_b64encode(f"{event.timestamp.isoformat()}|{event.id}".encode()).decode()
+
+
+def decode_cursor(cursor):
+    """(timestamp, id) from a cursor; ValueError if it was not made by encode_cursor."""
+    try:
+        stamp, event_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        timestamp = parse_datetime(stamp)
+        if timestamp is None:
+            raise ValueError(cursor)
+        return timestamp, int(event_id)
+    except (UnicodeDecodeError, ValueError, TypeError) as exc:
+        raise ValueError(f"Invalid cursor: {cursor}") from exc
+
+
+def page(since=None, until=None, action=None, cursor=None, limit=50):
+    """
+    Newest-first events in [since, until), continuing after `cursor`.
+    Returns (events, next cursor or None).
+    """
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    events = AuditEvent.objects.order_by("-timestamp", "-id")
+    if since is not None:
+        events = events.filter(timestamp__gte=since)
+    if until is not None:
+        events = events.filter(timestamp__lt=until)
+    if action:
+        events = events.filter(action=action)
+    if cursor:
+        timestamp, event_id = decode_cursor(cursor)
+        # (timestamp, id) < cursor, so the (timestamp, id) index serves the range
+        events = events.filter(Q(timestamp__lt=timestamp) | Q(timestamp=timestamp, id__lt=event_id))
+    rows = list(events[:limit + 1])
+    return rows[:limit], (encode_cursor(rows[limit - 1]) if len(rows) > limit else None)
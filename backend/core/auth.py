@@ -0,0 +1,111 @@
+"""
+Stateless JWT authentication with role claims.
+
+LoginView issues RoleRefreshToken pairs whose payload carries the user's role,
+staff flags and fleet (the Vessel.operator an Operator account is limited to).
+StatelessJWTAuthentication verifies the signature and builds a ClaimsUser from
+the payload, so authenticated API requests cost no user or role queries.
+
+Claims are copied from the user when a token is issued, so they can be up to
+SIMPLE_JWT['ACCESS_TOKEN_LIFETIME'] old. /token/refresh/ (RoleTokenRefreshSerializer)
+reloads the user and rebuilds them, and refuses users that were deactivated
+or deleted, so role, fleet and status changes reach a user's requests at
+their next refresh.
+
+Role-based scoping happens in the query layer: fleet_filter() narrows
+vessel-linked querysets for Operator tokens that carry a fleet. Every view
+that uses it requires a token (IsAuthenticated), so anonymous callers never
+reach the unscoped fleet.
+"""
+from django.contrib.auth import get_user_model
+from django.db.models import Q
+from rest_framework_simplejwt.authentication import JWTStatelessUserAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.serializers import TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+ROLE_CLAIM = "role"
+FLEET_CLAIM = "fleet"
+OPERATOR = "Operator"
+
+
+def user_claims(user):
+    return {
+        "username": user.username,
+        ROLE_CLAIM: user.role,
+        "is_staff": user.is_staff,
+        "is_superuser": user.is_superuser,
+        FLEET_CLAIM: user.fleet_operator or None,
+    }
+
+
+class RoleRefreshToken(RefreshToken):
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        for claim, value in user_claims(user).items():
+            token[claim] = value
+        return token
+
+
+class RoleTokenRefreshSerializer(TokenRefreshSerializer):
+    """SIMPLE_JWT['TOKEN_REFRESH_SERIALIZER']: one user lookup per refresh, claims rebuilt from it."""
+
+    def validate(self, attrs):
+        refresh = self.token_class(attrs["refresh"])
+        user = get_user_model().objects.filter(
+            **{api_settings.USER_ID_FIELD: refresh.get(api_settings.USER_ID_CLAIM)}).first()
+        if user is None or not user.is_active:
+            raise AuthenticationFailed("User is inactive or no longer exists", code="user_inactive")
+        for claim, value in user_claims(user).items():
+            refresh[claim] = value
+        return super().validate({**attrs, "refresh": str(refresh)})
+
+
+class ClaimsUser(TokenUser):
+    """request.user for token-authenticated requests; everything comes from the payload."""
+    @property
+    def role(self):
+        return self.token.get(ROLE_CLAIM)
+
+    @property
+    def fleet(self):
+        return self.token.get(FLEET_CLAIM)
+
+
+class StatelessJWTAuthentication(JWTStatelessUserAuthentication):
+    """Bearer token -> ClaimsUser, without a database lookup."""
+
+
+# request_fleet() of an Operator account with no fleet assigned: no vessels at all
+NO_FLEET = object()
+
+
+def request_fleet(user):
+    """The fleet `user` is scoped to, None when they see every vessel, NO_FLEET when they see none."""
+    if not getattr(user, "is_authenticated", False) or getattr(user, "role", None) != OPERATOR:
+        return None
+    return getattr(user, "fleet", None) or getattr(user, "fleet_operator", None) or NO_FLEET
+
+
+def fleet_filter(user, vessel_path=""):
+    """
+    Q narrowing a queryset to the vessels `user` may see. `vessel_path` leads
+    from the queryset's model to Vessel (e.g. "vessel__" for voyages).
+    """
+    fleet = request_fleet(user)
+    if fleet is None:
+        return Q()
+    if fleet is NO_FLEET:
+        return Q(pk__in=[])
+    return Q(**{f"{vessel_path}operator": fleet})
+
+
+def scope_key(request):
+    """Part of a cache / ETag key that differs between differently-scoped users."""
+    fleet = request_fleet(request.user)
+    if fleet is None:
+        return ""
+    return "-" if fleet is NO_FLEET else f"fleet:{fleet}"
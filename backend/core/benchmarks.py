@@ -0,0 +1,440 @@
+"""
+API and ingest benchmarks against synthetic fleets (driven by `manage.py bench_api`).
+
+Each fleet size gets a throw-away test database (SQLite in-memory by default),
+populated with the same generators used by populate_data.py and
+generate_history, so results are reproducible between commits.
+"""
+import asyncio
+import json
+import platform
+import random
+import statistics
+import subprocess
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import timedelta
+
+import django
+from django.db import connection, connections
+from django.db.backends.signals import connection_created
+from django.test import Client, override_settings
+from django.utils import timezone
+
+from .models import Vessel, Voyage, VoyageTrack
+from .profiling import profile_queries
+
+DEFAULT_SIZES = (1000, 10000, 100000)
+
+# (name, url) - `{voyage_id}` is filled in once the fleet exists
+ENDPOINTS = [
+    ("vessels", "/api/vessels/"),
+    ("dashboard", "/api/dashboard/"),
+    ("analytics", "/api/analytics/"),
+    ("alerts", "/api/alerts/?page_size=100"),
+    ("voyage_track", "/api/voyage-track/{voyage_id}/"),
+]
+
+
+def build_fleet(size, tracks_per_vessel=20, track_vessels=1000, seed=42):
+    """Populate the current database with `size` vessels plus ports, voyages, events and tracks."""
+    from . import populate_data
+    from .management.commands.generate_history import build_track_points
+
+    random.seed(seed)
+    populate_data.create_ports()
+    populate_data.create_vessels(size)
+    populate_data.create_voyages()
+    populate_data.create_events()
+
+    # Track history for a bounded sample keeps 100k fleets buildable in minutes
+    now = timezone.now()
+    batch = []
+    for vessel in Vessel.objects.order_by("id")[:track_vessels].iterator():
+        batch.extend(build_track_points(vessel, points=tracks_per_vessel, now=now))
+        if len(batch) >= 5000:
+            VoyageTrack.objects.bulk_create(batch)
+            batch = []
+    if batch:
+        VoyageTrack.objects.bulk_create(batch)
+
+
+def analyst_token():
+    """Access token of an unscoped Analyst: the fleet-scoped endpoints answer 401 without one."""
+    from django.contrib.auth import get_user_model
+    from .auth import RoleRefreshToken
+    analyst = get_user_model()(id=0, username="bench", role="Analyst")
+    return str(RoleRefreshToken.for_user(analyst).access_token)
+
+
+def api_client():
+    return Client(HTTP_AUTHORIZATION=f"Bearer {analyst_token()}")
+
+
+def _percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def bench_endpoint(client, url, iterations=20, warmup=2):
+    for _ in range(warmup):
+        client.get(url)
+
+    timings = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        response = client.get(url)
+        timings.append(time.perf_counter() - start)
+
+    # Separate run for memory/queries so tracing doesn't skew the latencies
+    tracemalloc.start()
+    with profile_queries() as profile:
+        response = client.get(url)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    total = sum(timings)
+    return {
+        "status": response.status_code,
+        "iterations": iterations,
+        "mean_ms": round(statistics.mean(timings) * 1000, 3),
+        "p50_ms": round(_percentile(timings, 50) * 1000, 3),
+        "p95_ms": round(_percentile(timings, 95) * 1000, 3),
+        "throughput_rps": round(iterations / total, 2) if total else None,
+        "peak_memory_kb": round(peak / 1024, 1),
+        "response_bytes": len(b"".join(response)) if response.streaming else len(response.content),
+        "queries": profile.count,
+    }
+
+
+def bench_api(iterations=20, client=None):
+    client = client or api_client()
+    voyage_id = Voyage.objects.order_by("id").values_list("id", flat=True).first()
+    results = {}
+    # One client hammering each endpoint would just measure 429s
+    with override_settings(RATE_LIMIT_ENABLED=False):
+        for name, url in ENDPOINTS:
+            results[name] = bench_endpoint(client, url.format(voyage_id=voyage_id), iterations)
+    return results
+
+
+def bench_rate_limit(checks=100000, iterations=200, client=None):
+    """
+    Cost of the token-bucket check: per take() on each backend, and the p50
+    of a cheap endpoint with the throttle on (never limiting) vs off.
+    """
+    from .ratelimit import CacheBuckets, LocalBuckets, parse_rate
+
+    capacity, refill = parse_rate("1000000/s")
+    results = {}
+    for name, store in (("local", LocalBuckets()), ("cache", CacheBuckets("default"))):
+        keys = [f"user:{i % 1000}:api/vessels/" for i in range(checks)]
+        start = time.perf_counter()
+        for key in keys:
+            store.take(key, capacity, refill)
+        results[f"{name}_check_us"] = round((time.perf_counter() - start) / checks * 1e6, 3)
+
+    client = client or Client()
+    for name, enabled in (("off", False), ("on", True)):
+        with override_settings(RATE_LIMIT_ENABLED=enabled, RATE_LIMITS={"default": "1000000/s"}):
+            results[f"ports_p50_ms_{name}"] = bench_endpoint(client, "/api/ports/", iterations)["p50_ms"]
+    results["overhead_ms"] = round(results["ports_p50_ms_on"] - results["ports_p50_ms_off"], 3)
+    return results
+
+
+def bench_vessel_serialization(iterations=5):
+    """
+    Full-fleet /vessels/ payload: ModelSerializer + stdlib JSON (the old path)
+    against values() rows + ORJSONRenderer (the current one).
+    """
+    from rest_framework.renderers import JSONRenderer
+    from .renderers import ORJSONRenderer
+    from .serializers import VesselSerializer, vessel_rows
+
+    def model_serializer():
+        return JSONRenderer().render({"vessels": VesselSerializer(Vessel.objects.all(), many=True).data})
+
+    def fast_path():
+        return ORJSONRenderer().render({"vessels": vessel_rows(Vessel.objects.all())})
+
+    results = {}
+    for name, build in (("model_serializer", model_serializer), ("fast_path", fast_path)):
+        timings = []
+        for _ in range(iterations):
+            start = time.perf_counter()
+            build()
+            timings.append(time.perf_counter() - start)
+        results[f"{name}_ms"] = round(statistics.median(timings) * 1000, 2)
+    results["speedup"] = round(results["model_serializer_ms"] / results["fast_path_ms"], 2)
+    return results
+
+
+# (name, sync view on WSGI, async variant on ASGI)
+ASYNC_ENDPOINTS = [
+    ("dashboard", "/api/dashboard/", "/api/async/dashboard/"),
+    ("analytics", "/api/analytics/?days=30", "/api/async/analytics/?days=30"),
+]
+
+
+async def asgi_get(application, url, token):
+    """
+    One GET straight through an ASGI application, as an ASGI server would send
+    it (unlike AsyncClient, which skips the handler's per-request thread context).
+    """
+    path, _, query = url.partition("?")
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": path, "raw_path": path.encode(), "query_string": query.encode(),
+        "root_path": "",
+        "headers": [(b"host", b"testserver"), (b"authorization", f"Bearer {token}".encode())],
+        "server": ("testserver", 80), "client": ("127.0.0.1", 50000),
+    }
+    body_sent = False
+    disconnected = asyncio.get_running_loop().create_future()  # the client never goes away
+    status = None
+
+    async def receive():
+        nonlocal body_sent
+        if not body_sent:
+            body_sent = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        return await disconnected
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+
+    await application(scope, receive, send)
+    return status
+
+
+@contextmanager
+def simulated_db_latency(ms):
+    """
+    Add `ms` to every query on every connection (current and future threads):
+    the in-memory SQLite test database has none of the network round trip a
+    MySQL / TiDB query pays.
+    """
+    if not ms:
+        yield
+        return
+
+    def delay(execute, sql, params, many, context):
+        time.sleep(ms / 1000)
+        return execute(sql, params, many, context)
+
+    def install(connection, **kwargs):
+        connection.execute_wrappers.append(delay)
+
+    connection_created.connect(install)
+    install(connection)
+    try:
+        yield
+    finally:
+        connection_created.disconnect(install)
+        for conn in connections.all(initialized_only=True):
+            if delay in conn.execute_wrappers:
+                conn.execute_wrappers.remove(delay)
+
+
+def bench_async(iterations=20, concurrency=8, db_latency_ms=0):
+    """
+    Sync views through the WSGI handler against their async variants through
+    backend/asgi.py: p50 of one request at a time, and requests/s with
+    `concurrency` in flight. `queries_sum_ms` / `queries_max_ms` time each
+    independent query alone: roughly the sync floor and the async one.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    from django.contrib.auth.models import AnonymousUser
+    from django.core.handlers.asgi import ASGIHandler
+    from .views import analytics_queries, dashboard_queries
+
+    application = ASGIHandler()
+    queries = {"dashboard": lambda: dashboard_queries(AnonymousUser()),
+               "analytics": lambda: analytics_queries(AnonymousUser(), 30, "All Vessel Types")}
+
+    def single_queries(name):
+        timings = {}
+        for query_name, query in queries[name]().items():
+            start = time.perf_counter()
+            query()
+            timings[query_name] = time.perf_counter() - start
+        return timings
+
+    token = analyst_token()
+
+    def wsgi_get(url):
+        Client(HTTP_AUTHORIZATION=f"Bearer {token}").get(url)
+
+    async def sequential(url):
+        latencies = []
+        for _ in range(iterations + 2):
+            start = time.perf_counter()
+            await asgi_get(application, url, token)
+            latencies.append(time.perf_counter() - start)
+        return latencies[2:]
+
+    async def herd(url):
+        for _ in range(iterations):
+            await asyncio.gather(*(asgi_get(application, url, token) for _ in range(concurrency)))
+
+    results = {}
+    with override_settings(RATE_LIMIT_ENABLED=False), simulated_db_latency(db_latency_ms):
+        for name, sync_url, async_url in ASYNC_ENDPOINTS:
+            single_queries(name)  # warm up
+            timings = single_queries(name)
+            entry = {
+                "queries_sum_ms": round(sum(timings.values()) * 1000, 3),
+                "queries_max_ms": round(max(timings.values()) * 1000, 3),
+                "wsgi_p50_ms": bench_endpoint(api_client(), sync_url, iterations)["p50_ms"],
+                "asgi_p50_ms": round(_percentile(asyncio.run(sequential(async_url)), 50) * 1000, 3),
+            }
+
+            total = iterations * concurrency
+            start = time.perf_counter()
+            with ThreadPoolExecutor(concurrency) as pool:
+                list(pool.map(wsgi_get, [sync_url] * total))
+            entry["wsgi_concurrent_rps"] = round(total / (time.perf_counter() - start), 1)
+
+            start = time.perf_counter()
+            asyncio.run(herd(async_url))
+            entry["asgi_concurrent_rps"] = round(total / (time.perf_counter() - start), 1)
+            results[name] = entry
+    return results
+
+
+COMPRESSION_ENDPOINTS = [
+    ("vessels", "/api/vessels/"),
+    ("alerts", "/api/alerts/?page_size=100"),
+]
+
+
+def bench_compression(client=None, iterations=3):
+    """CPU cost vs bytes saved per encoding/level for typical uncompressed payloads."""
+    from .compression import available_encodings, compress
+
+    client = client or api_client()
+    # Brotli 11 is left out: seconds per MB, never sensible for dynamic responses
+    settings_by_encoding = {"gzip": (1, 6, 9), "br": (1, 4, 6)}
+    results = {}
+    for name, url in COMPRESSION_ENDPOINTS:
+        body = client.get(url).content  # test client sends no Accept-Encoding
+        entry = {"raw_bytes": len(body), "encodings": {}}
+        for encoding in available_encodings():
+            for level in settings_by_encoding[encoding]:
+                timings = []
+                for _ in range(iterations):
+                    start = time.process_time()
+                    compressed = compress(body, encoding, level)
+                    timings.append(time.process_time() - start)
+                cpu_ms = statistics.median(timings) * 1000
+                entry["encodings"][f"{encoding}-{level}"] = {
+                    "bytes": len(compressed),
+                    "ratio": round(len(body) / len(compressed), 2) if compressed else None,
+                    "cpu_ms": round(cpu_ms, 3),
+                    "cpu_ms_per_mb": round(cpu_ms / (len(body) / 1e6), 2) if body else None,
+                }
+        results[name] = entry
+    return results
+
+
+# -------------------------
+# INGEST
+# -------------------------
+
+def synthetic_frames(count, seed=42):
+    """aisstream-shaped PositionReport frames for vessels already in the fleet."""
+    rng = random.Random(seed)
+    mmsis = list(Vessel.objects.values_list("mmsi", flat=True)[:5000]) or [str(900000000 + i) for i in range(100)]
+    start = timezone.now()
+    frames = []
+    for i in range(count):
+        mmsi = int(rng.choice(mmsis))
+        frames.append(json.dumps({
+            "MessageType": "PositionReport",
+            "MetaData": {
+                "MMSI": mmsi,
+                "ShipName": f"SYNTH {mmsi % 1000000:06d}",
+                "time_utc": (start + timedelta(seconds=i)).isoformat(),
+            },
+            "Message": {"PositionReport": {
+                "UserID": mmsi,
+                "Latitude": rng.uniform(-60, 60),
+                "Longitude": rng.uniform(-180, 180),
+                "Sog": rng.uniform(0, 22),
+                "Cog": rng.uniform(0, 360),
+            }},
+        }))
+    return frames
+
+
+def load_frames(path, limit=None):
+    """Recorded frames (JSONL or .jsonl.gz, see core/ais_replay.py)."""
+    from .ais_replay import iter_frames
+    frames = []
+    for _, raw in iter_frames(path):
+        frames.append(raw)
+        if limit and len(frames) >= limit:
+            break
+    return frames
+
+
+def bench_ingest(frames):
+    """Push raw frames through the live-stream handler, one at a time like the websocket loop."""
+    from .ais_stream import handle_message
+
+    async def run():
+        latencies = []
+        stored = 0
+        for raw in frames:
+            start = time.perf_counter()
+            stored += bool(await handle_message(raw))
+            latencies.append(time.perf_counter() - start)
+        return latencies, stored
+
+    start = time.perf_counter()
+    latencies, stored = asyncio.run(run())
+    elapsed = time.perf_counter() - start
+    return {
+        "frames": len(frames),
+        "stored": stored,
+        "messages_per_sec": round(len(frames) / elapsed, 1) if elapsed else None,
+        "p50_ms": round(_percentile(latencies, 50) * 1000, 3) if latencies else None,
+        "p95_ms": round(_percentile(latencies, 95) * 1000, 3) if latencies else None,
+    }
+
+
+# -------------------------
+# REPORTING
+# -------------------------
+
+def environment():
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=5,
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        "commit": commit,
+        "timestamp": timezone.now().isoformat(),
+        "python": platform.python_version(),
+        "django": django.get_version(),
+        "machine": platform.machine(),
+    }
+
+
+def compare(current, baseline, key="p50_ms"):
+    """Relative change of `key` per size/endpoint, e.g. {"1000": {"vessels": 0.12}} for +12%."""
+    changes = {}
+    for size, endpoints in current.get("results", {}).items():
+        base_endpoints = baseline.get("results", {}).get(size, {})
+        for name, stats in endpoints.items():
+            before = base_endpoints.get(name, {}).get(key)
+            if before:
+                changes.setdefault(size, {})[name] = round((stats[key] - before) / before, 3)
+    return changes
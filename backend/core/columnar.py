@@ -0,0 +1,168 @@
+"""
+Columnar exports (Parquet / Arrow IPC) of vessels, voyages and voyage tracks.
+
+Rows come out of the database in keyset chunks (core/streaming.py) and each
+chunk becomes one Arrow record batch with a fixed, typed schema: int64 ids,
+float64 measurements, UTC timestamps, and the low-cardinality strings (type,
+flag, cargo_type, status) dictionary-encoded. Each batch is written and handed
+on before the next chunk is read, so memory stays at one chunk however long
+the history is, and the files load into pyarrow / pandas without any parsing
+(dictionary columns arrive as categoricals).
+
+A column's dictionary only grows during an export: every batch encodes
+against the values seen so far, so Arrow IPC files carry it as deltas and
+Parquet writes it once per row group.
+
+pyarrow is optional and only imported once an export runs.
+"""
+import importlib.util
+import io
+from datetime import timezone as dt_timezone
+
+from django.utils import timezone
+
+from .auth import fleet_filter
+from .models import Vessel, Voyage, VoyageTrack
+from .streaming import keyset_chunks
+
+FORMATS = {
+    "parquet": "application/vnd.apache.parquet",
+    "arrow": "application/vnd.apache.arrow.file",
+}
+# Rows per record batch (and Parquet row group)
+CHUNK_SIZE = 50_000
+
+# name -> model, path from it to Vessel (fleet scoping), time column for
+# since / until, and (column, kind) pairs
+DATASETS = {
+    "vessels": (Vessel, "", "last_update", (
+        ("id", "int64"), ("mmsi", "string"), ("imo_number", "string"), ("name", "string"),
+        ("type", "dictionary"), ("flag", "dictionary"), ("cargo_type", "dictionary"),
+        ("operator", "string"), ("last_position_lat", "float64"), ("last_position_lon", "float64"),
+        ("speed", "float64"), ("course", "float64"), ("last_update", "timestamp"),
+    )),
+    "voyages": (Voyage, "vessel__", "departure_time", (
+        ("id", "int64"), ("vessel_id", "int64"), ("port_from_id", "int64"), ("port_to_id", "int64"),
+        ("departure_time", "timestamp"), ("arrival_time", "timestamp"), ("status", "dictionary"),
+    )),
+    "tracks": (VoyageTrack, "vessel__", "timestamp", (
+        ("id", "int64"), ("vessel_id", "int64"), ("latitude", "float64"), ("longitude", "float64"),
+        ("speed", "float64"), ("course", "float64"), ("timestamp", "timestamp"),
+    )),
+}
+
+
+def available():
+    return importlib.util.find_spec("pyarrow") is not None
+
+
+def export_queryset(dataset, user=None, since=None, until=None):
+    """Rows of `dataset` visible to `user` (everything without one), `since` <= time column < `until`."""
+    model, vessel_path, time_column, _ = DATASETS[dataset]
+    queryset = model.objects.all()
+    if user is not None:
+        queryset = queryset.filter(fleet_filter(user, vessel_path))
+    if since is not None:
+        queryset = queryset.filter(**{f"{time_column}__gte": _aware(since)})
+    if until is not None:
+        queryset = queryset.filter(**{f"{time_column}__lt": _aware(until)})
+    return queryset
+
+
+def _aware(value):
+    return timezone.make_aware(value, dt_timezone.utc) if timezone.is_naive(value) else value
+
+
+def schema(dataset):
+    import pyarrow as pa
+    types = {
+        "int64": pa.int64(),
+        "float64": pa.float64(),
+        "string": pa.string(),
+        "dictionary": pa.dictionary(pa.int32(), pa.string()),
+        "timestamp": pa.timestamp("us", tz="UTC"),
+    }
+    return pa.schema([(name, types[kind]) for name, kind in DATASETS[dataset][3]])
+
+
+class _Dictionary:
+    """One column's dictionary for the whole export; values keep their first index."""
+
+    def __init__(self):
+        self.index = {}
+        self.values = []
+
+    def encode(self, pa, column):
+        indices = []
+        for value in column:
+            if value is None:
+                indices.append(None)
+                continue
+            position = self.index.get(value)
+            if position is None:
+                position = self.index[value] = len(self.values)
+                self.values.append(value)
+            indices.append(position)
+        return pa.DictionaryArray.from_arrays(pa.array(indices, pa.int32()), pa.array(self.values, pa.string()))
+
+
+def record_batches(dataset, queryset, chunk_size=CHUNK_SIZE):
+    """pyarrow RecordBatches of `queryset`, one per keyset chunk, in id order."""
+    import pyarrow as pa
+    arrow_schema = schema(dataset)
+    columns = DATASETS[dataset][3]
+    dictionaries = {name: _Dictionary() for name, kind in columns if kind == "dictionary"}
+    for rows in keyset_chunks(queryset, [name for name, _ in columns], ("id",), chunk_size):
+        arrays = []
+        for (name, _), field, values in zip(columns, arrow_schema, zip(*rows)):
+            if name in dictionaries:
+                arrays.append(dictionaries[name].encode(pa, values))
+            else:
+                arrays.append(pa.array(values, field.type))
+        yield pa.RecordBatch.from_arrays(arrays, schema=arrow_schema)
+
+
+class _Spool(io.RawIOBase):
+    """Write-only file that hands back what was written since the last drain()."""
+
+    def __init__(self):
+        self.parts = []
+        self.position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.parts.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        # Writers record absolute offsets (Parquet footer, IPC blocks)
+        return self.position
+
+    def drain(self):
+        data = b"".join(self.parts)
+        self.parts = []
+        return data
+
+
+def _writer(fmt, sink, arrow_schema):
+    import pyarrow as pa
+    if fmt == "parquet":
+        import pyarrow.parquet as pq
+        return pq.ParquetWriter(sink, arrow_schema)
+    return pa.ipc.new_file(sink, arrow_schema, options=pa.ipc.IpcWriteOptions(emit_dictionary_deltas=True))
+
+
+def export_chunks(dataset, queryset, fmt, chunk_size=CHUNK_SIZE):
+    """The export file as byte chunks, one per record batch; `fmt` must be a key of FORMATS."""
+    spool = _Spool()
+    writer = _writer(fmt, spool, schema(dataset))
+    for batch in record_batches(dataset, queryset, chunk_size):
+        writer.write_batch(batch)
+        data = spool.drain()
+        if data:
+            yield data
+    writer.close()
+    yield spool.drain()
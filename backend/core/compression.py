@@ -0,0 +1,89 @@
+"""
+Content-encoding helpers for API responses: Accept-Encoding negotiation plus
+one-shot and streaming gzip/brotli encoders. Used by
+core.middleware.APICompressionMiddleware and the bench_api compression report.
+"""
+import gzip
+import zlib
+
+try:
+    import brotli
+except ImportError:  # optional: gzip only
+    brotli = None
+
+# Compress the streamed output in blocks of roughly this many input bytes;
+# flushing every NDJSON row would ruin the ratio.
+STREAM_FLUSH_BYTES = 64 * 1024
+
+
+def available_encodings():
+    return ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+def negotiate(accept_encoding, preferred=None):
+    """
+    Pick the best supported coding from an Accept-Encoding header, honouring
+    q-values (q=0 means "not acceptable"). Ties go to the order in `preferred`.
+    """
+    preferred = preferred or available_encodings()
+    weights = {}
+    for part in (accept_encoding or "").split(","):
+        coding, _, params = part.strip().partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        weights[coding] = q
+    best, best_q = None, 0.0
+    for coding in preferred:
+        q = weights.get(coding, weights.get("*", 0.0))
+        if q > best_q:
+            best, best_q = coding, q
+    return best
+
+
+def compress(data, encoding, level):
+    if encoding == "br":
+        return brotli.compress(data, quality=level)
+    # mtime=0 keeps the output deterministic for identical payloads
+    return gzip.compress(data, compresslevel=level, mtime=0)
+
+
+def _gzip_stream(chunks, level):
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    pending = 0
+    for chunk in chunks:
+        out = compressor.compress(chunk)
+        pending += len(chunk)
+        if pending >= STREAM_FLUSH_BYTES:
+            out += compressor.flush(zlib.Z_SYNC_FLUSH)
+            pending = 0
+        if out:
+            yield out
+    yield compressor.flush()
+
+
+def _brotli_stream(chunks, level):
+    compressor = brotli.Compressor(quality=level)
+    pending = 0
+    for chunk in chunks:
+        out = compressor.process(chunk)
+        pending += len(chunk)
+        if pending >= STREAM_FLUSH_BYTES:
+            out += compressor.flush()
+            pending = 0
+        if out:
+            yield out
+    yield compressor.finish()
+
+
+def compress_stream(chunks, encoding, level):
+    if encoding == "br":
+        return _brotli_stream(chunks, level)
+    return _gzip_stream(chunks, level)
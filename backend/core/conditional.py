@@ -0,0 +1,101 @@
+"""
+ETag / Last-Modified support for rarely-changing reference data (/ports/,
+/risks/, /voyages/).
+
+A table's version is one cheap aggregate (row count, max id, max timestamp
+columns) combined with a write counter (TableVersion) that writers bump, read
+in the same query. Unchanged data is answered with 304 before the view or its
+serializer runs.
+
+The aggregate catches inserts, deletes and timestamped updates; the counter
+catches in-place edits (voyage status, congestion scores). Both live in the
+database, so writes from any process (ingest, segment_voyages, the congestion
+refresh) reach every web worker.
+"""
+import hashlib
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Max, Subquery
+from django.db.models.signals import post_delete, post_save
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.views.decorators.http import condition
+
+from .models import TableVersion
+
+# Per-model timestamp columns folded into the version (Last-Modified uses the first)
+TIMESTAMP_FIELDS = {
+    "ports": ("last_update",),
+    "voyages": ("departure_time", "arrival_time"),
+}
+
+
+def bump_table_version(model):
+    """Call after writing to `model`'s table (signals cover single-row saves)."""
+    table = model._meta.db_table
+    counter = TableVersion.objects.filter(table=table)
+    if counter.update(version=F("version") + 1):
+        return
+    try:
+        with transaction.atomic():
+            TableVersion.objects.create(table=table, version=1)
+    except IntegrityError:  # another writer created it first
+        counter.update(version=F("version") + 1)
+
+
+def table_version(model):
+    """Returns (etag, last_modified) for the model's table."""
+    table = model._meta.db_table
+    timestamps = TIMESTAMP_FIELDS.get(table, ())
+    aggregates = {"rows": Count("pk"), "max_pk": Max("pk")}
+    aggregates.update({f"max_{field}": Max(field) for field in timestamps})
+    # Max() over the scalar subquery folds the counter into the same query
+    aggregates["counter"] = Max(Subquery(TableVersion.objects.filter(table=table).values("version")[:1]))
+    state = model.objects.aggregate(**aggregates)
+
+    fingerprint = f"{table}:" + ":".join(str(state[key]) for key in sorted(state))
+    last_modified = state.get(f"max_{timestamps[0]}") if timestamps else None
+    return hashlib.md5(fingerprint.encode()).hexdigest(), last_modified
+
+
+def versioned_by(*models, scope=None):
+    """
+    View decorator: conditional GET keyed on the tables the view reads.
+    Responses carry `Cache-Control: no-cache` so browsers revalidate each poll.
+    `scope(request)` is folded into the ETag for views whose rows depend on
+    who is asking.
+    """
+    def versions(request):
+        cached = getattr(request, "_table_versions", None)
+        if cached is None:
+            parts = [table_version(model) for model in models]
+            key = "".join(tag for tag, _ in parts) + (f":{scope(request)}" if scope else "")
+            etag = hashlib.md5(key.encode()).hexdigest()
+            stamps = [stamp for _, stamp in parts if stamp is not None]
+            # Last-Modified only when every table has a timestamp to vouch for it
+            last_modified = max(stamps) if stamps and len(stamps) == len(parts) else None
+            cached = request._table_versions = (etag, last_modified)
+        return cached
+
+    def decorator(view_func):
+        conditional_view = condition(
+            etag_func=lambda request, *args, **kwargs: versions(request)[0],
+            last_modified_func=lambda request, *args, **kwargs: versions(request)[1],
+        )(view_func)
+
+        def wrapped(request, *args, **kwargs):
+            response = conditional_view(request, *args, **kwargs)
+            patch_cache_control(response, no_cache=True)
+            if scope:
+                patch_vary_headers(response, ("Authorization",))
+            return response
+        wrapped.__name__ = getattr(view_func, "__name__", "view")
+        return wrapped
+    return decorator
+
+
+def connect_version_signals(*models):
+    for model in models:
+        def bump(sender, **kwargs):
+            bump_table_version(sender)
+        post_save.connect(bump, sender=model, weak=False, dispatch_uid=f"table_version_save_{model.__name__}")
+        post_delete.connect(bump, sender=model, weak=False, dispatch_uid=f"table_version_delete_{model.__name__}")
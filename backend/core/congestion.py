@@ -0,0 +1,148 @@
+"""
+Port congestion from live vessel density and observed waits at anchor.
+
+- refresh(): one vectorized pass over every fresh vessel position. Each vessel
+  is assigned to its nearest port; slow vessels within PORT_RADIUS_NM but
+  outside BERTH_RADIUS_NM are waiting (at anchor), slow ones inside it are
+  berthed. Counts feed an exponentially smoothed waiting_avg per port.
+- record_waits(): called by core/segmentation.py for every detected
+  arrival -> berth duration; folded into a decayed per-port mean wait.
+
+Port.congestion_score (0-100) and Port.avg_wait_time (hours) are written from
+those two windows; both are kept in PortCongestion and updated in place.
+"""
+from datetime import timedelta
+
+import numpy as np
+from django.db import transaction
+from django.utils import timezone
+
+from .conditional import bump_table_version
+from .geo import nearest_point, port_coordinates
+from .models import Port, PortCongestion, Vessel
+from .upsert import upsert
+
+PORT_RADIUS_NM = 10.0         # port limits, anchorages included
+BERTH_RADIUS_NM = 2.0         # inner harbour: slow here means alongside
+SLOW_KNOTS = 1.0              # anchored, moored or drifting
+FRESH_POSITION = timedelta(hours=6)
+COUNT_HALF_LIFE = 60 * 60             # seconds; smoothing of the waiting-vessel count
+WAIT_HALF_LIFE = 3 * 24 * 3600        # seconds; memory of observed waits
+MIN_WAIT_WEIGHT = 0.5                 # fewer (decayed) samples than this: wait unknown
+SCORE_HALF_VESSELS = 5.0      # 5 vessels waiting alone -> score 50
+SCORE_HALF_WAIT_HOURS = 24.0  # a 24 h mean wait alone -> score 50
+UPDATE_BATCH = 1000
+
+WINDOW_FIELDS = ["waiting_vessels", "berthed_vessels", "waiting_avg", "wait_weight", "wait_hours",
+                 "decayed_at", "refreshed_at", "updated_at"]
+
+
+def _decay(seconds, half_life):
+    return 0.5 ** (np.maximum(seconds, 0) / half_life)
+
+
+def congestion_score(waiting, wait_hours):
+    """0-100, saturating: each SCORE_HALF_* of pressure halves the remaining headroom."""
+    pressure = np.asarray(waiting, dtype=float) / SCORE_HALF_VESSELS
+    pressure = pressure + np.nan_to_num(np.asarray(wait_hours, dtype=float)) / SCORE_HALF_WAIT_HOURS
+    return 100 * (1 - 0.5 ** pressure)
+
+
+# -------------------------
+# WAIT SAMPLES (FROM SEGMENTATION)
+# -------------------------
+
+def record_waits(samples):
+    """
+    Fold (port_id, arrived_at, berthed_at) samples into each port's decayed
+    mean wait. Late samples count with the weight they would have now.
+    """
+    if not samples:
+        return
+    windows = PortCongestion.objects.in_bulk({port_id for port_id, _, _ in samples})
+    for port_id, arrived_at, berthed_at in sorted(samples, key=lambda sample: sample[2]):
+        window = windows.get(port_id)
+        if window is None:
+            window = windows[port_id] = PortCongestion(port_id=port_id)
+        hours = max((berthed_at - arrived_at).total_seconds(), 0) / 3600
+        weight = 1.0
+        if window.decayed_at is None or berthed_at > window.decayed_at:
+            if window.decayed_at is not None:
+                factor = _decay((berthed_at - window.decayed_at).total_seconds(), WAIT_HALF_LIFE)
+                window.wait_weight *= factor
+                window.wait_hours *= factor
+            window.decayed_at = berthed_at
+        else:
+            weight = _decay((window.decayed_at - berthed_at).total_seconds(), WAIT_HALF_LIFE)
+        window.wait_weight += weight
+        window.wait_hours += weight * hours
+    upsert(PortCongestion, windows.values(), unique_fields=["port"], update_fields=WINDOW_FIELDS)
+
+
+# -------------------------
+# DENSITY REFRESH (VECTORIZED)
+# -------------------------
+
+def vessel_density(port_lats, port_lons, lats, lons, speeds):
+    """Per port: (waiting, berthed) counts of slow vessels whose nearest port it is."""
+    n = len(port_lats)
+    if not len(lats):
+        return np.zeros(n, dtype=np.int64), np.zeros(n, dtype=np.int64)
+    nearest, distance = nearest_point(lats, lons, port_lats, port_lons)
+    slow = np.nan_to_num(np.asarray(speeds, dtype=float), nan=np.inf) <= SLOW_KNOTS
+    berthed = slow & (distance <= BERTH_RADIUS_NM)
+    waiting = slow & (distance <= PORT_RADIUS_NM) & ~berthed
+    return np.bincount(nearest[waiting], minlength=n), np.bincount(nearest[berthed], minlength=n)
+
+
+def refresh(now=None):
+    """
+    Recompute congestion for every port from current vessel positions and the
+    rolling windows. Returns {port_id: congestion_score}.
+    """
+    now = now or timezone.now()
+    port_ids, port_lats, port_lons = port_coordinates(Port.objects.values_list("id", "location"))
+    if not len(port_ids):
+        return {}
+
+    positions = np.array(
+        Vessel.objects.filter(last_update__gte=now - FRESH_POSITION, last_position_lat__isnull=False,
+                              last_position_lon__isnull=False)
+        .values_list("last_position_lat", "last_position_lon", "speed"),
+        dtype=float,
+    ).reshape(-1, 3)
+    waiting, berthed = vessel_density(port_lats, port_lons, positions[:, 0], positions[:, 1], positions[:, 2])
+
+    windows = PortCongestion.objects.in_bulk(port_ids.tolist())
+    rows = [windows.get(port_id) or PortCongestion(port_id=port_id) for port_id in port_ids.tolist()]
+    since_refresh = np.array([(now - row.refreshed_at).total_seconds() if row.refreshed_at else np.inf
+                              for row in rows])
+    since_decay = np.array([(now - row.decayed_at).total_seconds() if row.decayed_at else 0.0 for row in rows])
+
+    alpha = 1 - _decay(since_refresh, COUNT_HALF_LIFE)
+    waiting_avg = np.array([row.waiting_avg for row in rows], dtype=float)
+    waiting_avg += alpha * (waiting - waiting_avg)
+    factor = _decay(since_decay, WAIT_HALF_LIFE)
+    wait_weight = np.array([row.wait_weight for row in rows]) * factor
+    wait_hours = np.array([row.wait_hours for row in rows]) * factor
+    avg_wait = np.divide(wait_hours, wait_weight, out=np.full(len(rows), np.nan),
+                         where=wait_weight >= MIN_WAIT_WEIGHT)
+    scores = congestion_score(waiting_avg, avg_wait)
+
+    ports = []
+    for i, row in enumerate(rows):
+        row.waiting_vessels, row.berthed_vessels = int(waiting[i]), int(berthed[i])
+        row.waiting_avg = float(waiting_avg[i])
+        row.wait_weight, row.wait_hours = float(wait_weight[i]), float(wait_hours[i])
+        row.decayed_at = row.refreshed_at = now
+        ports.append(Port(id=row.port_id, congestion_score=round(float(scores[i]), 1),
+                          avg_wait_time=None if np.isnan(avg_wait[i]) else round(float(avg_wait[i]), 1),
+                          last_update=now))
+
+    with transaction.atomic():
+        upsert(PortCongestion, rows, unique_fields=["port"], update_fields=WINDOW_FIELDS,
+               batch_size=UPDATE_BATCH)
+        Port.objects.bulk_update(ports, ["congestion_score", "avg_wait_time", "last_update"],
+                                 batch_size=UPDATE_BATCH)
+    bump_table_version(Port)
+    return {port.id: port.congestion_score for port in ports}
@@ -0,0 +1,100 @@
+"""
+Read-replica routing.
+
+Views wrapped in `use_read_replica` (analytics, dashboard, list and track
+endpoints) send their reads to settings.DATABASE_READ_REPLICA; everything else,
+and every write, stays on `default`. Once a request writes, its remaining reads
+are pinned to the primary so it sees its own changes.
+
+The replica is health-checked when a request starts: if it cannot be reached
+it is skipped for REPLICA_RETRY_SECONDS and reads fall back to the primary.
+"""
+import contextvars
+import functools
+import inspect
+import logging
+import time
+from contextlib import contextmanager
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+from django.utils.connection import ConnectionDoesNotExist
+
+logger = logging.getLogger(__name__)
+
+REPLICA_RETRY_SECONDS = 30
+
+_read_alias = contextvars.ContextVar("read_alias", default=None)
+_replica_down_until = {}
+
+
+def replica_alias():
+    return getattr(settings, "DATABASE_READ_REPLICA", None)
+
+
+def replica_available(alias):
+    if time.monotonic() < _replica_down_until.get(alias, 0):
+        return False
+    try:
+        # No-op on a live persistent connection; CONN_HEALTH_CHECKS covers stale ones
+        connections[alias].ensure_connection()
+    except (ConnectionDoesNotExist, DatabaseError) as exc:
+        logger.warning("Read replica %r unavailable, reading from primary: %s", alias, exc)
+        _replica_down_until[alias] = time.monotonic() + REPLICA_RETRY_SECONDS
+        return False
+    _replica_down_until.pop(alias, None)
+    return True
+
+
+@contextmanager
+def read_from(alias):
+    """Send reads in this block (and this context) to `alias` until a write happens."""
+    token = _read_alias.set(alias)
+    try:
+        yield
+    finally:
+        _read_alias.reset(token)
+
+
+def use_read_replica(view_func):
+    """Route the view's reads to the read replica, when one is configured and up."""
+    if inspect.iscoroutinefunction(view_func):
+        @functools.wraps(view_func)
+        async def async_wrapped(*args, **kwargs):
+            alias = replica_alias()
+            if not alias or not await sync_to_async(replica_available)(alias):
+                return await view_func(*args, **kwargs)
+            # Queries handed to threads by sync_to_async inherit this context
+            with read_from(alias):
+                return await view_func(*args, **kwargs)
+        return async_wrapped
+
+    @functools.wraps(view_func)
+    def wrapped(*args, **kwargs):
+        alias = replica_alias()
+        if not alias or not replica_available(alias):
+            return view_func(*args, **kwargs)
+        with read_from(alias):
+            return view_func(*args, **kwargs)
+    return wrapped
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        return _read_alias.get()
+
+    def db_for_write(self, model, **hints):
+        if _read_alias.get() is not None:
+            _read_alias.set(None)  # read-your-writes for the rest of the request
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # The replica holds the same data as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # The replica gets its schema through replication
+        if db == replica_alias():
+            return False
+        return None
@@ -0,0 +1,287 @@
+"""
+Memory-mapped fleet snapshot: the latest state of every vessel, published by
+the ingest process (core/ais_stream.py) and read by the web workers instead
+of the vessels table.
+
+File layout (little-endian):
+  header   magic, version, record count, publish time, section offsets
+  records  one fixed-size RECORD per vessel, in id order
+  text     UTF-8 mmsi / imo_number / name, addressed by (offset, length)
+           from the record (length -1 is NULL)
+  codes    JSON {column: [values]} for the dictionary-coded columns; code
+           0xFFFF is NULL
+
+publish() writes a complete new file next to the live one and renames it
+over it (atomic on POSIX), so there are always two buffers: a reader keeps
+the generation it has mapped (the old inode lives as long as the mapping)
+and moves to the new one when one stat() per read shows the rename. The old
+generation is unmapped once the last request using it is done. Every worker
+maps the same file, so the page cache holds one copy for all.
+
+Readers view the records in place with np.frombuffer and only turn the rows
+a request returns into Python objects. A snapshot older than
+FLEET_SNAPSHOT_MAX_AGE seconds (ingest stopped) or a missing file sends the
+views back to the database. numpy is imported on first use, keeping it out
+of worker start-up (core/startup.py).
+"""
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone as dt_timezone
+from functools import lru_cache
+
+from django.conf import settings
+
+from .metrics import FLEET_SNAPSHOT_PUBLISH_SECONDS, FLEET_SNAPSHOT_READS
+from .models import Vessel
+from .serializers import VESSEL_COLUMNS
+
+MAGIC = b"FLEETSNP"
+VERSION = 1
+# magic, version, count, published (unix µs), text offset, codes offset, codes length
+HEADER = struct.Struct("<8sIIqQQQ")
+RECORDS_OFFSET = 64
+TEXT_COLUMNS = ("mmsi", "imo_number", "name")
+CODED_COLUMNS = ("type", "flag", "cargo_type", "operator")
+NULL_CODE = 0xFFFF
+NULL_TIME = -(2 ** 63)
+EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+
+
+@lru_cache(maxsize=None)
+def record_dtype():
+    import numpy as np
+    return np.dtype(
+        [("id", "<i8"), ("last_position_lat", "<f8"), ("last_position_lon", "<f8"),
+         ("speed", "<f8"), ("course", "<f8"), ("last_update", "<i8")]
+        + [(f"{column}_{part}", "<i4") for column in TEXT_COLUMNS for part in ("offset", "length")]
+        + [(column, "<u2") for column in CODED_COLUMNS]
+    )
+
+
+def _path(path=None):
+    return path or getattr(settings, "FLEET_SNAPSHOT_PATH", "")
+
+
+# -------------------------
+# PUBLISHING (ingest)
+# -------------------------
+
+def _micros(value):
+    return NULL_TIME if value is None else (value - EPOCH) // timedelta(microseconds=1)
+
+
+def publish(path=None):
+    """Write the current vessels table as a new snapshot generation; returns the vessel count."""
+    import numpy as np
+    path = _path(path)
+    started = time.perf_counter()
+    rows = list(Vessel.objects.order_by("id").values_list(*VESSEL_COLUMNS))
+    columns = dict(zip(VESSEL_COLUMNS, zip(*rows))) if rows else {name: () for name in VESSEL_COLUMNS}
+
+    records = np.zeros(len(rows), dtype=record_dtype())
+    records["id"] = columns["id"]
+    for name in ("last_position_lat", "last_position_lon", "speed", "course"):
+        records[name] = np.array(columns[name], dtype="<f8")  # None -> NaN
+    records["last_update"] = [_micros(value) for value in columns["last_update"]]
+
+    text = []
+    start = 0
+    for name in TEXT_COLUMNS:
+        encoded = [b"" if value is None else value.encode() for value in columns[name]]
+        lengths = np.fromiter(map(len, encoded), dtype="<i8", count=len(encoded))
+        ends = start + np.cumsum(lengths)
+        records[f"{name}_offset"] = ends - lengths
+        records[f"{name}_length"] = np.where([value is None for value in columns[name]], -1, lengths)
+        text.append(b"".join(encoded))
+        start = int(ends[-1]) if len(ends) else start
+    text = b"".join(text)
+
+    codes = {}
+    for name in CODED_COLUMNS:
+        table = {}
+        records[name] = [NULL_CODE if value is None else table.setdefault(value, len(table))
+                         for value in columns[name]]
+        codes[name] = list(table)
+    encoded_codes = json.dumps(codes).encode()
+
+    text_offset = RECORDS_OFFSET + records.nbytes
+    codes_offset = text_offset + len(text)
+    header = HEADER.pack(MAGIC, VERSION, len(rows), _micros(datetime.now(dt_timezone.utc)),
+                         text_offset, codes_offset, len(encoded_codes))
+    temporary = f"{path}.{os.getpid()}.tmp"
+    with open(temporary, "wb") as output:
+        output.write(header.ljust(RECORDS_OFFSET, b"\0"))
+        output.write(records.tobytes())
+        output.write(text)
+        output.write(encoded_codes)
+    os.replace(temporary, path)
+    FLEET_SNAPSHOT_PUBLISH_SECONDS.observe(time.perf_counter() - started)
+    return len(rows)
+
+
+# -------------------------
+# READING (web workers)
+# -------------------------
+
+class Snapshot:
+    """One mapped generation of the snapshot file."""
+
+    def __init__(self, path):
+        import numpy as np
+        with open(path, "rb") as source:
+            self.stat = os.fstat(source.fileno())
+            self.buffer = mmap.mmap(source.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, count, published, text_offset, codes_offset, codes_length = \
+            HEADER.unpack_from(self.buffer)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a version {VERSION} fleet snapshot")
+        self.published = published / 1e6
+        self.records = np.frombuffer(self.buffer, dtype=record_dtype(), count=count, offset=RECORDS_OFFSET)
+        self.text = memoryview(self.buffer)[text_offset:codes_offset]
+        self.codes = json.loads(self.buffer[codes_offset:codes_offset + codes_length])
+        self._lock = threading.Lock()
+        self._users = 0
+        self._retired = False
+
+    def age(self):
+        return time.time() - self.published
+
+    def pin(self):
+        """Count one more user; False once retired (a newer generation replaced it)."""
+        with self._lock:
+            if self._retired:
+                return False
+            self._users += 1
+            return True
+
+    def unpin(self):
+        with self._lock:
+            self._users -= 1
+            done = self._retired and not self._users
+        if done:
+            self.close()
+
+    def retire(self):
+        """No new users; unmapped now or when the last one unpins."""
+        with self._lock:
+            self._retired = True
+            done = not self._users
+        if done:
+            self.close()
+
+    def close(self):
+        # The views into the mapping go first: mmap.close() refuses while they exist
+        self.text.release()
+        self.records = None
+        try:
+            self.buffer.close()
+        except BufferError:
+            # An array from positions() outlived its block: unmapped with its last reference instead
+            pass
+
+    def _select(self, fleet, bbox):
+        """The records of `fleet`'s operator inside `bbox` (a view of the mapping when unfiltered)."""
+        records = self.records
+        mask = None
+        if fleet is not None:
+            operators = self.codes["operator"]
+            if fleet not in operators:
+                return records[:0]
+            mask = records["operator"] == operators.index(fleet)
+        if bbox is not None:
+            inside = bbox_mask(records["last_position_lat"], records["last_position_lon"], bbox)
+            mask = inside if mask is None else mask & inside
+        return records if mask is None else records[mask]
+
+    def positions(self, fleet=None, bbox=None):
+        """(latitudes, longitudes) arrays of the vessels rows() would return; NaN where unknown."""
+        records = self._select(fleet, bbox)
+        return records["last_position_lat"], records["last_position_lon"]
+
+    def rows(self, fleet=None, bbox=None):
+        """Vessel rows (VESSEL_COLUMNS dicts, id order) of `fleet`'s operator, inside `bbox`."""
+        records = self._select(fleet, bbox)
+
+        values = {"id": records["id"].tolist()}
+        for name in ("last_position_lat", "last_position_lon", "speed", "course"):
+            values[name] = [None if value != value else value for value in records[name].tolist()]
+        values["last_update"] = [None if value == NULL_TIME else EPOCH + timedelta(microseconds=value)
+                                 for value in records["last_update"].tolist()]
+        text = self.text
+        for name in TEXT_COLUMNS:
+            values[name] = [None if length < 0 else str(text[offset:offset + length], "utf-8")
+                            for offset, length in zip(records[f"{name}_offset"].tolist(),
+                                                      records[f"{name}_length"].tolist())]
+        for name in CODED_COLUMNS:
+            table = self.codes[name]
+            values[name] = [None if code == NULL_CODE else table[code] for code in records[name].tolist()]
+        return [dict(zip(VESSEL_COLUMNS, row)) for row in zip(*(values[name] for name in VESSEL_COLUMNS))]
+
+
+def bbox_mask(lat, lon, bbox):
+    """Points inside (min_lon, min_lat, max_lon, max_lat); min_lon > max_lon crosses the antimeridian."""
+    min_lon, min_lat, max_lon, max_lat = bbox
+    inside_lon = (lon >= min_lon) & (lon <= max_lon) if min_lon <= max_lon else (lon >= min_lon) | (lon <= max_lon)
+    return inside_lon & (lat >= min_lat) & (lat <= max_lat)
+
+
+def _same_file(snapshot, stat):
+    return snapshot is not None and (snapshot.stat.st_ino, snapshot.stat.st_mtime_ns) == (stat.st_ino, stat.st_mtime_ns)
+
+
+class SnapshotReader:
+    """The current generation for this process, remapped when the file is replaced."""
+
+    def __init__(self):
+        self._snapshot = None
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def current(self, path=None):
+        """
+        The fresh generation, or None (no file, or stale): stays mapped until
+        the block exits even if a newer one is swapped in meanwhile.
+        """
+        snapshot = self._pinned(_path(path))
+        if snapshot is None:
+            yield None
+            return
+        try:
+            if snapshot.age() > getattr(settings, "FLEET_SNAPSHOT_MAX_AGE", 30):
+                FLEET_SNAPSHOT_READS.inc(result="stale")
+                yield None
+            else:
+                FLEET_SNAPSHOT_READS.inc(result="hit")
+                yield snapshot
+        finally:
+            snapshot.unpin()
+
+    def _pinned(self, path):
+        if not path:
+            return None
+        while True:
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                FLEET_SNAPSHOT_READS.inc(result="missing")
+                return None
+            snapshot = self._snapshot
+            if not _same_file(snapshot, stat):
+                with self._lock:
+                    snapshot = self._snapshot
+                    if not _same_file(snapshot, stat):
+                        old, snapshot = snapshot, Snapshot(path)
+                        self._snapshot = snapshot
+                        if old is not None:
+                            old.retire()
+            # Fails only if another thread retired it since we looked: look again
+            if snapshot.pin():
+                return snapshot
+
+
+reader = SnapshotReader()
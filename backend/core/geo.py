@@ -0,0 +1,85 @@
+"""
+Great-circle helpers shared by the kinematics, anomaly, segmentation and
+congestion code. Every function takes scalars or NumPy arrays (broadcasting).
+"""
+import numpy as np
+
+EARTH_RADIUS_NM = 3440.065
+KM_PER_NM = 1.852
+
+
+def parse_location(text):
+    """Port.location is stored as "lat, lon"; returns (lat, lon) or None."""
+    try:
+        lat, lon = (float(part) for part in (text or "").split(","))
+    except ValueError:
+        return None
+    if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+        return None
+    return lat, lon
+
+
+def haversine_nm(lat1, lon1, lat2, lon2):
+    lat1, lon1, lat2, lon2 = (np.radians(value) for value in (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_NM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def initial_bearing(lat1, lon1, lat2, lon2):
+    """Compass bearing in degrees [0, 360) from point 1 towards point 2."""
+    lat1, lon1, lat2, lon2 = (np.radians(value) for value in (lat1, lon1, lat2, lon2))
+    x = np.sin(lon2 - lon1) * np.cos(lat2)
+    y = np.cos(lat1) * np.sin(lat2) - np.sin(lat1) * np.cos(lat2) * np.cos(lon2 - lon1)
+    return np.degrees(np.arctan2(x, y)) % 360
+
+
+def port_coordinates(rows):
+    """(id, "lat, lon") pairs -> (ids, lats, lons) arrays, skipping unparseable locations."""
+    parsed = [(port_id, *point) for port_id, location in rows if (point := parse_location(location))]
+    if not parsed:
+        return np.empty(0, dtype=np.int64), np.empty(0), np.empty(0)
+    ids, lats, lons = zip(*parsed)
+    return np.array(ids, dtype=np.int64), np.array(lats, dtype=float), np.array(lons, dtype=float)
+
+
+def _unit_vectors(lats, lons):
+    lats, lons = np.radians(lats), np.radians(lons)
+    return np.column_stack((np.cos(lats) * np.cos(lons), np.cos(lats) * np.sin(lons), np.sin(lats)))
+
+
+def nearest_point(lats, lons, target_lats, target_lons, chunk_size=8192):
+    """
+    For every (lat, lon), the index of the nearest target and the distance to
+    it in nm. The nearest target is the largest dot product of unit vectors
+    (float32, `chunk_size` points at a time so memory stays at chunk_size x
+    len(targets)); the distance to it is then computed exactly.
+    """
+    lats, lons = np.atleast_1d(np.asarray(lats, dtype=float)), np.atleast_1d(np.asarray(lons, dtype=float))
+    target_lats, target_lons = np.asarray(target_lats, dtype=float), np.asarray(target_lons, dtype=float)
+    index = np.full(len(lats), -1, dtype=np.int64)
+    if not len(target_lats):
+        return index, np.full(len(lats), np.inf)
+    targets = _unit_vectors(target_lats, target_lons).astype(np.float32).T
+    for start in range(0, len(lats), chunk_size):
+        points = _unit_vectors(lats[start:start + chunk_size], lons[start:start + chunk_size]).astype(np.float32)
+        index[start:start + chunk_size] = (points @ targets).argmax(axis=1)
+    return index, haversine_nm(lats, lons, target_lats[index], target_lons[index])
+
+
+def grid_clusters(lats, lons, cell_degrees):
+    """
+    Map clusters: points binned into cell_degrees squares, one
+    {"lat", "lon", "count"} per non-empty square, placed at the mean of its
+    points. Points with an unknown (NaN / None) position are left out.
+    """
+    lats, lons = np.asarray(lats, dtype=float), np.asarray(lons, dtype=float)
+    known = ~(np.isnan(lats) | np.isnan(lons))
+    lats, lons = lats[known], lons[known]
+    rows = np.floor((lats + 90) / cell_degrees).astype(np.int64)
+    columns = np.floor((lons + 180) / cell_degrees).astype(np.int64)
+    cells, inverse, counts = np.unique(rows * (int(360 / cell_degrees) + 1) + columns,
+                                       return_inverse=True, return_counts=True)
+    mean_lats = np.bincount(inverse, weights=lats, minlength=len(cells)) / counts
+    mean_lons = np.bincount(inverse, weights=lons, minlength=len(cells)) / counts
+    return [{"lat": round(lat, 5), "lon": round(lon, 5), "count": count}
+            for lat, lon, count in zip(mean_lats.tolist(), mean_lons.tolist(), counts.tolist())]
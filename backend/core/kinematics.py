@@ -0,0 +1,260 @@
+"""
+Vessel kinematics derived from AIS track history: smoothed speed over ground,
+heading, distance travelled and great-circle ETA to the destination port of
+the vessel's in-transit voyage. Results live in VesselKinematics.
+
+- recompute_fleet(): one vectorized pass over the trailing track window of
+  every in-transit vessel (`manage.py compute_kinematics`).
+- record_point(): O(1) incremental update for one new AIS point, called from
+  the ingest path (core/ais_stream.py).
+
+Both paths smooth speed and heading exponentially with a SMOOTHING_HALF_LIFE
+half-life, so a batch refresh and a run of incremental updates agree closely.
+"""
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+import numpy as np
+from django.db.models import OuterRef, Subquery
+from django.utils import timezone
+
+from .geo import haversine_nm, initial_bearing, parse_location
+from .models import VesselKinematics, Voyage, VoyageTrack
+from .upsert import upsert
+
+WINDOW_HOURS = 6
+SMOOTHING_HALF_LIFE = 30 * 60   # seconds
+MIN_MOVING_KNOTS = 0.5          # below this there is no meaningful ETA
+MAX_PLAUSIBLE_KNOTS = 60        # faster implied speeds are position glitches, not motion
+MIN_HEADING_NM = 0.01           # shorter hops are GPS jitter and keep the old heading
+VESSEL_BATCH = 2000
+
+UPDATE_FIELDS = [
+    "voyage", "latitude", "longitude", "speed_knots", "heading", "distance_nm", "window_start",
+    "last_point_at", "destination_lat", "destination_lon", "remaining_nm", "eta", "updated_at",
+]
+
+
+def _to_datetime(seconds):
+    return datetime.fromtimestamp(float(seconds), tz=dt_timezone.utc)
+
+
+# -------------------------
+# VECTORIZED CORE
+# -------------------------
+
+def window_kinematics(vessel_ids, lats, lons, seconds, speeds=None, courses=None):
+    """
+    Per-vessel motion over a window of track points.
+
+    Inputs are 1-D arrays sorted by (vessel_id, time), time in epoch seconds.
+    Returns a dict of arrays with one entry per vessel. Segments are weighted
+    by recency (exponential, SMOOTHING_HALF_LIFE). Vessels with no usable
+    segment fall back to their last reported speed/course, when given.
+    """
+    vessel_ids = np.asarray(vessel_ids)
+    lats, lons, seconds = (np.asarray(a, dtype=float) for a in (lats, lons, seconds))
+    if not len(vessel_ids):
+        empty = np.empty(0)
+        return {key: empty for key in ("vessel_id", "latitude", "longitude", "first_seconds",
+                                        "last_seconds", "distance_nm", "speed_knots", "heading")}
+
+    new_vessel = np.r_[True, vessel_ids[1:] != vessel_ids[:-1]]
+    starts = np.flatnonzero(new_vessel)
+    ends = np.r_[starts[1:], len(vessel_ids)] - 1
+    n = len(starts)
+    segment_vessel = (np.cumsum(new_vessel) - 1)[1:]
+
+    distance = haversine_nm(lats[:-1], lons[:-1], lats[1:], lons[1:])
+    dt = np.diff(seconds)
+    implied = np.divide(distance * 3600, dt, out=np.full_like(distance, np.inf), where=dt > 0)
+    valid = ~new_vessel[1:] & (dt > 0) & (implied <= MAX_PLAUSIBLE_KNOTS)
+    distance = np.where(valid, distance, 0.0)
+    dt = np.where(valid, dt, 0.0)
+
+    age = seconds[ends][segment_vessel] - seconds[1:]
+    weight = 0.5 ** (age / SMOOTHING_HALF_LIFE)
+    travelled = np.bincount(segment_vessel, weights=distance, minlength=n)
+    weighted_distance = np.bincount(segment_vessel, weights=weight * distance, minlength=n)
+    weighted_time = np.bincount(segment_vessel, weights=weight * dt, minlength=n)
+    speed = np.divide(weighted_distance * 3600, weighted_time, out=np.zeros(n), where=weighted_time > 0)
+
+    bearing = np.radians(initial_bearing(lats[:-1], lons[:-1], lats[1:], lons[1:]))
+    heading_weight = np.where(distance >= MIN_HEADING_NM, weight * distance, 0.0)
+    east = np.bincount(segment_vessel, weights=heading_weight * np.sin(bearing), minlength=n)
+    north = np.bincount(segment_vessel, weights=heading_weight * np.cos(bearing), minlength=n)
+    heading = np.degrees(np.arctan2(east, north)) % 360
+    heading[(east == 0) & (north == 0)] = np.nan
+
+    no_motion = weighted_time == 0
+    if speeds is not None:
+        speed = np.where(no_motion, np.nan_to_num(np.asarray(speeds, dtype=float)[ends]), speed)
+    if courses is not None:
+        heading = np.where(np.isnan(heading), np.asarray(courses, dtype=float)[ends], heading)
+
+    return {
+        "vessel_id": vessel_ids[starts],
+        "latitude": lats[ends],
+        "longitude": lons[ends],
+        "first_seconds": seconds[starts],
+        "last_seconds": seconds[ends],
+        "distance_nm": travelled,
+        "speed_knots": speed,
+        "heading": heading,
+    }
+
+
+def estimate_eta(lats, lons, last_seconds, speeds, dest_lats, dest_lons):
+    """Great-circle (remaining_nm, eta epoch seconds); NaN without destination or motion."""
+    remaining = haversine_nm(lats, lons, dest_lats, dest_lons)
+    speeds = np.asarray(speeds, dtype=float)
+    hours = np.divide(remaining, speeds, out=np.full_like(remaining, np.nan), where=speeds >= MIN_MOVING_KNOTS)
+    return remaining, np.asarray(last_seconds, dtype=float) + hours * 3600
+
+
+# -------------------------
+# BATCH: WHOLE IN-TRANSIT FLEET
+# -------------------------
+
+def _active_voyages(vessel_ids=None):
+    """vessel_id -> (voyage_id, (dest_lat, dest_lon) or None); latest departure wins."""
+    voyages = Voyage.objects.filter(status="In Transit", vessel__isnull=False)
+    if vessel_ids is not None:
+        voyages = voyages.filter(vessel_id__in=vessel_ids)
+    active = {}
+    for vessel_id, voyage_id, location in voyages.order_by("vessel_id", "departure_time").values_list(
+            "vessel_id", "id", "port_to__location"):
+        active[vessel_id] = (voyage_id, parse_location(location))
+    return active
+
+
+def recompute_fleet(window_hours=WINDOW_HOURS, now=None, batch_size=VESSEL_BATCH):
+    """
+    Recompute kinematics and ETAs for every in-transit vessel from its last
+    `window_hours` of track points. Returns the number of vessels written.
+    """
+    now = now or timezone.now()
+    since = now - timedelta(hours=window_hours)
+    active = _active_voyages()
+    vessel_ids = sorted(active)
+    written = 0
+
+    for i in range(0, len(vessel_ids), batch_size):
+        chunk = vessel_ids[i:i + batch_size]
+        rows = list(
+            VoyageTrack.objects.filter(vessel_id__in=chunk, timestamp__gte=since, timestamp__lte=now)
+            .order_by("vessel_id", "timestamp", "id")
+            .values_list("vessel_id", "latitude", "longitude", "timestamp", "speed", "course")
+        )
+        if not rows:
+            continue
+        ids, lats, lons, stamps, speeds, courses = zip(*rows)
+        state = window_kinematics(
+            np.array(ids), lats, lons, [stamp.timestamp() for stamp in stamps],
+            speeds=np.array(speeds, dtype=float), courses=np.array(courses, dtype=float),
+        )
+
+        destinations = [active[vessel_id][1] or (np.nan, np.nan) for vessel_id in state["vessel_id"]]
+        dest_lats, dest_lons = (np.array(values, dtype=float) for values in zip(*destinations))
+        remaining, etas = estimate_eta(state["latitude"], state["longitude"], state["last_seconds"],
+                                       state["speed_knots"], dest_lats, dest_lons)
+
+        objects = []
+        for j, vessel_id in enumerate(state["vessel_id"].tolist()):
+            objects.append(VesselKinematics(
+                vessel_id=vessel_id,
+                voyage_id=active[vessel_id][0],
+                latitude=float(state["latitude"][j]),
+                longitude=float(state["longitude"][j]),
+                speed_knots=float(state["speed_knots"][j]),
+                heading=None if np.isnan(state["heading"][j]) else float(state["heading"][j]),
+                distance_nm=float(state["distance_nm"][j]),
+                window_start=_to_datetime(state["first_seconds"][j]),
+                last_point_at=_to_datetime(state["last_seconds"][j]),
+                destination_lat=None if np.isnan(dest_lats[j]) else float(dest_lats[j]),
+                destination_lon=None if np.isnan(dest_lons[j]) else float(dest_lons[j]),
+                remaining_nm=None if np.isnan(remaining[j]) else float(remaining[j]),
+                eta=None if np.isnan(etas[j]) else _to_datetime(etas[j]),
+                updated_at=now,
+            ))
+        upsert(VesselKinematics, objects, unique_fields=["vessel"], update_fields=UPDATE_FIELDS)
+        written += len(objects)
+    return written
+
+
+# -------------------------
+# INCREMENTAL: ONE NEW POINT
+# -------------------------
+
+def advance(kinematics, lat, lon, when, reported_course=None):
+    """
+    Fold one new position into `kinematics` (unsaved). Out-of-order points and
+    implausible jumps are ignored. Returns True if the state changed.
+    """
+    dt = (when - kinematics.last_point_at).total_seconds()
+    if dt <= 0:
+        return False
+    distance = float(haversine_nm(kinematics.latitude, kinematics.longitude, lat, lon))
+    implied = distance * 3600 / dt
+    if implied > MAX_PLAUSIBLE_KNOTS:
+        return False
+
+    alpha = 1 - 0.5 ** (dt / SMOOTHING_HALF_LIFE)
+    kinematics.speed_knots += alpha * (implied - kinematics.speed_knots)
+    if distance >= MIN_HEADING_NM:
+        bearing = np.radians(initial_bearing(kinematics.latitude, kinematics.longitude, lat, lon))
+        if kinematics.heading is None:
+            kinematics.heading = float(np.degrees(bearing))
+        else:
+            old = np.radians(kinematics.heading)
+            east = (1 - alpha) * np.sin(old) + alpha * np.sin(bearing)
+            north = (1 - alpha) * np.cos(old) + alpha * np.cos(bearing)
+            kinematics.heading = float(np.degrees(np.arctan2(east, north)) % 360)
+    elif kinematics.heading is None and reported_course is not None:
+        kinematics.heading = float(reported_course)
+
+    kinematics.distance_nm += distance
+    kinematics.latitude, kinematics.longitude, kinematics.last_point_at = lat, lon, when
+    _update_eta(kinematics)
+    return True
+
+
+def _update_eta(kinematics):
+    if kinematics.destination_lat is None or kinematics.destination_lon is None:
+        kinematics.remaining_nm = kinematics.eta = None
+        return
+    remaining, eta = estimate_eta(kinematics.latitude, kinematics.longitude, kinematics.last_point_at.timestamp(),
+                                  kinematics.speed_knots, kinematics.destination_lat, kinematics.destination_lon)
+    kinematics.remaining_nm = float(remaining)
+    kinematics.eta = None if np.isnan(eta) else _to_datetime(eta)
+
+
+def record_point(vessel_id, lat, lon, when, reported_speed=None, reported_course=None):
+    """Ingest hook: update (or start) the vessel's stored kinematics with one point."""
+    # The vessel's in-transit voyage now (latest departure, as in _active_voyages) comes in the same query
+    active = Voyage.objects.filter(vessel_id=OuterRef("vessel_id"), status="In Transit") \
+        .order_by("-departure_time", "-id").values("id")[:1]
+    kinematics = VesselKinematics.objects.filter(vessel_id=vessel_id) \
+        .annotate(active_voyage_id=Subquery(active)).first()
+    if kinematics is None:
+        voyage_id, destination = _active_voyages([vessel_id]).get(vessel_id, (None, None))
+        kinematics = VesselKinematics(
+            vessel_id=vessel_id, voyage_id=voyage_id, latitude=lat, longitude=lon,
+            speed_knots=float(reported_speed or 0), heading=reported_course,
+            window_start=when, last_point_at=when,
+            destination_lat=destination[0] if destination else None,
+            destination_lon=destination[1] if destination else None,
+        )
+        _update_eta(kinematics)
+        kinematics.save()
+        return kinematics
+    changed = advance(kinematics, lat, lon, when, reported_course)
+    if kinematics.active_voyage_id != kinematics.voyage_id:
+        # Arrived, or off on a new voyage: ETA and remaining distance follow the new destination
+        voyage_id, destination = _active_voyages([vessel_id]).get(vessel_id, (None, None))
+        kinematics.voyage_id = voyage_id
+        kinematics.destination_lat, kinematics.destination_lon = destination or (None, None)
+        _update_eta(kinematics)
+        changed = True
+    if changed:
+        kinematics.save()
+    return kinematics
@@ -0,0 +1,80 @@
+"""
+KPI counters shared by /dashboard/ and /analytics/.
+
+Each table's counters are conditional aggregates (Count(filter=Q(...))), so
+everything a table contributes comes from one pass over it. fetch() goes
+further and reads several tables' counters in one statement: every table's
+aggregate is a one-row derived table, cross-joined into a single row.
+
+A predicate every counter of a table shares belongs in the queryset (WHERE,
+where indexes apply), and plain totals are rows() (COUNT(*), which the
+databases answer without reading rows); filter= is for splitting one pass.
+
+The analytics breakdowns reuse the same definitions inside their GROUP BYs
+(e.g. in-transit voyages per day), so a total never needs its own query.
+"""
+from django.core.exceptions import EmptyResultSet
+from django.db import connections, router
+from django.db.models import Avg, Count, Q, Value
+
+HIGH_CONGESTION = 90
+IN_TRANSIT = Q(status="In Transit")
+
+
+def rows():
+    return Count("*")
+
+
+def vessel_counters():
+    return {"total": rows()}
+
+
+def voyage_counters():
+    return {"in_transit": Count("id", filter=IN_TRANSIT)}
+
+
+def port_counters():
+    return {
+        "high_congestion": Count("id", filter=Q(congestion_score__gt=HIGH_CONGESTION)),
+        "avg_wait": Avg("avg_wait_time"),
+    }
+
+
+def risk_counters():
+    return {"total": rows()}
+
+
+def _one_row_sql(queryset, counters, prefix, connection):
+    # Grouping by a constant groups by nothing: one row, even for an empty table
+    aliased = {f"{prefix}__{name}": counter for name, counter in counters.items()}
+    rows = (queryset.order_by().annotate(_kpi_group=Value(1)).values("_kpi_group")
+            .annotate(**aliased).values(*aliased))
+    return rows.query.get_compiler(connection=connection).as_sql()
+
+
+def fetch(**tables):
+    """
+    fetch(vessels=(queryset, counters), ports=(...), ...) ->
+    {"vessels": {"total": ...}, "ports": {...}} in one query.
+    """
+    model = next(iter(tables.values()))[0].model
+    connection = connections[router.db_for_read(model) or "default"]
+    values = {prefix: {} for prefix in tables}
+    parts, params, names = [], [], []
+    for i, (prefix, (queryset, counters)) in enumerate(tables.items()):
+        try:
+            sql, part_params = _one_row_sql(queryset, counters, prefix, connection)
+        except EmptyResultSet:  # .none() and the like: what the aggregates give over no rows
+            values[prefix] = {name: counter.empty_result_set_value for name, counter in counters.items()}
+            continue
+        parts.append(f"({sql}) {connection.ops.quote_name(f'kpi_{i}')}")
+        params.extend(part_params)
+        names.extend((prefix, name) for name in counters)
+
+    if parts:
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT * FROM " + " CROSS JOIN ".join(parts), params)
+            row = cursor.fetchone()
+        for (prefix, name), value in zip(names, row):
+            values[prefix][name] = value
+    return values
@@ -0,0 +1,116 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from core import benchmarks
+from core.test_runner import UnmanagedModelTestRunner
+
+
+class Command(BaseCommand):
+    help = 'Benchmarks API endpoints and AIS ingest against synthetic fleets (writes JSON results)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=list(benchmarks.DEFAULT_SIZES),
+                            help='Fleet sizes to benchmark (default: 1000 10000 100000)')
+        parser.add_argument('--iterations', type=int, default=20, help='Timed requests per endpoint')
+        parser.add_argument('--tracks-per-vessel', type=int, default=20)
+        parser.add_argument('--track-vessels', type=int, default=1000,
+                            help='How many vessels get a track history')
+        parser.add_argument('--frames', help='Recorded aisstream frames (JSONL) for the ingest benchmark')
+        parser.add_argument('--ingest-frames', type=int, default=2000,
+                            help='Synthetic frames to replay when --frames is not given (0 to skip)')
+        parser.add_argument('--db-latency-ms', type=float, default=0,
+                            help='Simulated per-query round trip for the sync vs async comparison')
+        parser.add_argument('--output', default='bench_results.json')
+        parser.add_argument('--compare', help='Previous results file to compare p50 latencies against')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError(
+                "Benchmarks run on SQLite for reproducibility: "
+                "DB_ENGINE=django.db.backends.sqlite3 python manage.py bench_api"
+            )
+
+        report = {"environment": benchmarks.environment(), "results": {}, "serialization": {},
+                  "compression": {}, "ingest": {}, "rate_limit": {},
+                  "async": {}}
+        setup_test_environment()
+        try:
+            for size in options['sizes']:
+                results, serialization, compression, ingest, rate_limit, async_views = self.run_size(size, options)
+                report["results"][str(size)] = results
+                report["serialization"][str(size)] = serialization
+                report["compression"][str(size)] = compression
+                report["ingest"][str(size)] = ingest
+                report["rate_limit"][str(size)] = rate_limit
+                report["async"][str(size)] = async_views
+        finally:
+            teardown_test_environment()
+
+        with open(options['output'], 'w') as f:
+            json.dump(report, f, indent=2)
+        self.stdout.write(self.style.SUCCESS(f"Results written to {options['output']}"))
+
+        if options['compare']:
+            with open(options['compare']) as f:
+                baseline = json.load(f)
+            for size, changes in benchmarks.compare(report, baseline).items():
+                for name, change in changes.items():
+                    line = f"  {size:>7} {name:<14} {change:+.1%}"
+                    self.stdout.write(self.style.ERROR(line) if change > 0.1 else line)
+
+    def run_size(self, size, options):
+        runner = UnmanagedModelTestRunner(verbosity=0, interactive=False)
+        old_config = runner.setup_databases()
+        try:
+            self.stdout.write(f"Building fleet of {size} vessels...")
+            benchmarks.build_fleet(size, options['tracks_per_vessel'], options['track_vessels'])
+
+            results = benchmarks.bench_api(options['iterations'])
+            for name, stats in results.items():
+                self.stdout.write(
+                    f"  {size:>7} {name:<14} p50 {stats['p50_ms']:>9.2f} ms  p95 {stats['p95_ms']:>9.2f} ms  "
+                    f"{stats['throughput_rps']:>8.1f} req/s  {stats['peak_memory_kb']:>9.0f} KB  "
+                    f"{stats['queries']} queries"
+                )
+
+            serialization = benchmarks.bench_vessel_serialization()
+            self.stdout.write(
+                f"  {size:>7} /vessels/ body  serializer {serialization['model_serializer_ms']} ms, "
+                f"fast path {serialization['fast_path_ms']} ms ({serialization['speedup']}x)"
+            )
+
+            compression = benchmarks.bench_compression()
+            for name, entry in compression.items():
+                summary = ", ".join(
+                    f"{coding} {stats['ratio']}x/{stats['cpu_ms']}ms" for coding, stats in entry["encodings"].items()
+                )
+                self.stdout.write(f"  {size:>7} {name:<14} {entry['raw_bytes']} B raw: {summary}")
+
+            ingest = {}
+            if options['frames']:
+                ingest = benchmarks.bench_ingest(benchmarks.load_frames(options['frames']))
+            elif options['ingest_frames']:
+                ingest = benchmarks.bench_ingest(benchmarks.synthetic_frames(options['ingest_frames']))
+            if ingest:
+                self.stdout.write(f"  {size:>7} ingest         {ingest['messages_per_sec']} msg/s  "
+                                  f"p50 {ingest['p50_ms']} ms")
+
+            rate_limit = benchmarks.bench_rate_limit()
+            self.stdout.write(
+                f"  {size:>7} rate limit     {rate_limit['local_check_us']} us/check local, "
+                f"{rate_limit['cache_check_us']} us/check cache, {rate_limit['overhead_ms']:+} ms on /ports/ p50"
+            )
+
+            async_views = benchmarks.bench_async(options['iterations'], db_latency_ms=options['db_latency_ms'])
+            for name, entry in async_views.items():
+                self.stdout.write(
+                    f"  {size:>7} {name:<14} WSGI p50 {entry['wsgi_p50_ms']} ms, ASGI p50 {entry['asgi_p50_ms']} ms "
+                    f"(queries: sum {entry['queries_sum_ms']} ms, max {entry['queries_max_ms']} ms); "
+                    f"concurrent {entry['wsgi_concurrent_rps']} vs {entry['asgi_concurrent_rps']} req/s"
+                )
+            return results, serialization, compression, ingest, rate_limit, async_views
+        finally:
+            runner.teardown_databases(old_config)
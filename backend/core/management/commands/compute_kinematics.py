@@ -0,0 +1,26 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core import kinematics
+
+
+class Command(BaseCommand):
+    help = 'Recomputes speed, heading, distance and ETA for every in-transit vessel from recent track points'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--window-hours', type=float, default=kinematics.WINDOW_HOURS,
+                            help='Track history to use per vessel')
+        parser.add_argument('--batch-size', type=int, default=kinematics.VESSEL_BATCH,
+                            help='Vessels loaded per query')
+
+    def handle(self, *args, **options):
+        if options['window_hours'] <= 0 or options['batch_size'] <= 0:
+            raise CommandError("--window-hours and --batch-size must be positive")
+
+        self.stdout.write(f"Computing kinematics over the last {options['window_hours']}h of tracks...")
+        started = time.perf_counter()
+        written = kinematics.recompute_fleet(options['window_hours'], batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Updated {written} vessels in {time.perf_counter() - started:.2f}s"
+        ))
@@ -0,0 +1,32 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from core import anomalies
+
+
+class Command(BaseCommand):
+    help = 'Backfills Position Jump / Speed Drop / AIS Gap events by scanning historical voyage tracks'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=float, default=None,
+                            help='Only scan points from the last N days (default: all history)')
+        parser.add_argument('--chunk-size', type=int, default=50000, help='Track rows read per query')
+        parser.add_argument('--dry-run', action='store_true', help='Count anomalies without writing events')
+
+    def handle(self, *args, **options):
+        if options['chunk_size'] <= 0:
+            raise CommandError("--chunk-size must be positive")
+        since = timezone.now() - timedelta(days=options['days']) if options['days'] else None
+
+        self.stdout.write("Scanning voyage tracks for anomalies...")
+        started = time.perf_counter()
+        scanned, found, written = anomalies.backfill(since, options['chunk_size'], write=not options['dry_run'])
+        elapsed = time.perf_counter() - started
+        if options['dry_run']:
+            summary = f"Found {found} anomalies in {scanned} points"
+        else:
+            summary = f"Recorded {written} new anomalies ({found} found) in {scanned} points"
+        self.stdout.write(self.style.SUCCESS(f"✅ {summary} ({elapsed:.2f}s)"))
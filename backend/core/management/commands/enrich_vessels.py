@@ -1,6 +1,8 @@
 import random
 from django.core.management.base import BaseCommand
+from django.utils import timezone
 from core.models import Vessel
+from core.metrics import ENRICHMENT_CALLS
 
 class Command(BaseCommand):
     help = 'Enriches vessel data with realistic dummy values where data is missing'
@@ -43,8 +45,10 @@ class Command(BaseCommand):
 
             # Save only if we updated something
             if changed:
+                v.last_update = timezone.now()  # search indexes in other processes reload on it
                 v.save()
                 updated_count += 1
+                ENRICHMENT_CALLS.inc(source="command", result="success")
                 self.stdout.write(f"Updated {v.name} -> {v.type} ({v.flag})")
 
         self.stdout.write(self.style.SUCCESS(f'Successfully enriched {updated_count} vessels!'))
\ No newline at end of file
@@ -5,6 +5,31 @@ from django.core.management.base import BaseCommand
 from django.utils import timezone
 from core.models import Vessel, Voyage, VoyageTrack, Port
 
+def build_track_points(vessel, points=20, now=None):
+    """Simulated hourly path ending at the vessel's last position (unsaved rows)."""
+    now = now or timezone.now()
+    current_lat = vessel.last_position_lat or 0.0
+    current_lon = vessel.last_position_lon or 0.0
+    tracks = []
+    for i in range(points):
+        time_offset = timedelta(minutes=60 * i)
+        timestamp = now - time_offset
+
+        # Simple curve math
+        lat_offset = (i * 0.05) + (math.sin(i * 0.2) * 0.02)
+        lon_offset = (i * 0.05) + (math.cos(i * 0.2) * 0.02)
+
+        tracks.append(VoyageTrack(
+            vessel=vessel,
+            latitude=current_lat - lat_offset,
+            longitude=current_lon - lon_offset,
+            speed=random.uniform(10, 18),
+            course=random.uniform(0, 360),
+            timestamp=timestamp
+        ))
+    return tracks
+
+
 class Command(BaseCommand):
     help = 'Generates realistic historical tracks for ALL vessels'
 
@@ -45,22 +70,7 @@ class Command(BaseCommand):
             if current_lat == 0 and current_lon == 0:
                 continue
 
-            for i in range(20):
-                time_offset = timedelta(minutes=60 * i)
-                timestamp = timezone.now() - time_offset
-
-                # Simple curve math
-                lat_offset = (i * 0.05) + (math.sin(i * 0.2) * 0.02)
-                lon_offset = (i * 0.05) + (math.cos(i * 0.2) * 0.02)
-
-                VoyageTrack.objects.create(
-                    vessel=vessel,
-                    latitude=current_lat - lat_offset,
-                    longitude=current_lon - lon_offset,
-                    speed=random.uniform(10, 18),
-                    course=random.uniform(0, 360),
-                    timestamp=timestamp
-                )
+            VoyageTrack.objects.bulk_create(build_track_points(vessel))
             
             count += 1
             if count % 10 == 0:
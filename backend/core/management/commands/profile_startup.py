@@ -0,0 +1,41 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core import startup
+
+
+class Command(BaseCommand):
+    help = 'Measures cold-start time and the import-time breakdown of the web, ASGI and ingest processes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('targets', nargs='*',
+                            help=f"Processes to profile: {', '.join(startup.TARGETS)} (default: web ingest)")
+        parser.add_argument('--repeat', type=int, default=5, help='Cold starts per target (median is reported)')
+        parser.add_argument('--top', type=int, default=15, help='Modules to list per target')
+        parser.add_argument('--json', action='store_true', help='Print the report as JSON')
+
+    def handle(self, *args, **options):
+        targets = options['targets'] or ['web', 'ingest']
+        unknown = set(targets) - set(startup.TARGETS)
+        if unknown:
+            raise CommandError(f"Unknown target(s): {', '.join(sorted(unknown))}")
+
+        reports = [startup.profile(target, options['repeat'], options['top']) for target in targets]
+        if options['json']:
+            self.stdout.write(json.dumps(reports, indent=2))
+            return
+
+        for report in reports:
+            self.stdout.write(self.style.SUCCESS(
+                f"✅ {report['target']}: {report['wall_ms']} ms cold start, "
+                f"{report['imports_ms']} ms in {report['modules']} imports"
+            ))
+            if report['heavy']:
+                self.stdout.write(f"  loads {', '.join(report['heavy'])}")
+            self.stdout.write("  slowest top-level imports (cumulative):")
+            for name, ms in report['top_level']:
+                self.stdout.write(f"    {ms:>8.1f} ms  {name}")
+            self.stdout.write("  slowest modules (self):")
+            for name, ms in report['slowest_self']:
+                self.stdout.write(f"    {ms:>8.1f} ms  {name}")
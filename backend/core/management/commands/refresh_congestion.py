@@ -0,0 +1,14 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.unctad_loader import fetch_unctad_ports
+
+
+class Command(BaseCommand):
+    help = 'Recomputes port congestion scores and wait times from live vessel positions and observed waits'
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        fetch_unctad_ports()
+        self.stdout.write(self.style.SUCCESS(f"✅ Congestion refreshed in {time.perf_counter() - started:.2f}s"))
@@ -0,0 +1,56 @@
+import asyncio
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core import ais_replay, anomalies
+
+
+class Command(BaseCommand):
+    help = 'Replays recorded aisstream frames (JSONL / .jsonl.gz) through the ingest handler'
+
+    def add_arguments(self, parser):
+        parser.add_argument('recording', help='File written by stream_ais --record (or with AIS_RECORD_PATH set)')
+        pacing = parser.add_mutually_exclusive_group()
+        pacing.add_argument('--speed', type=float, default=None,
+                            help='Replay speed multiplier (1 = real time, 10 = 10x)')
+        pacing.add_argument('--max', action='store_true', help='As fast as possible (default)')
+        parser.add_argument('--source', choices=['file', 'websocket'], default='file',
+                            help='Feed the handler directly, or through a local websocket stand-in')
+        parser.add_argument('--port', type=int, default=8765, help='Port for the websocket stand-in')
+        parser.add_argument('--limit', type=int, default=None, help='Stop after this many frames')
+        parser.add_argument('--json', action='store_true', help='Print the report as JSON')
+
+    def handle(self, *args, **options):
+        speed = None if options['max'] else options['speed']
+        if speed is not None and speed <= 0:
+            raise CommandError("--speed must be positive")
+
+        mode = f"{speed}x" if speed else "max speed"
+        self.stdout.write(f"Replaying {options['recording']} via {options['source']} at {mode}...")
+
+        if options['source'] == 'websocket':
+            coro = ais_replay.replay_websocket(options['recording'], speed, port=options['port'],
+                                               limit=options['limit'])
+        else:
+            coro = ais_replay.replay_file(options['recording'], speed, limit=options['limit'])
+
+        try:
+            report = asyncio.run(coro).report()
+        except KeyboardInterrupt:
+            self.stdout.write("🛑 Replay stopped.")
+            return
+        finally:
+            anomalies.detector.flush()  # write anomalies still buffered by the ingest handler
+
+        if options['json']:
+            self.stdout.write(json.dumps(report, indent=2))
+            return
+        self.stdout.write(self.style.SUCCESS(
+            f"{report['frames']} frames ({report['stored']} stored) in {report['elapsed_s']} s: "
+            f"{report['messages_per_sec']} msg/s sustained"
+        ))
+        self.stdout.write(
+            f"Write lag p50 {report['write_lag_p50_ms']} ms, p95 {report['write_lag_p95_ms']} ms, "
+            f"max {report['write_lag_max_ms']} ms"
+        )
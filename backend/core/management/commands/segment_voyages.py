@@ -0,0 +1,41 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core import segmentation
+
+
+class Command(BaseCommand):
+    help = 'Detects port calls in AIS tracks and opens / closes voyages and port counters to match'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--backfill', action='store_true',
+                            help='Process the whole track history instead of only new points')
+        parser.add_argument('--reset', action='store_true',
+                            help='With --backfill: forget stored port-call state and start over')
+        parser.add_argument('--chunk-size', type=int, default=segmentation.CHUNK_SIZE,
+                            help='Track rows read per query')
+        parser.add_argument('--radius-nm', type=float, default=segmentation.PORT_RADIUS_NM,
+                            help='Distance from a port that counts as being at it')
+
+    def handle(self, *args, **options):
+        if options['chunk_size'] <= 0:
+            raise CommandError("--chunk-size must be positive")
+        if options['reset'] and not options['backfill']:
+            raise CommandError("--reset only applies to --backfill")
+
+        segmenter = segmentation.Segmenter(radius_nm=options['radius_nm'])
+        if not len(segmenter.port_ids):
+            raise CommandError("No ports with a parseable location")
+
+        self.stdout.write("Segmenting voyage tracks into port calls...")
+        started = time.perf_counter()
+        if options['backfill']:
+            segmentation.backfill(options['chunk_size'], reset=options['reset'], segmenter=segmenter)
+        else:
+            segmentation.incremental(options['chunk_size'], segmenter=segmenter)
+        stats = segmenter.stats
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ {stats['points']} points: {stats['arrivals']} arrivals, {stats['departures']} departures "
+            f"({time.perf_counter() - started:.2f}s)"
+        ))
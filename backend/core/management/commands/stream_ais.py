@@ -0,0 +1,28 @@
+import asyncio
+
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = 'Streams live AIS positions from aisstream.io into the database'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default=None, help='Websocket URL (default: AIS_STREAM_URL)')
+        parser.add_argument('--record', default=None,
+                            help='Append raw frames to this .jsonl / .jsonl.gz file (default: AIS_RECORD_PATH)')
+        parser.add_argument('--metrics-port', type=int, default=None,
+                            help='Serve Prometheus metrics on this port (default: AIS_METRICS_PORT)')
+
+    def handle(self, *args, **options):
+        # Imported here so websockets only loads in the ingest process
+        from core import ais_stream, metrics
+
+        port = options['metrics_port'] or ais_stream.METRICS_PORT
+        if port:
+            metrics.start_http_server(int(port))
+            self.stdout.write(f"📈 Ingest metrics on :{port}/metrics")
+
+        try:
+            asyncio.run(ais_stream.connect_ais_stream(options['url'], options['record']))
+        except KeyboardInterrupt:
+            self.stdout.write("🛑 AIS Stream stopped.")
@@ -0,0 +1,262 @@
+"""
+Lightweight in-process metrics (counters, gauges, histograms) rendered in the
+Prometheus text exposition format.
+
+Metrics are process-local: each gunicorn worker and the AIS ingest process keep
+their own registry. Web workers expose theirs at /metrics/; the ingest process
+can serve its own via start_http_server() (see core/ais_stream.py).
+"""
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    kind = "untyped"
+
+    def __init__(self, name, documentation, labelnames=(), registry=None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        (registry or REGISTRY).register(self)
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def samples(self):
+        with self._lock:
+            return [(self.name, key, (), value) for key, value in self._values.items()]
+
+    def render(self):
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.kind}",
+        ]
+        for name, key, extra, value in self.samples():
+            lines.append(f"{name}{_format_labels(self.labelnames, key, extra)} {_format_value(value)}")
+        return "\n".join(lines)
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        if amount < 0:
+            raise ValueError("Counters can only increase")
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(self._key(labels), 0)
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._function = None
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def set_function(self, function):
+        """Compute the (unlabelled) value lazily at scrape time."""
+        self._function = function
+
+    def value(self, **labels):
+        return self._values.get(self._key(labels), 0)
+
+    def samples(self):
+        if self._function is not None:
+            try:
+                value = self._function()
+            except Exception:
+                return []
+            return [] if value is None else [(self.name, (), (), value)]
+        return super().samples()
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS, registry=None):
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        super().__init__(name, documentation, labelnames, registry)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[0][i] += 1
+                    break
+            state[1] += value
+            state[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def count(self, **labels):
+        state = self._values.get(self._key(labels))
+        return state[2] if state else 0
+
+    def samples(self):
+        out = []
+        with self._lock:
+            items = [(key, list(state[0]), state[1], state[2]) for key, state in self._values.items()]
+        for key, bucket_counts, total, count in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, bucket_counts):
+                cumulative += bucket_count
+                out.append((f"{self.name}_bucket", key, (("le", _format_value(float(bound))),), cumulative))
+            out.append((f"{self.name}_sum", key, (), total))
+            out.append((f"{self.name}_count", key, (), count))
+        return out
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric {metric.name} already registered")
+            self._metrics[metric.name] = metric
+
+    def get(self, name):
+        return self._metrics.get(name)
+
+    def render(self):
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return "\n".join(metric.render() for metric in metrics) + "\n"
+
+
+REGISTRY = Registry()
+
+
+# -------------------------
+# METRIC DEFINITIONS
+# -------------------------
+
+# AIS ingest (core/ais_stream.py)
+AIS_MESSAGES_RECEIVED = Counter(
+    "ais_messages_received_total", "Raw frames received from the AIS stream")
+AIS_MESSAGES_PARSED = Counter(
+    "ais_messages_parsed_total", "Position reports parsed and queued for the database")
+AIS_MESSAGES_DROPPED = Counter(
+    "ais_messages_dropped_total", "Frames dropped before reaching the database", ["reason"])
+AIS_DB_FLUSH_SECONDS = Histogram(
+    "ais_db_flush_seconds", "Latency of writing one position report to the database")
+AIS_DB_ERRORS = Counter(
+    "ais_db_errors_total", "Position reports that failed to write")
+AIS_LAST_MESSAGE_TIMESTAMP = Gauge(
+    "ais_last_message_timestamp_seconds", "Unix time of the last successfully stored position report")
+
+# Vessel enrichment (core/ais_fetcher.py, enrich_vessels command)
+ENRICHMENT_CALLS = Counter(
+    "vessel_enrichment_calls_total", "Vessel enrichment attempts", ["source", "result"])
+
+# HTTP API (core/middleware.py)
+HTTP_REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds", "API request latency by route", ["view", "method", "status"])
+HTTP_REQUEST_QUERIES = Histogram(
+    "http_request_db_queries", "Database queries issued per request", ["view"],
+    buckets=(0, 1, 2, 5, 10, 20, 50, 100, 250, 1000))
+
+# Caches
+CACHE_REQUESTS = Counter(
+    "cache_requests_total", "Cache lookups by cache name and outcome", ["cache", "result"])
+
+# Request coalescing (core/singleflight.py)
+SINGLEFLIGHT_CALLS = Counter(
+    "singleflight_calls_total", "Coalesced computations by outcome (leader, waited, shared)", ["name", "outcome"])
+
+# Memory-mapped fleet snapshot (core/fleet_snapshot.py)
+FLEET_SNAPSHOT_PUBLISH_SECONDS = Histogram(
+    "fleet_snapshot_publish_seconds", "Time to read the vessels table and publish a snapshot")
+FLEET_SNAPSHOT_READS = Counter(
+    "fleet_snapshot_reads_total", "Snapshot lookups by the web tier (hit, stale, missing)", ["result"])
+
+# Freshness of the vessel table as seen by the web tier
+INGEST_LAG_SECONDS = Gauge(
+    "vessel_position_lag_seconds", "Seconds since the most recent vessel position update")
+
+
+def record_cache_lookup(cache_name, hit):
+    CACHE_REQUESTS.inc(cache=cache_name, result="hit" if hit else "miss")
+
+
+def render_latest():
+    return REGISTRY.render()
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        body = render_latest().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_http_server(port, addr="0.0.0.0"):
+    """Serve this process' registry on a background thread (for non-web processes)."""
+    server = ThreadingHTTPServer((addr, port), _MetricsHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
@@ -1,5 +1,11 @@
 import time
+from django.conf import settings
 from django.core.cache import cache
+from django.utils.cache import patch_vary_headers
+
+from .metrics import HTTP_REQUEST_SECONDS, HTTP_REQUEST_QUERIES
+from .profiling import request_profile
+from .compression import compress, compress_stream, negotiate
 
 class RequestThroughputMiddleware:
     def __init__(self, get_response):
@@ -18,4 +24,82 @@ class RequestThroughputMiddleware:
             cache.incr(key)
 
         response = self.get_response(request)
-        return response
\ No newline at end of file
+        return response
+
+
+class MetricsMiddleware:
+    """
+    Records latency and query count per resolved URL route.
+    Uses the route pattern (not the raw path) as label to keep cardinality bounded.
+    Its query profile is the one QueryBudgetMiddleware reads (request_profile).
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        start = time.perf_counter()
+        with request_profile(request) as profile:
+            response = self.get_response(request)
+        elapsed = time.perf_counter() - start
+
+        match = getattr(request, "resolver_match", None)
+        view = match.route if match and match.route else "unmatched"
+        HTTP_REQUEST_SECONDS.observe(elapsed, view=view, method=request.method, status=response.status_code)
+        HTTP_REQUEST_QUERIES.observe(profile.count, view=view)
+        return response
+
+
+class APICompressionMiddleware:
+    """
+    gzip/brotli for API responses (WhiteNoise only handles static files).
+    Negotiated from Accept-Encoding; only GET/HEAD bodies of at least
+    API_COMPRESSION_MIN_SIZE bytes are compressed (never login/write
+    responses, which may echo user input next to tokens). Streaming exports
+    are compressed incrementally.
+    """
+    COMPRESSIBLE_TYPES = ("application/json", "application/x-ndjson", "text/")
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.prefixes = tuple(getattr(settings, "API_COMPRESSION_PATH_PREFIXES", ("/api/", "/metrics/")))
+        self.min_size = getattr(settings, "API_COMPRESSION_MIN_SIZE", 1024)
+        self.levels = {
+            "gzip": getattr(settings, "API_COMPRESSION_GZIP_LEVEL", 6),
+            "br": getattr(settings, "API_COMPRESSION_BROTLI_QUALITY", 4),
+        }
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if (
+            request.method not in ("GET", "HEAD")
+            or not request.path.startswith(self.prefixes)
+            or response.status_code != 200
+            or response.has_header("Content-Encoding")
+            or not response.get("Content-Type", "").startswith(self.COMPRESSIBLE_TYPES)
+        ):
+            return response
+        if not response.streaming and len(response.content) < self.min_size:
+            return response
+
+        patch_vary_headers(response, ("Accept-Encoding",))
+        encoding = negotiate(request.META.get("HTTP_ACCEPT_ENCODING", ""))
+        if encoding is None:
+            return response
+        level = self.levels[encoding]
+
+        if response.streaming:
+            response.streaming_content = compress_stream(response.streaming_content, encoding, level)
+            del response.headers["Content-Length"]
+        else:
+            compressed = compress(response.content, encoding, level)
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response.headers["Content-Length"] = str(len(compressed))
+
+        # Body bytes changed: a strong ETag must become weak (RFC 9110 8.8.1)
+        etag = response.get("ETag")
+        if etag and etag.startswith('"'):
+            response.headers["ETag"] = "W/" + etag
+        response.headers["Content-Encoding"] = encoding
+        return response
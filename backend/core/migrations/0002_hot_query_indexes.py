@@ -0,0 +1,76 @@
+"""
+Secondary indexes for the hot dashboard / analytics / list queries.
+
+The maritime tables are unmanaged, so AddIndex would only touch migration
+state. Instead the indexes declared in each model's Meta.indexes are created
+here on whichever of those tables already exist, skipping any index that is
+already present. This is the equivalent MySQL, for applying by hand:
+
+    CREATE INDEX vessels_type_idx ON vessels (type);
+    CREATE INDEX ports_congestion_idx ON ports (congestion_score);
+    CREATE INDEX voyages_status_departure_idx ON voyages (status, departure_time);
+    CREATE INDEX voyages_departure_idx ON voyages (departure_time);
+    CREATE INDEX voyages_arrival_idx ON voyages (arrival_time);
+    CREATE INDEX tracks_vessel_timestamp_idx ON voyage_tracks (vessel_id, timestamp);
+    CREATE INDEX events_timestamp_idx ON events (timestamp);
+    CREATE INDEX notifications_timestamp_idx ON notifications (timestamp);
+"""
+from django.db import migrations
+
+# Kept in step with Meta.indexes in core/models.py. Written against table and
+# column names: the historical models in 0001 carry no foreign keys.
+HOT_INDEXES = {
+    'vessels': [('vessels_type_idx', ['type'])],
+    'ports': [('ports_congestion_idx', ['congestion_score'])],
+    'voyages': [
+        ('voyages_status_departure_idx', ['status', 'departure_time']),
+        ('voyages_departure_idx', ['departure_time']),
+        ('voyages_arrival_idx', ['arrival_time']),
+    ],
+    'voyage_tracks': [('tracks_vessel_timestamp_idx', ['vessel_id', 'timestamp'])],
+    'events': [('events_timestamp_idx', ['timestamp'])],
+    'notifications': [('notifications_timestamp_idx', ['timestamp'])],
+}
+
+
+def _existing_indexes(schema_editor, table):
+    connection = schema_editor.connection
+    with connection.cursor() as cursor:
+        if table not in connection.introspection.table_names(cursor):
+            return None
+        return set(connection.introspection.get_constraints(cursor, table))
+
+
+def add_indexes(apps, schema_editor):
+    quote = schema_editor.quote_name
+    for table, indexes in HOT_INDEXES.items():
+        existing = _existing_indexes(schema_editor, table)
+        if existing is None:
+            continue
+        for name, columns in indexes:
+            if name not in existing:
+                schema_editor.execute('CREATE INDEX %s ON %s (%s)' % (
+                    quote(name), quote(table), ', '.join(quote(column) for column in columns)))
+
+
+def remove_indexes(apps, schema_editor):
+    quote = schema_editor.quote_name
+    for table, indexes in HOT_INDEXES.items():
+        existing = _existing_indexes(schema_editor, table)
+        if existing is None:
+            continue
+        for name, _ in indexes:
+            if name in existing:
+                schema_editor.execute(schema_editor.sql_delete_index % {
+                    'name': quote(name), 'table': quote(table)})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(add_indexes, remove_indexes),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 6.0 on 2026-10-19 12:17
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_hot_query_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VesselKinematics',
+            fields=[
+                ('vessel', models.OneToOneField(db_column='vessel_id', db_constraint=False, on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='kinematics', serialize=False, to='core.vessel')),
+                ('latitude', models.FloatField()),
+                ('longitude', models.FloatField()),
+                ('speed_knots', models.FloatField(default=0)),
+                ('heading', models.FloatField(null=True)),
+                ('distance_nm', models.FloatField(default=0)),
+                ('window_start', models.DateTimeField()),
+                ('last_point_at', models.DateTimeField()),
+                ('destination_lat', models.FloatField(null=True)),
+                ('destination_lon', models.FloatField(null=True)),
+                ('remaining_nm', models.FloatField(null=True)),
+                ('eta', models.DateTimeField(null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('voyage', models.ForeignKey(db_column='voyage_id', db_constraint=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='core.voyage')),
+            ],
+            options={
+                'db_table': 'vessel_kinematics',
+                'managed': True,
+            },
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 6.0 on 2026-10-19 12:41
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_vessel_kinematics'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PortCallState',
+            fields=[
+                ('vessel', models.OneToOneField(db_column='vessel_id', db_constraint=False, on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='port_call_state', serialize=False, to='core.vessel')),
+                ('dwell_start', models.DateTimeField(null=True)),
+                ('dwell_last', models.DateTimeField(null=True)),
+                ('last_track_id', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('dwell_port', models.ForeignKey(db_column='dwell_port_id', db_constraint=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='core.port')),
+                ('port', models.ForeignKey(db_column='port_id', db_constraint=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='core.port')),
+            ],
+            options={
+                'db_table': 'port_call_state',
+                'managed': True,
+            },
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 6.0 on 2026-10-19 13:20
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_port_call_state'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PortCongestion',
+            fields=[
+                ('port', models.OneToOneField(db_column='port_id', db_constraint=False, on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='congestion', serialize=False, to='core.port')),
+                ('waiting_vessels', models.IntegerField(default=0)),
+                ('berthed_vessels', models.IntegerField(default=0)),
+                ('waiting_avg', models.FloatField(default=0)),
+                ('wait_weight', models.FloatField(default=0)),
+                ('wait_hours', models.FloatField(default=0)),
+                ('decayed_at', models.DateTimeField(null=True)),
+                ('refreshed_at', models.DateTimeField(null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'port_congestion',
+                'managed': True,
+            },
+        ),
+        migrations.AddField(
+            model_name='portcallstate',
+            name='arrived_at',
+            field=models.DateTimeField(null=True),
+        ),
+        migrations.AddField(
+            model_name='portcallstate',
+            name='berthed_at',
+            field=models.DateTimeField(null=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 6.0 on 2026-10-19 14:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_port_congestion'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='fleet_operator',
+            field=models.CharField(blank=True, max_length=255, null=True),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 6.0 on 2026-10-19 15:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('core', '0006_user_fleet_operator'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuditEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('timestamp', models.DateTimeField()),
+                ('action', models.CharField(max_length=50)),
+                ('actor_id', models.IntegerField(null=True)),
+                ('actor_name', models.CharField(blank=True, max_length=150)),
+                ('target_id', models.IntegerField(null=True)),
+                ('target_name', models.CharField(blank=True, max_length=150)),
+                ('details', models.CharField(blank=True, max_length=255)),
+            ],
+            options={
+                'db_table': 'audit_events',
+                'managed': True,
+            },
+        ),
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(fields=['email'], name='core_user_email_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(fields=['last_login', 'id'], name='core_user_last_login_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='auditevent',
+            index=models.Index(fields=['timestamp', 'id'], name='audit_timestamp_id_idx'),
+        ),
+    ]
@@ -27,12 +27,19 @@ class RiskZone(models.Model):
 
 class User(AbstractUser):
     role = models.CharField(max_length=50, default="user")
+    # Operators only see vessels whose Vessel.operator matches (core/auth.py)
+    fleet_operator = models.CharField(max_length=255, null=True, blank=True)
     # ADDED THIS LINE to fix the "Field created_at doesn't have a default value" error
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
         db_table = "core_user"
         managed = True
+        indexes = [
+            # Admin user list: prefix search and the default last-login ordering
+            models.Index(fields=["email"], name="core_user_email_idx"),
+            models.Index(fields=["last_login", "id"], name="core_user_last_login_idx"),
+        ]
 
     def __str__(self):
         return self.username
@@ -89,6 +96,30 @@ class UserRole(models.Model):
         return f"{self.user.username} → {self.role.role_name}"
 
 
+class AuditEvent(models.Model):
+    """
+    Append-only admin audit trail, written in batches by core/audit.py.
+    Actor and target are copied by value so entries outlive deleted users.
+    """
+    timestamp = models.DateTimeField()
+    action = models.CharField(max_length=50)
+    actor_id = models.IntegerField(null=True)
+    actor_name = models.CharField(max_length=150, blank=True)
+    target_id = models.IntegerField(null=True)
+    target_name = models.CharField(max_length=150, blank=True)
+    details = models.CharField(max_length=255, blank=True)
+
+    class Meta:
+        db_table = "audit_events"
+        managed = True
+        indexes = [
+            models.Index(fields=["timestamp", "id"], name="audit_timestamp_id_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.timestamp:%Y-%m-%d %H:%M} {self.action} by {self.actor_name}"
+
+
 # -------------------------
 # MARITIME CORE MODELS
 # -------------------------
@@ -110,6 +141,9 @@ class Vessel(models.Model):
     class Meta:
         db_table = "vessels"
         managed = False
+        indexes = [
+            models.Index(fields=["type"], name="vessels_type_idx"),
+        ]
 
     def __str__(self):
         return self.name
@@ -128,6 +162,9 @@ class Port(models.Model):
     class Meta:
         db_table = "ports"
         managed = False
+        indexes = [
+            models.Index(fields=["congestion_score"], name="ports_congestion_idx"),
+        ]
 
     def __str__(self):
         return self.name
@@ -161,6 +198,12 @@ class Voyage(models.Model):
     class Meta:
         db_table = "voyages"
         managed = False
+        indexes = [
+            # Active voyages, newest first (dashboard); plain list ordering; analytics window
+            models.Index(fields=["status", "departure_time"], name="voyages_status_departure_idx"),
+            models.Index(fields=["departure_time"], name="voyages_departure_idx"),
+            models.Index(fields=["arrival_time"], name="voyages_arrival_idx"),
+        ]
 
     def __str__(self):
         vessel = self.vessel.name if self.vessel else "Unknown Vessel"
@@ -182,6 +225,9 @@ class VoyageTrack(models.Model):
     class Meta:
         db_table = "voyage_tracks"
         managed = False
+        indexes = [
+            models.Index(fields=["vessel", "timestamp"], name="tracks_vessel_timestamp_idx"),
+        ]
 
     def __str__(self):
         return f"{self.vessel.name} @ {self.timestamp}"
@@ -202,6 +248,9 @@ class Event(models.Model):
     class Meta:
         db_table = "events"
         managed = False
+        indexes = [
+            models.Index(fields=["timestamp"], name="events_timestamp_idx"),
+        ]
 
     def __str__(self):
         vessel = self.vessel.name if self.vessel else "Unknown Vessel"
@@ -234,6 +283,9 @@ class Notification(models.Model):
     class Meta:
         db_table = "notifications"
         managed = False
+        indexes = [
+            models.Index(fields=["timestamp"], name="notifications_timestamp_idx"),
+        ]
 
     def __str__(self):
         return f"{self.type or 'Notification'}"
@@ -252,4 +304,144 @@ class Alert(models.Model):
     timestamp = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
-        return f"{self.vessel_name} - {self.type}"
\ No newline at end of file
+        return f"{self.vessel_name} - {self.type}"
+
+# -------------------------
+# DERIVED DATA (computed from AIS tracks)
+# -------------------------
+
+class VesselKinematics(models.Model):
+    """
+    Latest derived motion state per vessel (core/kinematics.py): smoothed
+    speed over ground, heading, distance since `window_start` and the ETA to
+    the current voyage's destination port.
+    """
+    vessel = models.OneToOneField(
+        Vessel,
+        primary_key=True,
+        db_column="vessel_id",
+        on_delete=models.CASCADE,
+        db_constraint=False,
+        related_name="kinematics"
+    )
+    voyage = models.ForeignKey(
+        Voyage,
+        db_column="voyage_id",
+        on_delete=models.SET_NULL,
+        db_constraint=False,
+        null=True,
+        related_name="+"
+    )
+    latitude = models.FloatField()
+    longitude = models.FloatField()
+    speed_knots = models.FloatField(default=0)
+    heading = models.FloatField(null=True)
+    distance_nm = models.FloatField(default=0)
+    window_start = models.DateTimeField()
+    last_point_at = models.DateTimeField()
+    destination_lat = models.FloatField(null=True)
+    destination_lon = models.FloatField(null=True)
+    remaining_nm = models.FloatField(null=True)
+    eta = models.DateTimeField(null=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = "vessel_kinematics"
+        managed = True
+
+    def __str__(self):
+        return f"{self.vessel_id}: {self.speed_knots:.1f} kn"
+
+
+class PortCallState(models.Model):
+    """
+    Per-vessel position in the port-call state machine (core/segmentation.py):
+    the port it is at (None = at sea) and a candidate call still being
+    confirmed. arrived_at / berthed_at time the current call's wait at
+    anchor. last_track_id is the incremental watermark.
+    """
+    vessel = models.OneToOneField(
+        Vessel,
+        primary_key=True,
+        db_column="vessel_id",
+        on_delete=models.CASCADE,
+        db_constraint=False,
+        related_name="port_call_state"
+    )
+    port = models.ForeignKey(
+        Port,
+        db_column="port_id",
+        on_delete=models.SET_NULL,
+        db_constraint=False,
+        null=True,
+        related_name="+"
+    )
+    dwell_port = models.ForeignKey(
+        Port,
+        db_column="dwell_port_id",
+        on_delete=models.SET_NULL,
+        db_constraint=False,
+        null=True,
+        related_name="+"
+    )
+    dwell_start = models.DateTimeField(null=True)
+    dwell_last = models.DateTimeField(null=True)
+    arrived_at = models.DateTimeField(null=True)
+    berthed_at = models.DateTimeField(null=True)
+    last_track_id = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = "port_call_state"
+        managed = True
+
+    def __str__(self):
+        return f"{self.vessel_id} @ {self.port_id or 'sea'}"
+
+
+class PortCongestion(models.Model):
+    """
+    Rolling congestion windows per port (core/congestion.py). Both windows are
+    exponentially decayed, so they are updated in place: waiting_avg on every
+    density refresh, wait_weight / wait_hours on every detected berthing.
+    """
+    port = models.OneToOneField(
+        Port,
+        primary_key=True,
+        db_column="port_id",
+        on_delete=models.CASCADE,
+        db_constraint=False,
+        related_name="congestion"
+    )
+    waiting_vessels = models.IntegerField(default=0)
+    berthed_vessels = models.IntegerField(default=0)
+    waiting_avg = models.FloatField(default=0)
+    wait_weight = models.FloatField(default=0)
+    wait_hours = models.FloatField(default=0)
+    decayed_at = models.DateTimeField(null=True)
+    refreshed_at = models.DateTimeField(null=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = "port_congestion"
+        managed = True
+
+    def __str__(self):
+        return f"{self.port_id}: {self.waiting_vessels} waiting"
+
+
+class TableVersion(models.Model):
+    """
+    Write counter per table behind the reference-data ETags (core/conditional.py).
+    It lives in the database so a bump from any process (ingest, management
+    commands) reaches every web worker.
+    """
+    table = models.CharField(max_length=64, primary_key=True)
+    version = models.BigIntegerField(default=0)
+
+    class Meta:
+        db_table = "table_versions"
+        managed = True
+
+    def __str__(self):
+        return f"{self.table}: {self.version}"
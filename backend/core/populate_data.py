@@ -11,8 +11,14 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
 django.setup()
 
+from django.db import connection
 from core.models import Vessel, Port, Voyage, Event, Notification, AppUser
 
+VESSEL_TYPES = ['Bulk Carrier', 'Container Ship', 'Oil Tanker', 'General Cargo', 'LNG Carrier']
+FLAGS = ['Panama', 'Liberia', 'Marshall Islands', 'Singapore', 'Malta', 'Bahamas']
+OPERATORS = ['Maersk Line', 'MSC', 'CMA CGM', 'Hapag-Lloyd', 'Evergreen Marine', 'ONE Network']
+CARGO_TYPES = ['Containers', 'Crude Oil', 'Iron Ore', 'Grain', 'LNG', 'Vehicles']
+
 # --- DATA GENERATORS ---
 
 def create_ports():
@@ -46,21 +52,51 @@ def create_ports():
         )
     print(f"✅ Created {len(ports_data)} Ports.")
 
-def create_voyages():
+def create_vessels(count, batch_size=2000):
+    """
+    Synthetic fleet for local testing and benchmarks (real vessels come from
+    the AIS stream). MMSIs start at 900000000 so they never clash with live ones.
+    """
+    print(f"🛳️ Generating {count} synthetic vessels...")
+    now = timezone.now()
+    batch = []
+    for i in range(count):
+        batch.append(Vessel(
+            mmsi=str(900000000 + i),
+            imo_number=f"IMO-{9000000 + i}",
+            name=f"SYNTH {i:06d}",
+            type=random.choice(VESSEL_TYPES),
+            flag=random.choice(FLAGS),
+            cargo_type=random.choice(CARGO_TYPES),
+            operator=random.choice(OPERATORS),
+            last_position_lat=random.uniform(-60, 60),
+            last_position_lon=random.uniform(-180, 180),
+            speed=random.uniform(0, 22),
+            course=random.uniform(0, 360),
+            last_update=now - timedelta(seconds=random.randint(0, 3600)),
+        ))
+        if len(batch) >= batch_size:
+            Vessel.objects.bulk_create(batch, ignore_conflicts=True)
+            batch = []
+    if batch:
+        Vessel.objects.bulk_create(batch, ignore_conflicts=True)
+    print(f"✅ Created {count} vessels.")
+
+def create_voyages(batch_size=2000):
     print("🚢 Generating Voyages...")
-    vessels = Vessel.objects.all()
+    # Same effect as get_or_create per vessel, but in bulk
+    vessels = Vessel.objects.filter(voyage__isnull=True)
     ports = list(Port.objects.all())
 
-    if not vessels.exists() or not ports:
+    if not Vessel.objects.exists() or len(ports) < 2:
         print("⚠️ No vessels or ports found! Run the vessel scraper first.")
         return
 
-    for vessel in vessels:
+    batch = []
+    created = 0
+    for vessel in vessels.iterator(chunk_size=batch_size):
         # Create a random voyage for each vessel
-        origin = random.choice(ports)
-        destination = random.choice(ports)
-        while destination == origin:
-            destination = random.choice(ports)
+        origin, destination = random.sample(ports, 2)
 
         # Random times
         dept_time = timezone.now() - timedelta(days=random.randint(1, 10))
@@ -69,19 +105,24 @@ def create_voyages():
         # Calculate status
         status = "In Transit" if arr_time > timezone.now() else "Completed"
 
-        Voyage.objects.get_or_create(
+        batch.append(Voyage(
             vessel=vessel,
-            defaults={
-                "port_from": origin,
-                "port_to": destination,
-                "departure_time": dept_time,
-                "arrival_time": arr_time,
-                "status": status
-            }
-        )
-    print(f"Generated voyages for {vessels.count()} vessels.")
+            port_from=origin,
+            port_to=destination,
+            departure_time=dept_time,
+            arrival_time=arr_time,
+            status=status,
+        ))
+        if len(batch) >= batch_size:
+            Voyage.objects.bulk_create(batch)
+            created += len(batch)
+            batch = []
+    if batch:
+        Voyage.objects.bulk_create(batch)
+        created += len(batch)
+    print(f"Generated voyages for {created} vessels.")
 
-def create_events():
+def create_events(batch_size=2000):
     print("🔔 Generating Events & Notifications...")
     vessels = Vessel.objects.all()
     event_types = ["Port Arrival", "Port Departure", "Speed Drop", "Route Deviation", "Bunker Stop"]
@@ -97,34 +138,49 @@ def create_events():
             username="system_admin", 
             email="admin@maritimeos.com", 
             password="hashed_password_placeholder", 
-            role="admin", 
             created_at=timezone.now()
         )
     # --- FIX END ---
 
-    for vessel in vessels:
+    batch = []
+    for vessel in vessels.iterator(chunk_size=batch_size):
         # Create 1-2 random events per vessel
         for _ in range(random.randint(1, 2)):
             e_type = random.choice(event_types)
-            
-            # Create the Event
-            event = Event.objects.create(
+            batch.append(Event(
                 vessel=vessel,
                 event_type=e_type,
                 location=f"{random.uniform(-90,90):.4f}, {random.uniform(-180,180):.4f}",
                 details=f"Vessel {vessel.name} reported {e_type} near coordinates."
-            )
-
-            # Create the Notification (Assigned to system_user)
-            Notification.objects.create(
-                vessel=vessel,
-                event=event,
-                message=f"Alert: {e_type} detected for {vessel.name}",
-                type="Alert",
-                user=system_user  
-            )
+            ))
+        if len(batch) >= batch_size:
+            _save_events_with_notifications(batch, system_user)
+            batch = []
+    if batch:
+        _save_events_with_notifications(batch, system_user)
     
     print("✅ Generated events and notifications.")
+
+
+def _save_events_with_notifications(events, system_user):
+    # Notifications need the event ids; MySQL does not return them from bulk inserts
+    if connection.features.can_return_rows_from_bulk_insert:
+        Event.objects.bulk_create(events)
+    else:
+        for event in events:
+            event.save()
+
+    # Create the Notifications (Assigned to system_user)
+    Notification.objects.bulk_create([
+        Notification(
+            vessel=event.vessel,
+            event=event,
+            message=f"Alert: {event.event_type} detected for {event.vessel.name}",
+            type="Alert",
+            user=system_user
+        )
+        for event in events
+    ])
     
 if __name__ == "__main__":
     create_ports()
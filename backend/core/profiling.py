@@ -0,0 +1,161 @@
+"""
+SQL query profiling: per-request query counts, duplicate-query (N+1) detection
+and total DB time, plus a test helper that fails when an endpoint goes over its
+query budget.
+"""
+import logging
+import re
+import time
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_QUERY_BUDGET = 20
+DEFAULT_DUPLICATE_LIMIT = 3
+
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r"\b\d+(?:\.\d+)?\b")
+_IN_LIST_RE = re.compile(r"\(\s*(?:\?|%s)(?:\s*,\s*(?:\?|%s))*\s*\)")
+_SPACE_RE = re.compile(r"\s+")
+
+
+def fingerprint(sql):
+    """Normalise a SQL statement so that queries differing only by literals match."""
+    sql = _STRING_RE.sub("?", sql)
+    sql = _NUMBER_RE.sub("?", sql)
+    sql = _IN_LIST_RE.sub("(...)", sql)
+    return _SPACE_RE.sub(" ", sql).strip()
+
+
+class QueryProfile:
+    def __init__(self):
+        self.queries = []  # (sql, seconds)
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append((sql, time.perf_counter() - start))
+
+    @property
+    def count(self):
+        return len(self.queries)
+
+    @property
+    def total_time(self):
+        return sum(seconds for _, seconds in self.queries)
+
+    def fingerprints(self):
+        return Counter(fingerprint(sql) for sql, _ in self.queries)
+
+    def duplicates(self, threshold=2):
+        """Fingerprints executed at least `threshold` times - the usual N+1 signature."""
+        return {fp: n for fp, n in self.fingerprints().items() if n >= threshold}
+
+    def summary(self):
+        return {
+            "queries": self.count,
+            "db_time_ms": round(self.total_time * 1000, 2),
+            "duplicates": self.duplicates(),
+        }
+
+
+@contextmanager
+def profile_queries(using=None, profile=None):
+    """
+    Record every query run on the given aliases (all configured ones by default)
+    by this thread, into `profile` when given (a fresh one otherwise).
+    """
+    profile = QueryProfile() if profile is None else profile
+    aliases = [using] if using else list(connections)
+    with ExitStack() as stack:
+        for alias in aliases:
+            stack.enter_context(connections[alias].execute_wrapper(profile))
+        yield profile
+
+
+@contextmanager
+def request_profile(request):
+    """
+    profile_queries() for one request, shared by the middlewares that need it
+    (MetricsMiddleware, QueryBudgetMiddleware): the outermost installs the
+    cursor wrapper, the ones inside it reuse its profile.
+    """
+    profile = getattr(request, "_query_profile", None)
+    if profile is not None:
+        yield profile
+        return
+    with profile_queries() as profile:
+        request._query_profile = profile
+        try:
+            yield profile
+        finally:
+            del request._query_profile
+
+
+def budget_for(route):
+    budgets = getattr(settings, "QUERY_BUDGETS", {})
+    return budgets.get(route, getattr(settings, "QUERY_BUDGET_DEFAULT", DEFAULT_QUERY_BUDGET))
+
+
+def budget_violations(profile, budget, duplicate_limit=None):
+    if duplicate_limit is None:
+        duplicate_limit = getattr(settings, "QUERY_DUPLICATE_LIMIT", DEFAULT_DUPLICATE_LIMIT)
+    problems = []
+    if profile.count > budget:
+        problems.append(f"{profile.count} queries (budget {budget})")
+    for fp, n in profile.duplicates(threshold=duplicate_limit + 1).items():
+        problems.append(f"{n}x duplicate: {fp[:200]}")
+    return problems
+
+
+class QueryBudgetMiddleware:
+    """
+    Logs a warning for any request that exceeds its route's query budget or
+    repeats the same query shape more than QUERY_DUPLICATE_LIMIT times.
+    Budgets come from settings.QUERY_BUDGETS, keyed by URL route pattern.
+    With DEBUG on, query count and DB time are also sent as response headers.
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with request_profile(request) as profile:
+            response = self.get_response(request)
+
+        match = getattr(request, "resolver_match", None)
+        route = match.route if match and match.route else request.path
+        problems = budget_violations(profile, budget_for(route))
+        if problems:
+            logger.warning(
+                "Query budget exceeded on %s %s (%.1f ms in DB): %s",
+                request.method, route, profile.total_time * 1000, "; ".join(problems),
+            )
+
+        if settings.DEBUG:
+            response["X-DB-Queries"] = str(profile.count)
+            response["X-DB-Time-Ms"] = f"{profile.total_time * 1000:.2f}"
+        return response
+
+
+class QueryBudgetTestMixin:
+    """
+    TestCase mixin:
+
+        with self.assertQueryBudget("api/vessels/"):
+            self.client.get("/api/vessels/")
+    """
+    @contextmanager
+    def assertQueryBudget(self, route_or_budget, duplicate_limit=None):
+        budget = budget_for(route_or_budget) if isinstance(route_or_budget, str) else route_or_budget
+        with profile_queries() as profile:
+            yield profile
+        problems = budget_violations(profile, budget, duplicate_limit)
+        if problems:
+            listing = "\n".join(f"  {fingerprint(sql)}" for sql, _ in profile.queries)
+            self.fail(f"{route_or_budget}: " + "; ".join(problems) + f"\nQueries:\n{listing}")
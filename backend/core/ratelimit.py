@@ -0,0 +1,128 @@
+"""
+Token-bucket rate limiting per client and endpoint.
+
+TokenBucketThrottle is a DRF throttle (REST_FRAMEWORK['DEFAULT_THROTTLE_CLASSES']):
+each (user or IP, URL route) pair owns a bucket holding up to N tokens that
+refills at N per period, for a rate of "N/period" from settings.RATE_LIMITS
+(looked up by route, falling back to "default"). A request takes one token;
+with none left DRF answers 429 with Retry-After set to when the next token
+arrives.
+
+Anonymous clients are keyed by DRF's get_ident(): REMOTE_ADDR, or with
+REST_FRAMEWORK['NUM_PROXIES'] set the address the nearest trusted proxy put in
+X-Forwarded-For, so a client cannot pick a fresh bucket per request.
+
+Buckets live in process memory (LocalBuckets), so each worker enforces the
+rate on its own. Set RATE_LIMIT_BACKEND to a cache alias to share buckets
+across workers (CacheBuckets); that path is read-modify-write on the cache,
+so concurrent requests can occasionally both pass.
+"""
+import math
+import threading
+import time
+from functools import lru_cache
+from itertools import islice
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.throttling import BaseThrottle
+
+PERIODS = {"s": 1, "sec": 1, "m": 60, "min": 60, "h": 3600, "hour": 3600}
+MAX_LOCAL_KEYS = 100_000
+
+
+@lru_cache(maxsize=None)
+def parse_rate(rate):
+    """Rate string to (capacity, refill per second): "30/min" -> (30, 0.5)."""
+    count, period = rate.split("/")
+    count = int(count)
+    return count, count / PERIODS[period]
+
+
+class LocalBuckets:
+    """Buckets in this process; one dict lookup and a lock per check."""
+    clock = staticmethod(time.monotonic)
+
+    def __init__(self, max_keys=MAX_LOCAL_KEYS):
+        self.max_keys = max_keys
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def take(self, key, capacity, refill):
+        """Take one token; returns 0 if allowed, otherwise seconds until one is available."""
+        now = self.clock()
+        with self._lock:
+            # Popped and put back below, so the dict stays in least recently used order
+            tokens, stamp, _ = self._buckets.pop(key, (capacity, now, now))
+            tokens = min(capacity, tokens + (now - stamp) * refill)
+            wait = 0.0
+            if tokens >= 1:
+                tokens -= 1
+            else:
+                wait = (1 - tokens) / refill
+            if len(self._buckets) >= self.max_keys:
+                self._prune(now)
+            self._buckets[key] = (tokens, now, now + (capacity - tokens) / refill)
+        return wait
+
+    def _prune(self, now):
+        # A bucket that has refilled behaves exactly like a missing one
+        self._buckets = {key: bucket for key, bucket in self._buckets.items() if bucket[2] > now}
+        # Still full of busy clients: forget the least recently used ones, a tenth
+        # of the cap at once so the next new keys do not each pay for a scan
+        excess = len(self._buckets) - (self.max_keys - max(self.max_keys // 10, 1))
+        for key in list(islice(self._buckets, max(excess, 0))):
+            del self._buckets[key]
+
+    def clear(self):
+        with self._lock:
+            self._buckets.clear()
+
+
+class CacheBuckets:
+    """Buckets in a shared Django cache, so every worker draws from the same one."""
+    clock = staticmethod(time.time)
+
+    def __init__(self, alias):
+        self.cache = caches[alias]
+
+    def take(self, key, capacity, refill):
+        now = self.clock()
+        key = f"ratelimit:{key}"
+        tokens, stamp = self.cache.get(key) or (capacity, now)
+        tokens = min(capacity, tokens + max(now - stamp, 0) * refill)
+        wait = 0.0
+        if tokens >= 1:
+            tokens -= 1
+        else:
+            wait = (1 - tokens) / refill
+        self.cache.set(key, (tokens, now), timeout=math.ceil(capacity / refill) + 1)
+        return wait
+
+
+@lru_cache(maxsize=None)
+def buckets(backend="local"):
+    return LocalBuckets() if backend == "local" else CacheBuckets(backend)
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """429 + Retry-After once a client has used up its bucket for this endpoint."""
+    wait_seconds = None
+
+    def allow_request(self, request, view):
+        if not getattr(settings, "RATE_LIMIT_ENABLED", True):
+            return True
+        match = request.resolver_match
+        route = match.route if match else request.path
+        rates = getattr(settings, "RATE_LIMITS", {})
+        rate = rates.get(route, rates.get("default"))
+        if rate is None:
+            return True
+        user = request.user
+        client = f"user:{user.pk}" if user and user.is_authenticated else f"ip:{self.get_ident(request)}"
+        self.wait_seconds = buckets(getattr(settings, "RATE_LIMIT_BACKEND", "local")).take(
+            f"{client}:{route}", *parse_rate(rate))
+        return self.wait_seconds == 0
+
+    def wait(self):
+        return self.wait_seconds
@@ -0,0 +1,118 @@
+"""
+Effective role and permission set per user, resolved once and cached.
+
+A user's access comes from three places: User.role, the is_staff /
+is_superuser flags set by update_user_role, and any active roles granted in
+the legacy roles / user_roles tables (linked by username). resolve() folds
+them into one Access and caches it, so a permission check is a cache read.
+
+Entries are dropped by invalidate() on role / status writes and expire after
+ROLE_CACHE_SECONDS to pick up changes made straight in user_roles.
+"""
+from collections import namedtuple
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save
+from rest_framework.permissions import BasePermission
+
+from .metrics import record_cache_lookup
+from .models import UserRole
+
+ROLE_CACHE_SECONDS = 300
+
+VIEW_FLEET, VIEW_ANALYTICS, EXPORT_DATA, MANAGE_ALERTS, MANAGE_USERS = (
+    "view_fleet", "view_analytics", "export_data", "manage_alerts", "manage_users",
+)
+ROLE_PERMISSIONS = {
+    "Admin": frozenset({VIEW_FLEET, VIEW_ANALYTICS, EXPORT_DATA, MANAGE_ALERTS, MANAGE_USERS}),
+    "Analyst": frozenset({VIEW_FLEET, VIEW_ANALYTICS, EXPORT_DATA}),
+    "Operator": frozenset({VIEW_FLEET}),
+}
+ROLE_ALIASES = {"super admin": "Admin", "administrator": "Admin", "admin": "Admin",
+                "analyst": "Analyst", "operator": "Operator"}
+ROLE_RANK = ("Operator", "Analyst", "Admin")
+
+Access = namedtuple("Access", "role permissions fleet is_active")
+NO_ACCESS = Access(None, frozenset(), None, False)
+
+
+def _key(user_id):
+    return f"access:{user_id}"
+
+
+def _effective(user, granted):
+    """Highest of User.role, the staff flags and the legacy role grants."""
+    roles = {ROLE_ALIASES.get((name or "").strip().lower()) for name in [user.role, *granted]}
+    if user.is_superuser:
+        roles.add("Admin")
+    elif user.is_staff:
+        roles.add("Analyst")
+    roles.discard(None)
+    role = max(roles, key=ROLE_RANK.index) if roles else None
+    permissions = ROLE_PERMISSIONS.get(role, frozenset()) if user.is_active else frozenset()
+    return Access(role, permissions, user.fleet_operator or None, user.is_active)
+
+
+def _load(user_ids):
+    """Two queries for any number of users: the users, then their legacy grants."""
+    users = list(get_user_model().objects.filter(id__in=user_ids).only(
+        "id", "username", "role", "is_staff", "is_superuser", "is_active", "fleet_operator"))
+    granted = {}
+    for username, role_name in UserRole.objects.filter(
+            user__username__in=[user.username for user in users], isactive=True, role__isactive=True,
+    ).values_list("user__username", "role__role_name"):
+        granted.setdefault(username, []).append(role_name)
+    return {user.id: _effective(user, granted.get(user.username, ())) for user in users}
+
+
+def resolve_many(user_ids):
+    """{user_id: Access} for a page of users; cached entries first, misses batch-loaded."""
+    user_ids = list(dict.fromkeys(user_ids))
+    cached = cache.get_many([_key(user_id) for user_id in user_ids])
+    found = {user_id: Access(*cached[_key(user_id)]) for user_id in user_ids if _key(user_id) in cached}
+    for user_id in user_ids:
+        record_cache_lookup("access", user_id in found)
+    missing = [user_id for user_id in user_ids if user_id not in found]
+    if missing:
+        loaded = _load(missing)
+        cache.set_many({_key(user_id): tuple(access) for user_id, access in loaded.items()},
+                       timeout=ROLE_CACHE_SECONDS)
+        found.update(loaded)
+    return {user_id: found.get(user_id, NO_ACCESS) for user_id in user_ids}
+
+
+def resolve(user_id):
+    return resolve_many([user_id])[user_id]
+
+
+def invalidate(*user_ids):
+    cache.delete_many([_key(user_id) for user_id in user_ids])
+
+
+def has_permission(user, permission):
+    if not getattr(user, "is_authenticated", False):
+        return False
+    return permission in resolve(user.pk).permissions
+
+
+class HasPermission(BasePermission):
+    """DRF permission: `permission_classes([HasPermission.of(MANAGE_USERS)])`."""
+    permission = None
+
+    @classmethod
+    def of(cls, permission):
+        return type(f"Has_{permission}", (cls,), {"permission": permission})
+
+    def has_permission(self, request, view):
+        return has_permission(request.user, self.permission)
+
+
+def connect_role_signals():
+    """Any save / delete of a User drops its cached access."""
+    User = get_user_model()
+
+    def drop(sender, instance, **kwargs):
+        invalidate(instance.pk)
+    post_save.connect(drop, sender=User, weak=False, dispatch_uid="access_cache_save")
+    post_delete.connect(drop, sender=User, weak=False, dispatch_uid="access_cache_delete")
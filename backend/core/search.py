@@ -0,0 +1,339 @@
+"""
+In-memory vessel search over name, MMSI, IMO and operator.
+
+Names and operators are split into words. The distinct words (a vocabulary far
+smaller than the fleet) are indexed for prefix lookup (sorted list) and for
+typos (single-character deletions of every word, so one edit is a dictionary
+lookup), and each word points at the set of vessels using it. A query
+word expands to its closest vocabulary words, a vessel must match every query
+word, and only that candidate set is scored. MMSI and IMO get exact lookups
+plus MMSI prefix matching.
+
+The index is built lazily per process on the first search. It is kept in sync
+by Vessel save/delete signals (admin edits, enrichment) and by a periodic
+delta load of rows whose `last_update` moved, which picks up new vessels,
+renames and enrichment written by other processes: every writer of the
+indexed columns (ingest, ais_fetcher, enrich_vessels) bumps `last_update`.
+Deletions leave nothing to find by `last_update`, so every
+VESSEL_SEARCH_RECONCILE_SECONDS the delta also reads the table's ids and drops
+indexed vessels that are gone.
+"""
+import bisect
+import heapq
+import re
+import threading
+import time
+
+from django.conf import settings
+
+from .models import Vessel
+
+SEARCH_COLUMNS = ("id", "name", "mmsi", "imo_number", "operator", "type", "flag", "last_update")
+RESULT_COLUMNS = SEARCH_COLUMNS[:-1]
+
+MAX_EXPANSIONS = 50     # vocabulary words tried per query word
+MIN_FUZZY_LENGTH = 3    # shorter words only match exactly or by prefix
+OPERATOR_WEIGHT = 0.5   # an operator match counts half as much as a name match
+CANDIDATE_SCAN_LIMIT = 5000  # above this, rank by walking score levels instead
+
+_WORD_RE = re.compile(r"[0-9A-Z]+")
+_DIGITS_RE = re.compile(r"\D+")
+
+
+def words(text):
+    return _WORD_RE.findall((text or "").upper())
+
+
+def deletions(word):
+    return {word[:i] + word[i + 1:] for i in range(len(word))}
+
+
+def imo_digits(value):
+    return _DIGITS_RE.sub("", value or "")
+
+
+class VesselSearchIndex:
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._reset()
+
+    def _reset(self):
+        self.loaded = False
+        self.docs = {}              # id -> row dict returned in results
+        self.keys = {}              # id -> (name words, operator words, mmsi, imo digits)
+        self.name_postings = {}     # word -> set of ids
+        self.operator_postings = {}
+        self.vocabulary = []        # sorted distinct words, for prefix lookup
+        self.known_words = set()
+        self.variants = {}          # word minus one character -> set of words, for typos
+        self.mmsis = []             # sorted (mmsi, id), for MMSI prefix lookup
+        self.by_mmsi = {}
+        self.by_imo = {}
+        self.watermark = None
+        self.refreshed_at = 0.0
+        self.reconciled_at = 0.0
+
+    # -------- maintenance --------
+
+    def load(self, rows):
+        with self._lock:
+            self._reset()
+            for row in rows:
+                self._add(row, bulk=True)
+            self.vocabulary.sort()
+            self.mmsis.sort()
+            self.loaded = True
+            self.refreshed_at = self.reconciled_at = time.monotonic()
+
+    def upsert(self, row):
+        with self._lock:
+            doc = self.docs.get(row["id"])
+            if doc is not None and self.keys[row["id"]] == self._keys(row):
+                # Position-only update (the common ingest case): nothing to re-index
+                doc.update({key: row[key] for key in RESULT_COLUMNS})
+                self._advance_watermark(row)
+                return
+            self._remove(row["id"])
+            self._add(row)
+
+    def remove(self, vessel_id):
+        with self._lock:
+            self._remove(vessel_id)
+
+    @staticmethod
+    def _keys(row):
+        mmsi = str(row["mmsi"]) if row["mmsi"] else ""
+        return tuple(words(row["name"])), tuple(words(row["operator"])), mmsi, imo_digits(row["imo_number"])
+
+    def _add(self, row, bulk=False):
+        vessel_id = row["id"]
+        name_words, operator_words, mmsi, imo = keys = self._keys(row)
+        self.docs[vessel_id] = {key: row[key] for key in RESULT_COLUMNS}
+        self.keys[vessel_id] = keys
+        for postings, used in ((self.name_postings, name_words), (self.operator_postings, operator_words)):
+            for word in used:
+                if word not in self.known_words:
+                    self._add_word(word, bulk)
+                postings.setdefault(word, set()).add(vessel_id)
+        if mmsi:
+            self.by_mmsi[mmsi] = vessel_id
+            if bulk:
+                self.mmsis.append((mmsi, vessel_id))
+            else:
+                bisect.insort(self.mmsis, (mmsi, vessel_id))
+        if imo:
+            self.by_imo[imo] = vessel_id
+        self._advance_watermark(row)
+
+    def _add_word(self, word, bulk):
+        self.known_words.add(word)
+        if len(word) >= MIN_FUZZY_LENGTH:
+            for variant in deletions(word):
+                self.variants.setdefault(variant, set()).add(word)
+        if bulk:
+            self.vocabulary.append(word)
+        else:
+            bisect.insort(self.vocabulary, word)
+
+    def _remove(self, vessel_id):
+        if self.docs.pop(vessel_id, None) is None:
+            return
+        name_words, operator_words, mmsi, imo = self.keys.pop(vessel_id)
+        # Words stay in the vocabulary once seen; without postings they match nothing
+        for postings, used in ((self.name_postings, name_words), (self.operator_postings, operator_words)):
+            for word in used:
+                ids = postings.get(word)
+                if ids is not None:
+                    ids.discard(vessel_id)
+                    if not ids:
+                        del postings[word]
+        if mmsi:
+            i = bisect.bisect_left(self.mmsis, (mmsi, vessel_id))
+            if i < len(self.mmsis) and self.mmsis[i] == (mmsi, vessel_id):
+                del self.mmsis[i]
+            if self.by_mmsi.get(mmsi) == vessel_id:
+                del self.by_mmsi[mmsi]
+        if imo and self.by_imo.get(imo) == vessel_id:
+            del self.by_imo[imo]
+
+    def _advance_watermark(self, row):
+        if row.get("last_update") and (self.watermark is None or row["last_update"] > self.watermark):
+            self.watermark = row["last_update"]
+
+    # -------- querying --------
+
+    def _expand(self, token):
+        """Vocabulary words close to one query word, as {word: score in (0, 1]}."""
+        matches = {}
+        # Prefix (the exact word included): longer completions score lower
+        start = bisect.bisect_left(self.vocabulary, token)
+        for word in self.vocabulary[start:start + MAX_EXPANSIONS]:
+            if not word.startswith(token):
+                break
+            matches[word] = 1.0 if word == token else 0.5 + 0.4 * len(token) / len(word)
+
+        # Typos: one inserted, dropped, replaced or swapped character. Both sides
+        # were reduced by one deletion, so these are plain lookups.
+        if len(token) >= MIN_FUZZY_LENGTH:
+            close = set(self.variants.get(token, ()))
+            for variant in deletions(token):
+                if variant in self.known_words:
+                    close.add(variant)
+                close.update(self.variants.get(variant, ()))
+            for word in close:
+                if word not in matches:
+                    matches[word] = 0.8 * (1 - 1 / max(len(token), len(word)))
+
+        return dict(heapq.nlargest(MAX_EXPANSIONS, matches.items(), key=lambda item: item[1]))
+
+    def _word_levels(self, token):
+        """
+        Vessels matching one query word as disjoint (score, ids) levels, best
+        first: each vessel sits in the level of its best name/operator match.
+        """
+        weighted = []
+        for word, score in self._expand(token).items():
+            for postings, weight in ((self.name_postings, 1.0), (self.operator_postings, OPERATOR_WEIGHT)):
+                ids = postings.get(word)
+                if ids:
+                    weighted.append((score * weight, ids))
+        weighted.sort(key=lambda item: -item[0])
+        levels, seen = [], set()
+        for score, ids in weighted:
+            fresh = ids - seen
+            if fresh:
+                levels.append((score, fresh))
+                seen |= fresh
+        return levels, seen
+
+    def _rank_words(self, tokens, limit):
+        """
+        Top `limit` vessels matching every query word, scored by the mean word
+        score. Only set operations touch the large postings; per-vessel Python
+        work is bounded by `limit` or by a small candidate set.
+        """
+        per_word = sorted((self._word_levels(token) for token in tokens), key=lambda item: len(item[1]))
+        candidates = per_word[0][1]
+        for _, matched in per_word[1:]:
+            candidates = candidates & matched
+        if not candidates:
+            return {}
+        scale = 60.0 / len(tokens)
+
+        if len(candidates) <= CANDIDATE_SCAN_LIMIT:
+            scores = dict.fromkeys(candidates, 0.0)
+            for levels, _ in per_word:
+                for score, ids in levels:
+                    for vessel_id in candidates & ids:
+                        scores[vessel_id] += score * scale
+            return scores
+
+        # Broad query: walk combinations of levels best-first until `limit` are found
+        levels = [item[0] for item in per_word]
+        start = (0,) * len(levels)
+        heap = [(-sum(level[0][0] for level in levels), start)]
+        visited = {start}
+        scores = {}
+        while heap and len(scores) < limit:
+            total, combo = heapq.heappop(heap)
+            ids = candidates
+            for level, k in zip(levels, combo):
+                ids = ids & level[k][1]
+                if not ids:
+                    break
+            for vessel_id in heapq.nsmallest(limit - len(scores), ids):
+                scores[vessel_id] = -total * scale
+            for i in range(len(combo)):
+                if combo[i] + 1 < len(levels[i]):
+                    successor = combo[:i] + (combo[i] + 1,) + combo[i + 1:]
+                    if successor not in visited:
+                        visited.add(successor)
+                        heapq.heappush(heap, (total + levels[i][combo[i]][0] - levels[i][combo[i] + 1][0], successor))
+        return scores
+
+    def search(self, query, limit=20, operator=None):
+        """Best `limit` matches; `operator` restricts them to one fleet (core/auth.py)."""
+        tokens = words(query)
+        if not tokens:
+            return []
+        with self._lock:
+            # A fleet filter drops ranked matches, so rank deeper before applying it
+            scores = self._rank_words(tokens, CANDIDATE_SCAN_LIMIT if operator else limit)
+
+            # Identifiers outrank word matches: exact MMSI / IMO, then MMSI prefix
+            compact = "".join(tokens)
+            if compact in self.by_mmsi:
+                scores[self.by_mmsi[compact]] = 100.0
+            imo = imo_digits(compact)
+            if imo in self.by_imo:
+                scores[self.by_imo[imo]] = max(scores.get(self.by_imo[imo], 0.0), 95.0)
+            if compact.isdigit():
+                start = bisect.bisect_left(self.mmsis, (compact,))
+                for mmsi, vessel_id in self.mmsis[start:start + limit]:
+                    if not mmsi.startswith(compact):
+                        break
+                    scores[vessel_id] = max(scores.get(vessel_id, 0.0), 70.0)
+
+            if operator is not None:
+                scores = {vessel_id: score for vessel_id, score in scores.items()
+                          if self.docs[vessel_id]["operator"] == operator}
+            ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))[:limit]
+            return [dict(self.docs[vessel_id], score=round(score, 2)) for vessel_id, score in ranked]
+
+    # -------- syncing with the database --------
+
+    def ensure_fresh(self):
+        refresh_every = getattr(settings, "VESSEL_SEARCH_REFRESH_SECONDS", 30)
+        if not self.loaded:
+            with self._lock:
+                if not self.loaded:
+                    self.load(Vessel.objects.values(*SEARCH_COLUMNS).iterator(chunk_size=5000))
+            return
+        if time.monotonic() - self.refreshed_at < refresh_every:
+            return
+        with self._lock:
+            # One caller per interval runs the delta
+            if time.monotonic() - self.refreshed_at < refresh_every:
+                return
+            self.refreshed_at = time.monotonic()
+            watermark = self.watermark
+            reconcile = self.refreshed_at - self.reconciled_at >= \
+                getattr(settings, "VESSEL_SEARCH_RECONCILE_SECONDS", 300)
+            if reconcile:
+                self.reconciled_at = self.refreshed_at
+                # Only these can be dropped: vessels indexed after this point are newer than the id query
+                indexed = set(self.docs)
+        # Fetched without the lock: searches keep running while the queries do
+        changed = Vessel.objects.values(*SEARCH_COLUMNS)
+        if watermark is not None:
+            changed = changed.filter(last_update__gt=watermark)
+        else:
+            changed = changed.filter(last_update__isnull=False)
+        rows = list(changed.iterator(chunk_size=5000))
+        if reconcile:
+            indexed.difference_update(Vessel.objects.values_list("id", flat=True).iterator(chunk_size=20000))
+        with self._lock:
+            for row in rows:
+                self.upsert(row)
+            if reconcile:
+                for vessel_id in indexed:
+                    self._remove(vessel_id)
+
+
+vessel_index = VesselSearchIndex()
+
+
+def sync_vessel(sender, instance, **kwargs):
+    if vessel_index.loaded:
+        vessel_index.upsert({key: getattr(instance, key) for key in SEARCH_COLUMNS})
+
+
+def drop_vessel(sender, instance, **kwargs):
+    if vessel_index.loaded:
+        vessel_index.remove(instance.id)
+
+
+def connect_search_signals():
+    from django.db.models.signals import post_delete, post_save
+    post_save.connect(sync_vessel, sender=Vessel, dispatch_uid="vessel_search_sync")
+    post_delete.connect(drop_vessel, sender=Vessel, dispatch_uid="vessel_search_drop")
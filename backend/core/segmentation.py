@@ -0,0 +1,226 @@
+"""
+Voyage segmentation from AIS tracks (port-call detection).
+
+A vessel is *calling* at a port when it stays slow (<= SLOW_KNOTS) within
+PORT_RADIUS_NM of the port's coordinates for at least MIN_DWELL; the call
+starts at the first slow point. It *departs* at its first point outside the
+radius. Arrivals close the vessel's open voyage (port_to, arrival_time,
+status "Completed") and departures open a new "In Transit" one (port_from,
+departure_time). Port.arrivals / departures are incremented to match.
+The first slow point within BERTH_RADIUS_NM after an arrival is the berthing;
+arrival -> berth durations feed the congestion wait window (core/congestion.py).
+
+Per point the work is vectorized (nearest port, slow / berth / near labels);
+the state machine then only walks runs of identical labels. Per-vessel state
+is kept in PortCallState, so processing can stop and resume anywhere:
+
+- incremental(): track rows newer than the stored watermark, by id.
+- backfill(): the whole table in keyset chunks on (vessel_id, timestamp, id),
+  memory bounded by the chunk size (`manage.py segment_voyages --backfill`).
+"""
+from collections import Counter
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+import numpy as np
+from django.db import transaction
+from django.db.models import F, Max
+
+from .conditional import bump_table_version
+from .congestion import BERTH_RADIUS_NM, PORT_RADIUS_NM, SLOW_KNOTS, record_waits
+from .geo import nearest_point, port_coordinates
+from .models import Port, PortCallState, Voyage, VoyageTrack
+from .streaming import keyset_chunks
+from .upsert import upsert
+
+MIN_DWELL = timedelta(minutes=30)
+CHUNK_SIZE = 100000
+
+TRACK_COLUMNS = ("vessel_id", "timestamp", "id", "latitude", "longitude", "speed")
+STATE_FIELDS = ["port", "dwell_port", "dwell_start", "dwell_last", "arrived_at", "berthed_at", "last_track_id",
+                "updated_at"]
+
+AWAY = -1
+
+
+def _to_datetime(seconds):
+    return datetime.fromtimestamp(float(seconds), tz=dt_timezone.utc)
+
+
+class Segmenter:
+    def __init__(self, radius_nm=PORT_RADIUS_NM, slow_knots=SLOW_KNOTS, min_dwell=MIN_DWELL):
+        self.radius_nm = radius_nm
+        self.slow_knots = slow_knots
+        self.min_dwell = min_dwell.total_seconds()
+        self.port_ids, self.port_lats, self.port_lons = port_coordinates(
+            Port.objects.values_list("id", "location")
+        )
+        self.stats = Counter()
+
+    # -------- vectorized labelling --------
+
+    def label(self, lats, lons, speeds):
+        """
+        Per point: (port index or AWAY, slow flag, berth flag). A point is near
+        a port when within the radius of the nearest one.
+        """
+        nearest, distance = nearest_point(lats, lons, self.port_lats, self.port_lons)
+        near = np.where(distance <= self.radius_nm, nearest, AWAY)
+        slow = np.nan_to_num(np.asarray(speeds, dtype=float), nan=np.inf) <= self.slow_knots
+        return near, slow, distance <= BERTH_RADIUS_NM
+
+    # -------- processing --------
+
+    def process(self, rows):
+        """
+        Apply a batch of (vessel_id, timestamp, id, lat, lon, speed) rows sorted
+        by vessel then time: update voyages, port counters and call state.
+        """
+        if not rows or not len(self.port_ids):
+            return
+        vessel_ids, stamps, track_ids, lats, lons, speeds = zip(*rows)
+        vessel_ids = np.array(vessel_ids, dtype=np.int64)
+        seconds = np.array([stamp.timestamp() for stamp in stamps])
+        track_ids = np.array(track_ids, dtype=np.int64)
+        near, slow, berth = self.label(lats, lons, np.array(speeds, dtype=float))
+
+        # Runs of identical (vessel, near port, slow, berth) collapse into one step each
+        key_change = np.r_[True, (vessel_ids[1:] != vessel_ids[:-1]) | (near[1:] != near[:-1])
+                           | (slow[1:] != slow[:-1]) | (berth[1:] != berth[:-1])]
+        starts = np.flatnonzero(key_change)
+        ends = np.r_[starts[1:], len(vessel_ids)] - 1
+
+        unique_vessels = np.unique(vessel_ids).tolist()
+        states = {state.vessel_id: state for state in PortCallState.objects.filter(vessel_id__in=unique_vessels)}
+        open_voyages = {
+            voyage.vessel_id: voyage
+            for voyage in Voyage.objects.filter(vessel_id__in=unique_vessels, status="In Transit")
+            .order_by("departure_time")
+        }
+        self._new_voyages, self._changed_voyages = [], {}
+        self._arrivals, self._departures = Counter(), Counter()
+        self._waits = []
+
+        for start, end in zip(starts.tolist(), ends.tolist()):
+            vessel_id = int(vessel_ids[start])
+            state = states.get(vessel_id)
+            if state is None:
+                state = states[vessel_id] = PortCallState(vessel_id=vessel_id)
+            port = int(self.port_ids[near[start]]) if near[start] != AWAY else None
+            self._step(state, open_voyages, port, bool(slow[start]), bool(berth[start]), seconds[start],
+                       seconds[end])
+            state.last_track_id = max(state.last_track_id, int(track_ids[start:end + 1].max()))
+
+        self._write(states)
+
+    def _step(self, state, open_voyages, port, slow, berth, first, last):
+        if port is None:
+            # Outside every port radius: leaving the current port, abandoning any candidate call
+            if state.port_id is not None:
+                self._depart(state, open_voyages, first)
+            state.dwell_port_id = state.dwell_start = state.dwell_last = None
+            return
+
+        if state.port_id is not None and state.port_id != port:
+            # Straight from one port's radius into another's
+            self._depart(state, open_voyages, first)
+        if state.dwell_port_id is not None and state.dwell_port_id != port:
+            state.dwell_port_id = state.dwell_start = state.dwell_last = None
+        if not slow:
+            return  # manoeuvring near the port
+        if state.port_id == port:
+            if berth:
+                self._berth(state, first)
+            return
+
+        if state.dwell_port_id is None:
+            state.dwell_port_id, state.dwell_start = port, _to_datetime(first)
+        state.dwell_last = _to_datetime(last)
+        if (state.dwell_last - state.dwell_start).total_seconds() >= self.min_dwell:
+            self._arrive(state, open_voyages, port, state.dwell_start)
+            state.dwell_port_id = state.dwell_start = state.dwell_last = None
+            if berth:
+                self._berth(state, first)
+
+    def _arrive(self, state, open_voyages, port, when):
+        voyage = open_voyages.pop(state.vessel_id, None)
+        if voyage is not None:
+            voyage.port_to_id, voyage.arrival_time, voyage.status = port, when, "Completed"
+            self._track(voyage)
+        state.port_id, state.arrived_at, state.berthed_at = port, when, None
+        self._arrivals[port] += 1
+        self.stats["arrivals"] += 1
+
+    def _berth(self, state, seconds):
+        if state.berthed_at is not None:
+            return
+        state.berthed_at = max(_to_datetime(seconds), state.arrived_at)
+        self._waits.append((state.port_id, state.arrived_at, state.berthed_at))
+        self.stats["berthings"] += 1
+
+    def _depart(self, state, open_voyages, seconds):
+        when = _to_datetime(seconds)
+        stale = open_voyages.pop(state.vessel_id, None)
+        if stale is not None:
+            # Left a port without an observed arrival for the previous voyage
+            stale.status = "Incomplete"
+            self._track(stale)
+        voyage = Voyage(vessel_id=state.vessel_id, port_from_id=state.port_id, departure_time=when,
+                        status="In Transit")
+        self._new_voyages.append(voyage)
+        open_voyages[state.vessel_id] = voyage
+        self._departures[state.port_id] += 1
+        self.stats["departures"] += 1
+        state.port_id = state.arrived_at = state.berthed_at = None
+
+    def _track(self, voyage):
+        if voyage.pk is not None:
+            self._changed_voyages[voyage.pk] = voyage
+
+    def _write(self, states):
+        with transaction.atomic():
+            if self._new_voyages:
+                Voyage.objects.bulk_create(self._new_voyages)
+            if self._changed_voyages:
+                Voyage.objects.bulk_update(self._changed_voyages.values(), ["port_to", "arrival_time", "status"])
+            for port_id in set(self._arrivals) | set(self._departures):
+                Port.objects.filter(id=port_id).update(
+                    arrivals=F("arrivals") + self._arrivals[port_id],
+                    departures=F("departures") + self._departures[port_id],
+                )
+            upsert(PortCallState, states.values(), unique_fields=["vessel"], update_fields=STATE_FIELDS)
+            record_waits(self._waits)
+        if self._new_voyages or self._changed_voyages:
+            bump_table_version(Voyage)
+        if self._arrivals or self._departures:
+            bump_table_version(Port)
+
+
+def incremental(chunk_size=CHUNK_SIZE, segmenter=None):
+    """Process track rows added since the last run. Returns the Segmenter (see .stats)."""
+    segmenter = segmenter or Segmenter()
+    watermark = PortCallState.objects.aggregate(last=Max("last_track_id"))["last"] or 0
+    tracks = VoyageTrack.objects.filter(id__gt=watermark)
+    for rows in keyset_chunks(tracks, ("id",) + TRACK_COLUMNS, order_by=("id",), chunk_size=chunk_size):
+        rows = sorted((row[1:] for row in rows), key=lambda row: (row[0], row[1], row[2]))
+        segmenter.process(rows)
+        segmenter.stats["points"] += len(rows)
+    return segmenter
+
+
+def backfill(chunk_size=CHUNK_SIZE, reset=False, segmenter=None):
+    """
+    Segment the whole voyage_tracks table in (vessel_id, timestamp, id) order.
+    `reset` forgets all call state first; without it, rows at or below a
+    vessel's last_track_id are skipped, so points are never applied twice.
+    """
+    segmenter = segmenter or Segmenter()
+    if reset:
+        PortCallState.objects.all().delete()
+    for rows in keyset_chunks(VoyageTrack.objects.all(), TRACK_COLUMNS, order_by=("vessel_id", "timestamp", "id"),
+                              chunk_size=chunk_size):
+        done = dict(PortCallState.objects.filter(vessel_id__in={row[0] for row in rows})
+                    .values_list("vessel_id", "last_track_id"))
+        rows = [row for row in rows if row[2] > done.get(row[0], 0)]
+        segmenter.process(rows)
+        segmenter.stats["points"] += len(rows)
+    return segmenter
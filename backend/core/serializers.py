@@ -1,8 +1,9 @@
 from rest_framework import serializers
+from django.db.models import F, Value
 from django.contrib.auth import authenticate
 from .models import (
     User, AppUser, Vessel, Port,
-    Voyage, VoyageTrack, Event, Notification, RiskZone,Alert
+    Voyage, VoyageTrack, Event, Notification, RiskZone,Alert, VesselKinematics
 )
 
 # -------------------------
@@ -10,13 +11,14 @@ from .models import (
 # -------------------------
 
 class RegisterSerializer(serializers.ModelSerializer):
+    # Everyone signs up as an Operator; higher roles are granted by an admin (update_user_role)
     class Meta:
         model = User
-        fields = ["username", "email", "password", "role"]
+        fields = ["username", "email", "password"]
         extra_kwargs = {"password": {"write_only": True}}
 
     def create(self, validated_data):
-        return User.objects.create_user(**validated_data)
+        return User.objects.create_user(role="Operator", **validated_data)
 
 
 class LoginSerializer(serializers.Serializer):
@@ -94,4 +96,46 @@ class RiskZoneSerializer(serializers.ModelSerializer):
 class AlertSerializer(serializers.ModelSerializer):
     class Meta:
         model = Alert
-        fields = '__all__'
\ No newline at end of file
+        fields = '__all__'
+
+class VesselKinematicsSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = VesselKinematics
+        exclude = ["vessel"]
+
+
+# -------------------------
+# FAST PATH (high-volume lists)
+# -------------------------
+# Plain `.values()` rows with the same keys the ModelSerializers above produce,
+# rendered directly by core.renderers.ORJSONRenderer. Skips per-field
+# introspection and model instantiation for every row.
+
+VESSEL_COLUMNS = (
+    "id", "mmsi", "imo_number", "name", "type", "flag", "cargo_type", "operator",
+    "last_position_lat", "last_position_lon", "speed", "course", "last_update",
+)
+PORT_COLUMNS = (
+    "id", "name", "location", "country", "congestion_score", "avg_wait_time",
+    "arrivals", "departures", "last_update",
+)
+EVENT_COLUMNS = ("id", "event_type", "location", "timestamp", "details", "vessel")
+TRACK_COLUMNS = ("id", "latitude", "longitude", "speed", "course", "timestamp", "vessel")
+
+
+def vessel_rows(queryset):
+    return list(queryset.values(*VESSEL_COLUMNS))
+
+
+def port_rows(queryset):
+    return list(queryset.values(*PORT_COLUMNS))
+
+
+def event_rows(queryset):
+    return list(queryset.values(*EVENT_COLUMNS, vessel_name=F("vessel__name")))
+
+
+def track_rows(queryset, vessel_name):
+    # All points of a replay share one vessel; its name is known up front
+    return list(queryset.values(*TRACK_COLUMNS, vessel_name=Value(vessel_name)))
+
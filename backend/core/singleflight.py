@@ -0,0 +1,108 @@
+"""
+Request coalescing for expensive read-only aggregates (dashboard, analytics).
+
+do(key, compute) runs compute() once per key at a time: concurrent callers
+in this process that ask for the same key while it is in flight wait for
+that run and get its result (or its exception). Nothing is kept once the
+run finishes, so results are never staler than an uncoalesced request.
+
+ado(key, compute) is the same for async views: concurrent awaits of a key in
+one event loop share a single task running compute().
+
+With SINGLEFLIGHT_SHARED on, do() also coordinates through the shared cache:
+one worker takes a lock key, the others poll for the result it publishes
+(kept SINGLEFLIGHT_SHARED_TTL seconds) and fall back to computing themselves
+if it does not appear within SINGLEFLIGHT_WAIT seconds.
+"""
+import asyncio
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .metrics import SINGLEFLIGHT_CALLS
+
+POLL_SECONDS = 0.02
+
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    def __init__(self):
+        self._flights = {}
+        self._tasks = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, compute, name="default"):
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+
+        if not leader:
+            SINGLEFLIGHT_CALLS.inc(name=name, outcome="waited")
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        try:
+            if getattr(settings, "SINGLEFLIGHT_SHARED", False):
+                flight.result = self._shared(key, compute, name)
+            else:
+                SINGLEFLIGHT_CALLS.inc(name=name, outcome="leader")
+                flight.result = compute()
+            return flight.result
+        except Exception as exc:
+            flight.error = exc
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+
+    def _shared(self, key, compute, name):
+        lock_key, result_key = f"singleflight:lock:{key}", f"singleflight:result:{key}"
+        wait = getattr(settings, "SINGLEFLIGHT_WAIT", 5.0)
+        deadline = time.monotonic() + wait
+        while not cache.add(lock_key, 1, timeout=max(int(wait), 1)):
+            published = cache.get(result_key)
+            if published is not None:
+                SINGLEFLIGHT_CALLS.inc(name=name, outcome="shared")
+                return published[0]
+            if time.monotonic() >= deadline:
+                break  # the other worker is slow or gone: compute here
+            time.sleep(POLL_SECONDS)
+
+        SINGLEFLIGHT_CALLS.inc(name=name, outcome="leader")
+        try:
+            result = compute()
+            cache.set(result_key, (result,), timeout=getattr(settings, "SINGLEFLIGHT_SHARED_TTL", 1))
+            return result
+        finally:
+            cache.delete(lock_key)
+
+    async def ado(self, key, compute, name="default"):
+        """`compute` is a coroutine function; waiters get its result or exception."""
+        loop = asyncio.get_running_loop()
+        task = self._tasks.get((loop, key))
+        if task is None:
+            SINGLEFLIGHT_CALLS.inc(name=name, outcome="leader")
+            task = self._tasks[(loop, key)] = loop.create_task(compute())
+            task.add_done_callback(lambda _: self._tasks.pop((loop, key), None))
+        else:
+            SINGLEFLIGHT_CALLS.inc(name=name, outcome="waited")
+        # A cancelled waiter must not cancel the run the others are waiting on
+        return await asyncio.shield(task)
+
+
+group = SingleFlight()
+do = group.do
+ado = group.ado
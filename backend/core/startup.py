@@ -0,0 +1,92 @@
+"""
+Cold-start profile of the processes we run (driven by `manage.py profile_startup`).
+
+Each target is started in a fresh interpreter with `python -X importtime`,
+doing exactly what that process does before it can serve: the web worker
+sets up Django, builds the URL resolver and the WSGI handler (middleware);
+the ASGI worker (uvicorn, serving the api/async/ endpoints) the same with the
+ASGI handler; the ingest loads the AIS stream module. The import log gives a per-module
+breakdown; wall time is the median over a few runs.
+"""
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+
+TARGETS = {
+    "web": (
+        "import django; django.setup()\n"
+        "from django.urls import get_resolver; get_resolver().url_patterns\n"
+        "from django.core.wsgi import get_wsgi_application; get_wsgi_application()\n"
+    ),
+    "asgi": (
+        "import django; django.setup()\n"
+        "from django.urls import get_resolver; get_resolver().url_patterns\n"
+        "from django.core.asgi import get_asgi_application; get_asgi_application()\n"
+    ),
+    "ingest": (
+        "import django; django.setup()\n"
+        "import core.ais_stream\n"
+    ),
+}
+
+# Dependencies only some processes need: scraping (enrichment), the AIS
+# websocket client (ingest), numpy (congestion / segmentation jobs) and
+# pyarrow (columnar exports, imported per export)
+HEAVY_MODULES = ("bs4", "requests", "websockets", "numpy", "pyarrow")
+
+# -X importtime also logs imports that failed (optional-dependency probes),
+# so what actually got loaded is read back from sys.modules
+_REPORT_HEAVY = "import sys; print(' '.join(m for m in %r if m in sys.modules))\n" % (HEAVY_MODULES,)
+
+
+def parse_importtime(stderr):
+    """[(module, self_us, cumulative_us, depth)] from `-X importtime` output."""
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        if not self_us.strip().isdigit():
+            continue  # the header line
+        depth = (len(name) - len(name.lstrip())) // 2
+        modules.append((name.strip(), int(self_us), int(cumulative_us), depth))
+    return modules
+
+
+def run_target(target, importtime=False):
+    """(wall seconds, stderr, loaded HEAVY_MODULES) of one cold start of `target` in a new interpreter."""
+    command = [sys.executable] + (["-X", "importtime"] if importtime else []) + ["-c", TARGETS[target] + _REPORT_HEAVY]
+    env = {**os.environ, "DJANGO_SETTINGS_MODULE": os.environ.get("DJANGO_SETTINGS_MODULE", "backend.settings")}
+    start = time.perf_counter()
+    result = subprocess.run(command, cwd=settings.BASE_DIR, env=env, capture_output=True, text=True)
+    elapsed = time.perf_counter() - start
+    if result.returncode:
+        raise RuntimeError(f"{target} failed to start:\n{result.stderr[-2000:]}")
+    return elapsed, result.stderr, result.stdout.split()
+
+
+def profile(target, repeat=5, top=25):
+    """
+    {"wall_ms": median cold start, "imports_ms": total import time,
+     "top_level": the slowest first-level imports, "slowest_self": modules
+     that are slow themselves (not through what they import), "heavy": the
+     HEAVY_MODULES the target loads}.
+    """
+    walls = [run_target(target)[0] for _ in range(repeat)]
+    _, stderr, heavy = run_target(target, importtime=True)
+    modules = parse_importtime(stderr)
+    top_level = sorted((m for m in modules if m[3] == 0), key=lambda m: -m[2])
+    return {
+        "target": target,
+        "wall_ms": round(statistics.median(walls) * 1000, 1),
+        "imports_ms": round(sum(m[2] for m in modules if m[3] == 0) / 1000, 1),
+        "modules": len(modules),
+        "top_level": [(name, round(cumulative / 1000, 1)) for name, _, cumulative, _ in top_level[:top]],
+        "slowest_self": [(name, round(own / 1000, 1))
+                         for name, own, _, _ in sorted(modules, key=lambda m: -m[1])[:top]],
+        "heavy": heavy,
+    }
@@ -0,0 +1,45 @@
+from django.apps import apps
+from django.conf import settings
+from django.db import connections
+from django.test.runner import DiscoverRunner
+
+
+class UnmanagedModelTestRunner(DiscoverRunner):
+    """
+    Most maritime tables (vessels, ports, voyages, ...) are unmanaged, so the
+    migrations never create them. Build them in the test databases directly.
+    """
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        # Audit events are written by record() itself, inside each test's transaction
+        settings.AUDIT_ASYNC = False
+        # Every test client shares 127.0.0.1; RateLimitTests turn this back on
+        settings.RATE_LIMIT_ENABLED = False
+        # Views read the database unless a test publishes a snapshot
+        settings.FLEET_SNAPSHOT_PATH = ""
+
+    def teardown_test_environment(self, **kwargs):
+        # Events still queued by the last test must not reach the real database
+        from core.audit import writer
+        writer.discard()
+        super().teardown_test_environment(**kwargs)
+
+    def setup_databases(self, **kwargs):
+        old_config = super().setup_databases(**kwargs)
+        unmanaged = [
+            model for model in apps.get_app_config("core").get_models()
+            if not model._meta.managed
+        ]
+        for alias in connections:
+            connection = connections[alias]
+            if connection.settings_dict.get("TEST", {}).get("MIRROR"):
+                continue
+            existing = set(connection.introspection.table_names())
+            with connection.schema_editor() as editor:
+                for model in unmanaged:
+                    if model._meta.db_table not in existing:
+                        editor.create_model(model)
+                        # create_model skips Meta.indexes on unmanaged models
+                        for index in model._meta.indexes:
+                            editor.add_index(model, index)
+        return old_config
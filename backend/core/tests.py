@@ -1,3 +1,1435 @@
-from django.test import TestCase
+import asyncio
+import gzip
+import io
+import json
+import os
+import tempfile
+import threading
+import time
+import unittest
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone as dt_timezone
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+from .auth import RoleRefreshToken
+from .anomalies import AIS_GAP, POSITION_JUMP, SPEED_DROP, AnomalyDetector, backfill
+from .compression import negotiate
+from . import congestion
+from . import kpis
+from .conditional import bump_table_version
+from .kinematics import record_point, recompute_fleet, window_kinematics
+from .db_router import ReplicaRouter, _replica_down_until, read_from, replica_available
+from .models import (
+    AppUser, AuditEvent, Event, Notification, Port, Role, UserRole, PortCallState, PortCongestion, RiskZone, Vessel, VesselKinematics, Voyage,
+    VoyageTrack,
+)
+from .profiling import QueryBudgetTestMixin, QueryProfile, fingerprint, profile_queries
+from .renderers import ORJSONRenderer
+from . import ais_replay
+from . import audit
+from . import ratelimit
+from . import roles
+from .metrics import CONTENT_TYPE, HTTP_REQUEST_QUERIES, SINGLEFLIGHT_CALLS, Counter, Gauge, Histogram, Registry
+from .singleflight import SingleFlight
+from .search import SEARCH_COLUMNS, VesselSearchIndex, vessel_index
+from . import columnar
+from . import fleet_snapshot
+from . import segmentation
+from . import startup
+from .unctad_loader import fetch_unctad_ports
+from .streaming import iter_rows
+from .serializers import (
+    EventSerializer, PortSerializer, VesselSerializer, VoyageTrackSerializer,
+    event_rows, port_rows, track_rows, vessel_rows,
+)
+
+
+class AnalystClient(Client):
+    """Test client sending an unscoped Analyst token, which the fleet-scoped endpoints require."""
+
+    def __init__(self, **defaults):
+        analyst = get_user_model()(id=0, username="analyst", role="Analyst")
+        token = RoleRefreshToken.for_user(analyst).access_token
+        super().__init__(HTTP_AUTHORIZATION=f"Bearer {token}", **defaults)
+
+
+@contextmanager
+def mysql_upsert_features():
+    """The default connection reports MySQL's upsert features; yields the (mocked) bulk_create."""
+    with mock.patch.object(connection.features, "supports_update_conflicts_with_target", False), \
+            mock.patch("django.db.models.query.QuerySet.bulk_create") as bulk_create:
+        yield bulk_create
+
+
+def create_fleet(vessel_count=5, tracks_per_vessel=5):
+    """Small fixture fleet - enough rows for per-row (N+1) queries to show up."""
+    now = timezone.now()
+    system_user = AppUser.objects.create(username="system_admin", email="admin@maritimeos.com", password="x")
+    ports = [
+        Port.objects.create(name=f"Port {i}", country="Testland", location=f"{i}.0, {i}.0",
+                            congestion_score=50 + i * 10, avg_wait_time=i + 1.0, last_update=now)
+        for i in range(5)
+    ]
+    RiskZone.objects.create(name="Storm", risk_type="WEATHER", latitude=0, longitude=0, radius_km=50)
+    vessels = []
+    for i in range(vessel_count):
+        vessel = Vessel.objects.create(
+            mmsi=str(100000000 + i), name=f"VESSEL {i}", type="Container Ship", cargo_type="Containers",
+            last_position_lat=10.0 + i, last_position_lon=20.0 + i, speed=12.0, course=90.0, last_update=now,
+        )
+        vessels.append(vessel)
+        Voyage.objects.create(
+            vessel=vessel, port_from=ports[i % 5], port_to=ports[(i + 1) % 5], status="In Transit",
+            departure_time=now - timedelta(days=1), arrival_time=now + timedelta(days=1),
+        )
+        for t in range(tracks_per_vessel):
+            VoyageTrack.objects.create(vessel=vessel, latitude=10.0 + t, longitude=20.0 + t,
+                                       speed=12.0, course=90.0, timestamp=now - timedelta(hours=t))
+        event = Event.objects.create(vessel=vessel, event_type="Speed Drop", location="0, 0", details="test")
+        Notification.objects.create(user=system_user, vessel=vessel, event=event,
+                                    message=f"CRITICAL: Port of Port {i} congestion. Wait time 4.5h.", type="Alert")
+    return vessels
+
+
+class FingerprintTests(TestCase):
+    def test_literals_are_normalised(self):
+        a = fingerprint("SELECT * FROM vessels WHERE id = 12 AND name = 'ALPHA'")
+        b = fingerprint("SELECT * FROM vessels WHERE id = 7 AND name = 'BRAVO'")
+        self.assertEqual(a, b)
+
+    def test_duplicates_are_reported(self):
+        create_fleet(vessel_count=3)
+        with profile_queries() as profile:
+            for track in VoyageTrack.objects.all():
+                track.vessel.name
+        self.assertTrue(profile.duplicates())
+
+
+class EndpointQueryBudgetTests(QueryBudgetTestMixin, TestCase):
+    """
+    Fails when an endpoint goes over its budget in settings.QUERY_BUDGETS or
+    starts issuing per-row queries.
+    """
+    client_class = AnalystClient
+
+    @classmethod
+    def setUpTestData(cls):
+        create_fleet()
+        cls.voyage_id = Voyage.objects.first().id
+
+    def assertEndpointWithinBudget(self, route, url):
+        with self.assertQueryBudget(route, duplicate_limit=1):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+
+    def test_vessels(self):
+        self.assertEndpointWithinBudget("api/vessels/", "/api/vessels/")
+
+    def test_ports(self):
+        self.assertEndpointWithinBudget("api/ports/", "/api/ports/")
+
+    def test_voyages(self):
+        self.assertEndpointWithinBudget("api/voyages/", "/api/voyages/")
+
+    def test_events(self):
+        self.assertEndpointWithinBudget("api/events/", "/api/events/")
+
+    def test_risks(self):
+        self.assertEndpointWithinBudget("api/risks/", "/api/risks/")
+
+    def test_voyage_track(self):
+        self.assertEndpointWithinBudget("api/voyage-track/<int:voyage_id>/", f"/api/voyage-track/{self.voyage_id}/")
+
+    def test_dashboard(self):
+        self.assertEndpointWithinBudget("api/dashboard/", "/api/dashboard/")
+
+    def test_analytics(self):
+        self.assertEndpointWithinBudget("api/analytics/", "/api/analytics/")
+
+    def test_alerts(self):
+        self.assertEndpointWithinBudget("api/alerts/", "/api/alerts/?page_size=100")
+
+    def test_vessel_search(self):
+        vessel_index.load([])  # loaded: the request only runs the delta query
+        self.assertEndpointWithinBudget("api/vessels/search/", "/api/vessels/search/?q=vessel")
+        vessel_index._reset()
+
+    def test_vessel_detail(self):
+        vessel_id = Vessel.objects.first().id
+        self.assertEndpointWithinBudget("api/vessels/<int:vessel_id>/", f"/api/vessels/{vessel_id}/")
+
+
+class HotQueryIndexTests(TestCase):
+    """
+    EXPLAIN each hot query and check the planner picks the index added for it
+    (Meta.indexes / migration 0002). The index name shows up in both the
+    SQLite and MySQL plans.
+    """
+    @classmethod
+    def setUpTestData(cls):
+        create_fleet(vessel_count=3, tracks_per_vessel=3)
+
+    def assertUsesIndex(self, queryset, index_name):
+        plan = queryset.explain()
+        self.assertIn(index_name, plan, f"{queryset.query}\n{plan}")
+
+    def test_hot_queries_use_indexes(self):
+        since = timezone.now() - timedelta(days=30)
+        vessel_id = Vessel.objects.values_list("id", flat=True).first()
+        self.assertUsesIndex(Voyage.objects.filter(status="In Transit").order_by("-departure_time")[:5],
+                             "voyages_status_departure_idx")
+        self.assertUsesIndex(Voyage.objects.order_by("-departure_time")[:10], "voyages_departure_idx")
+        self.assertUsesIndex(Voyage.objects.filter(arrival_time__gte=since), "voyages_arrival_idx")
+        self.assertUsesIndex(Port.objects.order_by("-congestion_score")[:5], "ports_congestion_idx")
+        self.assertUsesIndex(Notification.objects.order_by("-timestamp")[:20], "notifications_timestamp_idx")
+        self.assertUsesIndex(Event.objects.order_by("-timestamp")[:20], "events_timestamp_idx")
+        self.assertUsesIndex(Vessel.objects.filter(type="Tanker"), "vessels_type_idx")
+        self.assertUsesIndex(VoyageTrack.objects.filter(vessel_id=vessel_id).order_by("timestamp"),
+                             "tracks_vessel_timestamp_idx")
+        self.assertUsesIndex(AuditEvent.objects.filter(timestamp__gte=since).order_by("-timestamp", "-id")[:50],
+                             "audit_timestamp_id_idx")
+        self.assertUsesIndex(get_user_model().objects.order_by("-last_login", "-id")[:25], "core_user_last_login_idx")
+
+class FastPathSerializationTests(TestCase):
+    """The values()-based list payloads must match what the ModelSerializers produced."""
+    @classmethod
+    def setUpTestData(cls):
+        cls.vessels = create_fleet(vessel_count=3, tracks_per_vessel=3)
+
+    def assertSamePayload(self, fast, slow):
+        fast_json = json.loads(ORJSONRenderer().render(fast))
+        slow_json = json.loads(JSONRenderer().render(slow))
+        self.assertEqual(fast_json, slow_json)
+
+    def test_vessels(self):
+        self.assertSamePayload(vessel_rows(Vessel.objects.order_by("id")),
+                               VesselSerializer(Vessel.objects.order_by("id"), many=True).data)
+
+    def test_ports(self):
+        self.assertSamePayload(port_rows(Port.objects.order_by("id")),
+                               PortSerializer(Port.objects.order_by("id"), many=True).data)
+
+    def test_events(self):
+        self.assertSamePayload(event_rows(Event.objects.order_by("id")),
+                               EventSerializer(Event.objects.order_by("id"), many=True).data)
+
+    def test_tracks(self):
+        vessel = self.vessels[0]
+        tracks = VoyageTrack.objects.filter(vessel=vessel).order_by("timestamp")
+        self.assertSamePayload(track_rows(tracks, vessel.name), VoyageTrackSerializer(tracks, many=True).data)
+
+
+class MetricsTests(TestCase):
+    def test_text_format_and_cumulative_buckets(self):
+        registry = Registry()
+        latency = Histogram("latency_seconds", "Latency", ["view"], buckets=(5, 1), registry=registry)
+        for value in (0.5, 1, 2, 10):  # a value on a bound falls in that bucket (le)
+            latency.observe(value, view="api/ports/")
+        requests = Counter("requests_total", "Requests", ["path"], registry=registry)
+        requests.inc(path='say "hi"\n')
+        lag = Gauge("lag_seconds", "Lag", registry=registry)
+        lag.set_function(lambda: 2.5)
+        self.assertEqual(registry.render(), "\n".join([
+            "# HELP latency_seconds Latency",
+            "# TYPE latency_seconds histogram",
+            'latency_seconds_bucket{view="api/ports/",le="1"} 2',
+            'latency_seconds_bucket{view="api/ports/",le="5"} 3',
+            'latency_seconds_bucket{view="api/ports/",le="+Inf"} 4',
+            'latency_seconds_sum{view="api/ports/"} 13.5',
+            'latency_seconds_count{view="api/ports/"} 4',
+            "# HELP requests_total Requests",
+            "# TYPE requests_total counter",
+            'requests_total{path="say \\"hi\\"\\n"} 1',
+            "# HELP lag_seconds Lag",
+            "# TYPE lag_seconds gauge",
+            "lag_seconds 2.5",
+        ]) + "\n")
+
+    def test_misuse_is_rejected(self):
+        registry = Registry()
+        requests = Counter("requests_total", "Requests", ["path"], registry=registry)
+        with self.assertRaises(ValueError):
+            requests.inc(-1, path="/")
+        with self.assertRaises(ValueError):
+            requests.inc(route="/")
+        with self.assertRaises(ValueError):
+            Counter("requests_total", "Again", registry=registry)
+
+    def test_endpoint_serves_request_metrics_from_one_shared_profile(self):
+        before = HTTP_REQUEST_QUERIES.count(view="api/ports/")
+        with mock.patch("core.profiling.QueryProfile", wraps=QueryProfile) as profiles, \
+                override_settings(DEBUG=True):
+            response = self.client.get("/api/ports/")
+        # MetricsMiddleware and QueryBudgetMiddleware read the same per-request profile
+        self.assertEqual(profiles.call_count, 1)
+        self.assertEqual(HTTP_REQUEST_QUERIES.count(view="api/ports/"), before + 1)
+        self.assertIn("X-DB-Queries", response)
+
+        scrape = self.client.get("/metrics/")
+        self.assertEqual(scrape["Content-Type"], CONTENT_TYPE)
+        self.assertIn('http_request_duration_seconds_count{view="api/ports/",method="GET",status="200"}',
+                      scrape.content.decode())
+
+
+class StreamingExportTests(TestCase):
+    client_class = AnalystClient
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.vessel = create_fleet(vessel_count=2, tracks_per_vessel=7)[0]
+        cls.voyage_id = Voyage.objects.get(vessel=cls.vessel).id
+        # Duplicate timestamps straddling chunk boundaries must not drop or repeat rows
+        ts = timezone.now() - timedelta(days=3)
+        for _ in range(4):
+            VoyageTrack.objects.create(vessel=cls.vessel, latitude=0, longitude=0, timestamp=ts)
+
+    def test_keyset_chunks_cover_every_row_once(self):
+        tracks = VoyageTrack.objects.filter(vessel=self.vessel)
+        rows = list(iter_rows(tracks, ("id", "timestamp"), order_by=("timestamp", "id"), chunk_size=3))
+        expected = list(tracks.order_by("timestamp", "id").values_list("id", flat=True))
+        self.assertEqual([row["id"] for row in rows], expected)
+
+    def test_ndjson_track_export(self):
+        response = self.client.get(f"/api/voyage-track/{self.voyage_id}/?export=ndjson")
+        self.assertTrue(response.streaming)
+        lines = b"".join(response.streaming_content).splitlines()
+        self.assertEqual(len(lines), 11)
+        self.assertEqual(json.loads(lines[0])["vessel_name"], self.vessel.name)
+
+    def test_csv_vessel_export(self):
+        response = self.client.get("/api/vessels/?export=csv")
+        lines = b"".join(response.streaming_content).decode().splitlines()
+        self.assertTrue(lines[0].startswith("id,mmsi,"))
+        self.assertEqual(len(lines), 1 + Vessel.objects.count())
+
+    def test_unknown_format_is_rejected(self):
+        self.assertEqual(self.client.get("/api/vessels/?export=xml").status_code, 400)
+
+
+class FleetSnapshotTests(TestCase):
+    client_class = AnalystClient
+
+    @classmethod
+    def setUpTestData(cls):
+        create_fleet(vessel_count=6, tracks_per_vessel=1)
+        Vessel.objects.filter(name__in=["VESSEL 1", "VESSEL 4"]).update(operator="Maersk Line", flag="Panama")
+        Vessel.objects.filter(name="VESSEL 2").update(imo_number=None, cargo_type=None, speed=None, name="VESSEL Ø")
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, "fleet.snap")
+        fleet_snapshot.publish(self.path)
+
+    def get(self, url, path, **headers):
+        with override_settings(FLEET_SNAPSHOT_PATH=path):
+            response = self.client.get(url, **headers)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_snapshot_serves_the_database_payload_without_queries(self):
+        for query in ("", "?bbox=21.5,0,24.5,12.5", "?bbox=24.5,-90,21.5,90"):
+            expected = self.get(f"/api/vessels/{query}", "")
+            with self.assertNumQueries(0):
+                actual = self.get(f"/api/vessels/{query}", self.path)
+            self.assertEqual(actual, expected)
+        self.assertEqual(actual["count"], 3)
+
+    def test_operator_scope(self):
+        operator = get_user_model().objects.create_user(username="ops", password="pw-12345!",
+                                                        role="Operator", fleet_operator="Maersk Line")
+        headers = {"HTTP_AUTHORIZATION": f"Bearer {RoleRefreshToken.for_user(operator).access_token}"}
+        vessels = self.get("/api/vessels/", self.path, **headers)["vessels"]
+        self.assertEqual([v["name"] for v in vessels], ["VESSEL 1", "VESSEL 4"])
+
+    def test_readers_follow_new_generations_and_skip_stale_ones(self):
+        Vessel.objects.filter(name="VESSEL 0").update(speed=3.5)
+        self.assertNotEqual(self.get("/api/vessels/", self.path)["vessels"][0]["speed"], 3.5)
+        fleet_snapshot.publish(self.path)
+        self.assertEqual(self.get("/api/vessels/", self.path)["vessels"][0]["speed"], 3.5)
+
+        Vessel.objects.filter(name="VESSEL 0").update(speed=4.5)
+        with override_settings(FLEET_SNAPSHOT_MAX_AGE=-1):
+            self.assertEqual(self.get("/api/vessels/", self.path)["vessels"][0]["speed"], 4.5)
+
+    def test_old_generation_is_unmapped_once_its_last_reader_is_done(self):
+        reader = fleet_snapshot.SnapshotReader()
+        with reader.current(self.path) as old:
+            fleet_snapshot.publish(self.path)
+            with reader.current(self.path) as new:
+                self.assertIsNot(new, old)
+                self.assertFalse(old.buffer.closed)  # still in use by the outer block
+                self.assertEqual(len(old.rows()), 6)
+        self.assertTrue(old.buffer.closed)
+        self.assertFalse(new.buffer.closed)
+
+        fleet_snapshot.publish(self.path)
+        with reader.current(self.path):
+            pass
+        self.assertTrue(new.buffer.closed)  # swapped out with nobody reading it
+
+    def test_clusters(self):
+        for query in ("?zoom=0", "?zoom=6", "?zoom=3&bbox=21.5,0,24.5,12.5"):
+            expected = self.get(f"/api/vessels/clusters/{query}", "")
+            with self.assertNumQueries(0):
+                actual = self.get(f"/api/vessels/clusters/{query}", self.path)
+            self.assertEqual(actual, expected)
+        self.assertEqual(self.get("/api/vessels/clusters/?zoom=0", self.path)["count"], 6)
+        self.assertEqual(len(self.get("/api/vessels/clusters/?zoom=20", self.path)["clusters"]), 6)
+        for query in ("?zoom=21", "?zoom=-1", "?zoom=x", "?bbox=1,2,3"):
+            self.assertEqual(self.client.get(f"/api/vessels/clusters/{query}").status_code, 400)
+
+    def test_invalid_bbox(self):
+        self.assertEqual(self.client.get("/api/vessels/?bbox=1,2,3").status_code, 400)
+
+
+@unittest.skipUnless(columnar.available(), "pyarrow is not installed")
+class ColumnarExportTests(TestCase):
+    client_class = AnalystClient
+
+    @classmethod
+    def setUpTestData(cls):
+        create_fleet(vessel_count=5, tracks_per_vessel=4)
+        Vessel.objects.filter(name="VESSEL 3").update(type="Tanker", flag="Panama", cargo_type=None)
+
+    def read(self, dataset, fmt, query=""):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        response = self.client.get(f"/api/export/{dataset}/?export={fmt}{query}")
+        self.assertEqual(response.status_code, 200)
+        data = pa.BufferReader(b"".join(response.streaming_content))
+        return pq.read_table(data) if fmt == "parquet" else pa.ipc.open_file(data).read_all()
+
+    def test_typed_columns_with_dictionaries_across_batches(self):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        for fmt in columnar.FORMATS:
+            queryset = columnar.export_queryset("vessels")
+            # Two rows per batch, so dictionaries grow between batches
+            chunks = list(columnar.export_chunks("vessels", queryset, fmt, chunk_size=2))
+            data = pa.BufferReader(b"".join(chunks))
+            table = pq.read_table(data) if fmt == "parquet" else pa.ipc.open_file(data).read_all()
+            self.assertEqual(table.schema, columnar.schema("vessels"))
+            expected = list(Vessel.objects.order_by("id").values_list("name", "type", "cargo_type"))
+            actual = list(zip(*(table.column(c).to_pylist() for c in ("name", "type", "cargo_type"))))
+            self.assertEqual(actual, expected)
+
+    def test_track_time_range_and_formats(self):
+        since = (timezone.now() - timedelta(hours=1, minutes=30)).isoformat().replace("+00:00", "Z")
+        for fmt in columnar.FORMATS:
+            table = self.read("tracks", fmt, f"&since={since}")
+            self.assertEqual(table.num_rows, 5 * 2)
+            self.assertEqual(str(table.schema.field("timestamp").type), "timestamp[us, tz=UTC]")
+
+    def test_rejects_unknown_dataset_format_and_bounds(self):
+        self.assertEqual(self.client.get("/api/export/users/").status_code, 404)
+        self.assertEqual(self.client.get("/api/export/vessels/?export=xml").status_code, 400)
+        self.assertEqual(self.client.get("/api/export/tracks/?since=yesterday").status_code, 400)
+
+
+class ConditionalRequestTests(TestCase):
+    client_class = AnalystClient
+
+    @classmethod
+    def setUpTestData(cls):
+        create_fleet(vessel_count=2)
+
+    def test_unchanged_ports_return_304_without_serializing(self):
+        first = self.client.get("/api/ports/")
+        etag = first["ETag"]
+        with self.assertNumQueries(1):  # just the version aggregate
+            second = self.client.get("/api/ports/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(second.status_code, 304)
+        self.assertIn("Last-Modified", first)
+
+    def assertEtagChanges(self, url, write):
+        etag = self.client.get(url)["ETag"]
+        write()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200, url)
+
+    def test_saves_change_the_etag(self):
+        self.assertEtagChanges("/api/ports/", lambda: Port.objects.first().save())
+        self.assertEtagChanges("/api/risks/", lambda: RiskZone.objects.create(
+            name="Pirates", risk_type="PIRACY", latitude=1, longitude=1, radius_km=5))
+
+    def test_bulk_writers_bump_the_version(self):
+        # update() bypasses signals, so bulk writers bump explicitly. The counter
+        # is a table_versions row: no per-process cache state is involved
+        cache.clear()
+
+        def close_voyages():
+            Voyage.objects.update(status="Completed")
+            bump_table_version(Voyage)
+            cache.clear()
+        self.assertEtagChanges("/api/voyages/", close_voyages)
+        # Same timestamp, same row count: only the counter moves
+        now = timezone.now()
+        Port.objects.update(last_update=now)
+        self.assertEtagChanges("/api/ports/", lambda: congestion.refresh(now=now))
+
+
+class CompressionTests(TestCase):
+    client_class = AnalystClient
+
+    @classmethod
+    def setUpTestData(cls):
+        create_fleet(vessel_count=20, tracks_per_vessel=1)
+
+    def test_negotiate_honours_q_values(self):
+        self.assertEqual(negotiate("gzip, br;q=0", preferred=("br", "gzip")), "gzip")
+        self.assertEqual(negotiate("br;q=0.5, gzip;q=0.8", preferred=("br", "gzip")), "gzip")
+        self.assertEqual(negotiate("*", preferred=("br", "gzip")), "br")
+        self.assertIsNone(negotiate("identity", preferred=("br", "gzip")))
+
+    def test_large_api_response_is_gzipped(self):
+        plain = self.client.get("/api/vessels/")
+        response = self.client.get("/api/vessels/", HTTP_ACCEPT_ENCODING="gzip")
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertEqual(gzip.decompress(response.content), plain.content)
+        self.assertIn("Accept-Encoding", response["Vary"])
+
+    def test_streaming_export_is_gzipped(self):
+        plain = b"".join(self.client.get("/api/vessels/?export=ndjson").streaming_content)
+        response = self.client.get("/api/vessels/?export=ndjson", HTTP_ACCEPT_ENCODING="gzip")
+        self.assertEqual(gzip.decompress(b"".join(response.streaming_content)), plain)
+
+    def test_small_responses_are_left_alone(self):
+        response = self.client.get("/api/", HTTP_ACCEPT_ENCODING="gzip")
+        self.assertFalse(response.has_header("Content-Encoding"))
+
+
+class VesselSearchTests(TestCase):
+    client_class = AnalystClient
+
+    ROWS = [
+        {"id": 1, "name": "OCEAN STAR", "mmsi": "211000001", "imo_number": "IMO 9100001",
+         "operator": "Maersk Line", "type": "Container Ship", "flag": "DK", "last_update": None},
+        {"id": 2, "name": "OCEAN HARMONY", "mmsi": "211000002", "imo_number": "IMO 9100002",
+         "operator": "Hapag-Lloyd", "type": "Tanker", "flag": "DE", "last_update": None},
+        {"id": 3, "name": "PACIFIC STAR", "mmsi": "311000003", "imo_number": None,
+         "operator": "MSC", "type": "Bulk Carrier", "flag": "PA", "last_update": None},
+    ]
+
+    def setUp(self):
+        self.index = VesselSearchIndex()
+        self.index.load(dict(row) for row in self.ROWS)
+        vessel_index._reset()
+        self.addCleanup(vessel_index._reset)
+
+    def names(self, query):
+        return [row["name"] for row in self.index.search(query)]
+
+    def test_identifiers_rank_first(self):
+        self.assertEqual(self.names("211000002")[0], "OCEAN HARMONY")
+        self.assertEqual(self.names("IMO 9100003"), [])
+        self.assertEqual(self.names("9100001"), ["OCEAN STAR"])
+        self.assertEqual(self.names("2110"), ["OCEAN STAR", "OCEAN HARMONY"])
+
+    def test_prefix_typos_and_operator(self):
+        self.assertEqual(self.names("ocean st"), ["OCEAN STAR"])
+        self.assertEqual(self.names("oceen str"), ["OCEAN STAR"])
+        self.assertEqual(self.names("hapag"), ["OCEAN HARMONY"])
+        # A name match outranks an operator match
+        self.assertEqual(self.names("star")[:2], ["OCEAN STAR", "PACIFIC STAR"])
+
+    def test_renames_and_deletes_are_reindexed(self):
+        self.index.upsert(dict(self.ROWS[0], name="NORTHERN LIGHT"))
+        self.assertEqual(self.names("ocean"), ["OCEAN HARMONY"])
+        self.assertEqual(self.names("northern"), ["NORTHERN LIGHT"])
+        self.index.remove(2)
+        self.assertEqual(self.names("ocean"), [])
+
+    def test_endpoint_follows_saves(self):
+        vessel = create_fleet(vessel_count=2, tracks_per_vessel=0)[0]
+        self.assertEqual(self.client.get("/api/vessels/search/?q=vessel").json()["count"], 2)
+        vessel.name = "SEA BREEZE"
+        vessel.save()  # post_save keeps the loaded index current
+        results = self.client.get("/api/vessels/search/?q=breeze").json()["results"]
+        self.assertEqual([row["id"] for row in results], [vessel.id])
+
+    def test_delta_load_picks_up_enrichment_from_another_process(self):
+        create_fleet(vessel_count=2, tracks_per_vessel=0)
+        index = VesselSearchIndex()
+        index.load(Vessel.objects.values(*SEARCH_COLUMNS))
+        # The command's post_save signals reach this process's vessel_index, not `index`
+        with mock.patch("core.management.commands.enrich_vessels.random.choice", lambda values: values[-1]):
+            call_command("enrich_vessels", stdout=io.StringIO())
+        index.refreshed_at = 0
+        lock_held = []
+
+        def record(execute, sql, params, many, context):
+            lock_held.append(index._lock._is_owned())
+            return execute(sql, params, many, context)
+        with connection.execute_wrapper(record):
+            index.ensure_fresh()
+        self.assertEqual(lock_held, [False])
+        self.assertEqual({row["operator"] for row in index.search("vessel")}, {"ONE Network"})
+
+    def test_reconcile_drops_vessels_deleted_by_another_process(self):
+        vessels = create_fleet(vessel_count=3, tracks_per_vessel=0)
+        index = VesselSearchIndex()
+        index.load(Vessel.objects.values(*SEARCH_COLUMNS))
+        # Deleted by another process: no signal reaches `index` and no last_update moves
+        Voyage.objects.filter(vessel=vessels[0]).delete()
+        Vessel.objects.filter(id=vessels[0].id).delete()
+        index.refreshed_at = 0
+        index.ensure_fresh()
+        self.assertEqual(len(index.search("vessel")), 3)  # until the next id-set check
+
+        index.refreshed_at = index.reconciled_at = 0
+        with self.assertNumQueries(2):
+            index.ensure_fresh()
+        self.assertEqual({row["id"] for row in index.search("vessel")}, {v.id for v in vessels[1:]})
+
+    def test_detail_404(self):
+        response = self.client.get("/api/vessels/999999/")
+        self.assertEqual(response.status_code, 404)
+
+
+class ReplicaRoutingTests(TestCase):
+    client_class = AnalystClient
+
+    def test_reads_use_the_replica_until_the_request_writes(self):
+        router = ReplicaRouter()
+        self.assertIsNone(router.db_for_read(Vessel))
+        with read_from("replica"):
+            self.assertEqual(router.db_for_read(Vessel), "replica")
+            self.assertEqual(router.db_for_write(Vessel), "default")
+            self.assertIsNone(router.db_for_read(Vessel))
+        self.assertIsNone(router.db_for_read(Vessel))
+
+    def test_replica_is_never_migrated(self):
+        with override_settings(DATABASE_READ_REPLICA="replica"):
+            self.assertFalse(ReplicaRouter().allow_migrate("replica", "core"))
+            self.assertIsNone(ReplicaRouter().allow_migrate("default", "core"))
+
+    @override_settings(DATABASE_READ_REPLICA="missing")
+    def test_unreachable_replica_falls_back_to_primary(self):
+        self.addCleanup(_replica_down_until.clear)
+        create_fleet(vessel_count=1, tracks_per_vessel=0)
+        with self.assertLogs("core.db_router", "WARNING"):
+            response = self.client.get("/api/vessels/")
+        self.assertEqual(response.json()["count"], 1)
+        self.assertIn("missing", _replica_down_until)
+        self.assertFalse(replica_available("missing"))  # not retried until the back-off passes
+
+
+def eastbound_track(vessel, start, points=7, knots=12.0, minutes=10):
+    """Points along the equator heading due east at `knots`."""
+    step = knots * minutes / 60 / 60  # nm -> degrees of longitude at the equator
+    return [
+        VoyageTrack.objects.create(vessel=vessel, latitude=0.0, longitude=i * step, speed=knots, course=90.0,
+                                   timestamp=start + timedelta(minutes=i * minutes))
+        for i in range(points)
+    ]
+
+
+class KinematicsTests(TestCase):
+    client_class = AnalystClient
+
+    def test_window_speed_heading_and_glitches(self):
+        seconds = [0, 600, 1200, 1800, 1900, 2400]
+        lons = [0.0, 2 / 60, 4 / 60, 6 / 60, 5.0, 8 / 60]  # 12 kn east, one teleport
+        state = window_kinematics([7] * 6 + [8], [0.0] * 7, lons + [1.0], seconds + [0],
+                                  speeds=[12.0] * 6 + [5.0], courses=[90.0] * 6 + [180.0])
+        self.assertEqual(state["vessel_id"].tolist(), [7, 8])
+        self.assertAlmostEqual(state["speed_knots"][0], 12.0, delta=0.1)
+        self.assertAlmostEqual(state["heading"][0], 90.0, delta=0.5)
+        self.assertAlmostEqual(state["distance_nm"][0], 6.0, delta=0.1)
+        # A single point falls back to the reported values
+        self.assertEqual((state["speed_knots"][1], state["heading"][1]), (5.0, 180.0))
+
+    def test_fleet_batch_sets_eta_to_destination(self):
+        vessel = create_fleet(vessel_count=1, tracks_per_vessel=0)[0]
+        voyage = Voyage.objects.get(vessel=vessel)
+        voyage.port_to.location = "0.0, 1.1"  # ~60 nm east of the last point
+        voyage.port_to.save()
+        now = timezone.now()
+        eastbound_track(vessel, now - timedelta(hours=1))
+
+        self.assertEqual(recompute_fleet(now=now), 1)
+        kinematics = VesselKinematics.objects.get(vessel=vessel)
+        self.assertEqual(kinematics.voyage_id, voyage.id)
+        self.assertAlmostEqual(kinematics.remaining_nm, 54.0, delta=0.5)
+        hours_left = (kinematics.eta - kinematics.last_point_at).total_seconds() / 3600
+        self.assertAlmostEqual(hours_left, 4.5, delta=0.1)
+
+    def test_incremental_updates_follow_new_points(self):
+        vessel = create_fleet(vessel_count=1, tracks_per_vessel=0)[0]
+        start = timezone.now() - timedelta(hours=2)
+        for track in eastbound_track(vessel, start, points=13):
+            record_point(vessel.id, track.latitude, track.longitude, track.timestamp, track.speed, track.course)
+        kinematics = VesselKinematics.objects.get(vessel=vessel)
+        self.assertAlmostEqual(kinematics.speed_knots, 12.0, delta=0.5)
+        self.assertAlmostEqual(kinematics.heading, 90.0, delta=0.5)
+        self.assertAlmostEqual(kinematics.distance_nm, 24.0, delta=0.1)
+        self.assertIsNotNone(kinematics.eta)
+
+        # Older points arriving late are ignored
+        record_point(vessel.id, 0.0, 0.0, start, 12.0, 90.0)
+        self.assertEqual(VesselKinematics.objects.get(vessel=vessel).last_point_at, kinematics.last_point_at)
+        self.assertIsNotNone(self.client.get(f"/api/vessels/{vessel.id}/").json()["kinematics"])
+
+    def test_incremental_updates_follow_a_new_voyage(self):
+        vessel = create_fleet(vessel_count=1, tracks_per_vessel=0)[0]
+        first = Voyage.objects.get(vessel=vessel)
+        start = timezone.now() - timedelta(hours=2)
+        tracks = eastbound_track(vessel, start, points=13)
+        for track in tracks[:6]:
+            record_point(vessel.id, track.latitude, track.longitude, track.timestamp, track.speed, track.course)
+        self.assertEqual(VesselKinematics.objects.get(vessel=vessel).voyage_id, first.id)
+
+        first.status = "Arrived"
+        first.save()
+        onward = Port.objects.create(name="Onward", country="Testland", location="0.0, 1.1",
+                                     congestion_score=10, avg_wait_time=1.0, last_update=timezone.now())
+        second = Voyage.objects.create(vessel=vessel, port_from=first.port_to, port_to=onward, status="In Transit",
+                                       departure_time=timezone.now() - timedelta(hours=1))
+        for track in tracks[6:]:
+            record_point(vessel.id, track.latitude, track.longitude, track.timestamp, track.speed, track.course)
+        kinematics = VesselKinematics.objects.get(vessel=vessel)
+        self.assertEqual(kinematics.voyage_id, second.id)
+        self.assertEqual((kinematics.destination_lat, kinematics.destination_lon), (0.0, 1.1))
+        self.assertAlmostEqual(kinematics.remaining_nm, 42.0, delta=0.5)  # from 0.4 deg east to 1.1 deg
+
+        second.status = "Arrived"
+        second.save()
+        record_point(vessel.id, 0.0, 0.42, tracks[-1].timestamp + timedelta(minutes=10), 12.0, 90.0)
+        kinematics = VesselKinematics.objects.get(vessel=vessel)
+        self.assertEqual((kinematics.voyage_id, kinematics.eta, kinematics.remaining_nm), (None, None, None))
+
+    def test_fleet_upsert_on_mysql_leaves_the_conflict_target_to_the_primary_key(self):
+        vessel = create_fleet(vessel_count=1, tracks_per_vessel=0)[0]
+        eastbound_track(vessel, timezone.now() - timedelta(hours=1))
+        with mysql_upsert_features() as bulk_create:
+            recompute_fleet()
+        self.assertTrue(bulk_create.call_args.kwargs["update_conflicts"])
+        self.assertIsNone(bulk_create.call_args.kwargs["unique_fields"])
+
+
+class ReplayTests(TestCase):
+    def test_parse_time_utc_formats(self):
+        expected = datetime(2024, 3, 1, 10, 15, 42, tzinfo=dt_timezone.utc).timestamp()
+        cases = {
+            "2024-03-01 10:15:42.123456789 +0000 UTC": expected + 0.123456,  # nanoseconds truncated
+            "2024-03-01 10:15:42 +0000 UTC": expected,
+            "2024-03-01 12:15:42.5 +0200 UTC": expected + 0.5,
+            "2024-03-01T10:15:42Z": expected,
+            "2024-03-01 10:15:42": expected,  # naive means UTC
+            "yesterday": None,
+            "": None,
+            None: None,
+        }
+        for value, seconds in cases.items():
+            with self.subTest(value=value):
+                self.assertEqual(ais_replay.parse_time_utc(value), seconds)
+
+    def test_clock_paces_frames_at_the_speed_factor(self):
+        now, slept = [100.0], []
+
+        async def sleep(seconds):
+            slept.append(seconds)
+            now[0] += seconds
+
+        async def replay(clock, stamps, work=0.0):
+            clock.clock, clock.sleep = lambda: now[0], sleep
+            dues = []
+            for stamp in stamps:
+                dues.append(await clock.wait(stamp))
+                now[0] += work  # time the handler takes
+            return dues
+
+        # 10x: frames 10 s and 30 s after the first are due 1 s and 3 s in
+        dues = asyncio.run(replay(ais_replay.ReplayClock(speed=10), [1000, 1010, 1030]))
+        self.assertEqual((dues, slept), ([100.0, 101.0, 103.0], [1.0, 2.0]))
+        # Handler time is absorbed; frames already late or out of order are not delayed further
+        slept.clear()
+        dues = asyncio.run(replay(ais_replay.ReplayClock(speed=10), [1000, 1010, 1005, None, 1012], work=0.5))
+        self.assertEqual(dues, [103.0, 104.0, 103.5, 105.0, 104.2])
+        self.assertEqual(slept, [0.5])
+        # No speed: as fast as possible
+        slept.clear()
+        asyncio.run(replay(ais_replay.ReplayClock(), [1000, 5000]))
+        self.assertEqual(slept, [])
+
+    def test_replay_file_reads_gzipped_jsonl(self):
+        frames = [{"MessageType": "PositionReport",
+                   "MetaData": {"MMSI": i, "time_utc": f"2024-03-01 10:15:4{i} +0000 UTC"}}
+                  for i in range(3)]
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "frames.jsonl.gz")
+            with gzip.open(path, "wt", encoding="utf-8") as output:
+                output.write("\n".join(json.dumps(frame) for frame in frames) + "\n\n")
+            seen = []
+
+            async def handler(raw):
+                seen.append(json.loads(raw)["MetaData"]["MMSI"])
+                return seen[-1] != 1  # frame 1 is "not stored"
+
+            stats = asyncio.run(ais_replay.replay_file(path, handler=handler))
+            self.assertEqual(seen, [0, 1, 2])
+            self.assertEqual((stats.received, stats.stored), (3, 2))
+            seen.clear()
+            asyncio.run(ais_replay.replay_file(path, handler=handler, limit=2))
+            self.assertEqual(seen, [0, 1])
+
+
+class AnomalyDetectionTests(TestCase):
+    # (minutes, lon, speed): steady 12 kn east, a 2 h gap, a speed drop, then a 300 nm jump
+    TRACK = [(0, 0.0, 12.0), (10, 2 / 60, 12.0), (20, 4 / 60, 12.0), (140, 28 / 60, 12.0),
+             (150, 30 / 60, 3.0), (160, 5.5, 3.0), (170, 5.51, 3.0)]
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.vessel = create_fleet(vessel_count=1, tracks_per_vessel=0)[0]
+        start = timezone.now() - timedelta(days=1)
+        cls.points = [
+            VoyageTrack.objects.create(vessel=cls.vessel, latitude=0.0, longitude=lon, speed=speed,
+                                       timestamp=start + timedelta(minutes=minutes))
+            for minutes, lon, speed in cls.TRACK
+        ]
+
+    def test_streaming_detector_batches_events(self):
+        detector = AnomalyDetector(flush_size=2, flush_seconds=3600)
+        kinds = []
+        for point in self.points:
+            kinds += [a.kind for a in detector.observe(self.vessel.id, point.latitude, point.longitude,
+                                                       point.timestamp, point.speed)]
+        self.assertEqual(kinds, [AIS_GAP, SPEED_DROP, POSITION_JUMP])
+        detected = Event.objects.exclude(details="test")  # create_fleet adds a fake "Speed Drop"
+        self.assertEqual(detected.count(), 2)  # one batch still pending
+        detector.flush()
+        self.assertEqual(detected.count(), 3)
+        jump = Notification.objects.get(event__event_type=POSITION_JUMP)
+        self.assertTrue(jump.message.startswith("CRITICAL"))
+
+    def test_backfill_matches_streaming_across_chunks(self):
+        scanned, found, written = backfill(chunk_size=2)
+        self.assertEqual((scanned, found, written), (len(self.TRACK), 3, 3))
+        detected = Event.objects.exclude(details="test")
+        self.assertEqual(detected.count(), 3)
+        # Dated when observed, not when the backfill ran
+        jump = detected.get(event_type=POSITION_JUMP)
+        self.assertEqual(jump.timestamp, self.points[5].timestamp)
+
+    def test_backfill_reruns_write_nothing_new(self):
+        backfill(chunk_size=3)
+        notifications = Notification.objects.count()
+        self.assertEqual(backfill(chunk_size=2), (len(self.TRACK), 3, 0))
+        self.assertEqual(Event.objects.exclude(details="test").count(), 3)
+        self.assertEqual(Notification.objects.count(), notifications)
+        # Nor does the live detector replaying points the backfill already covered
+        detector = AnomalyDetector()
+        for point in self.points:
+            detector.observe(self.vessel.id, point.latitude, point.longitude, point.timestamp, point.speed)
+        self.assertEqual(detector.flush(), 0)
+
+
+class SegmentationTests(TestCase):
+    # (minutes, lat/lon, speed): alongside Port 1 for 40 min, out to sea, then 40 min at Port 2
+    TRACK = [(0, 1.0, 0.2), (20, 1.0, 0.1), (40, 1.0, 0.3), (60, 1.05, 6.0), (120, 1.5, 12.0),
+             (240, 1.95, 6.0), (260, 2.0, 0.4), (280, 2.0, 0.2), (300, 2.0, 0.1)]
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.vessel = create_fleet(vessel_count=1, tracks_per_vessel=0)[0]
+        cls.ports = {port.name: port for port in Port.objects.all()}
+        cls.start = timezone.now() - timedelta(days=1)
+        for minutes, position, speed in cls.TRACK:
+            VoyageTrack.objects.create(vessel=cls.vessel, latitude=position, longitude=position, speed=speed,
+                                       timestamp=cls.start + timedelta(minutes=minutes))
+
+    def assertSegmented(self):
+        first, second = Voyage.objects.filter(vessel=self.vessel).order_by("id")
+        self.assertEqual((first.status, first.port_to_id), ("Completed", self.ports["Port 1"].id))
+        self.assertEqual(first.arrival_time, self.start)
+        self.assertEqual((second.status, second.port_from_id, second.port_to_id),
+                         ("Completed", self.ports["Port 1"].id, self.ports["Port 2"].id))
+        self.assertEqual(second.departure_time, self.start + timedelta(minutes=120))
+        self.assertEqual(second.arrival_time, self.start + timedelta(minutes=260))
+        counters = dict(Port.objects.values_list("name", "arrivals"))
+        self.assertEqual((counters["Port 1"], counters["Port 2"]), (1, 1))
+        self.assertEqual(Port.objects.get(name="Port 1").departures, 1)
+        self.assertEqual(PortCallState.objects.get(vessel=self.vessel).port_id, self.ports["Port 2"].id)
+
+    def test_incremental_detects_calls_and_is_idempotent(self):
+        segmenter = segmentation.incremental()
+        self.assertEqual((segmenter.stats["arrivals"], segmenter.stats["departures"]), (2, 1))
+        self.assertSegmented()
+        self.assertEqual(segmentation.incremental().stats["points"], 0)
+        self.assertSegmented()
+
+    def test_backfill_across_chunk_edges(self):
+        segmentation.backfill(chunk_size=2)
+        self.assertSegmented()
+
+    def test_short_stop_is_not_a_call(self):
+        VoyageTrack.objects.all().delete()
+        for minutes, speed in [(0, 12.0), (10, 0.5), (20, 0.5), (30, 12.0)]:
+            VoyageTrack.objects.create(vessel=self.vessel, latitude=1.0, longitude=1.0, speed=speed,
+                                       timestamp=self.start + timedelta(minutes=minutes))
+        self.assertEqual(segmentation.incremental().stats["arrivals"], 0)
+        self.assertEqual(Voyage.objects.get(vessel=self.vessel).status, "In Transit")
+
+    def test_state_upsert_on_mysql_leaves_the_conflict_target_to_the_primary_key(self):
+        with mysql_upsert_features() as bulk_create:
+            segmentation.incremental()
+        upserts = [call.kwargs for call in bulk_create.call_args_list
+                   if call.kwargs.get("update_fields") == segmentation.STATE_FIELDS]
+        self.assertEqual(len(upserts), 1)
+        self.assertIsNone(upserts[0]["unique_fields"])
+
+
+class CongestionTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.vessels = create_fleet(vessel_count=5, tracks_per_vessel=0)
+        cls.port = Port.objects.get(name="Port 1")
+
+    def place(self, *positions):
+        for vessel, (lat, speed) in zip(self.vessels, positions):
+            Vessel.objects.filter(id=vessel.id).update(last_position_lat=lat, last_position_lon=1.0, speed=speed)
+
+    def test_density_counts_waiting_and_berthed_vessels(self):
+        # 3 at anchor ~3 nm out, 1 alongside, 1 passing through
+        self.place((1.05, 0.2), (1.05, 0.0), (1.06, 0.5), (1.0, 0.1), (1.05, 9.0))
+        scores = congestion.refresh()
+        window = PortCongestion.objects.get(port=self.port)
+        self.assertEqual((window.waiting_vessels, window.berthed_vessels), (3, 1))
+        self.assertAlmostEqual(scores[self.port.id], float(congestion.congestion_score(3, 0)), places=1)
+        self.port.refresh_from_db()
+        self.assertIsNone(self.port.avg_wait_time)
+        self.assertEqual(PortCongestion.objects.get(port__name="Port 2").waiting_vessels, 0)
+
+    def test_waits_are_a_decayed_rolling_mean(self):
+        now = timezone.now()
+        congestion.record_waits([(self.port.id, now - timedelta(hours=10), now),
+                                 (self.port.id, now - timedelta(hours=20), now)])
+        congestion.refresh(now)
+        self.port.refresh_from_db()
+        self.assertEqual(self.port.avg_wait_time, 15.0)
+
+        # An old sample weighs less than a fresh one
+        congestion.record_waits([(self.port.id, now - timedelta(days=3, hours=45), now - timedelta(days=3))])
+        congestion.refresh(now)
+        self.port.refresh_from_db()
+        self.assertAlmostEqual(self.port.avg_wait_time, (10 + 20 + 0.5 * 45) / 2.5, places=1)
+
+    def test_segmentation_records_anchorage_wait(self):
+        start = timezone.now() - timedelta(days=1)
+        track = [(0, 1.05, 0.2), (60, 1.05, 0.1), (120, 1.05, 0.2), (130, 1.0, 0.1), (150, 1.0, 0.0)]
+        for minutes, lat, speed in track:
+            VoyageTrack.objects.create(vessel=self.vessels[0], latitude=lat, longitude=1.0, speed=speed,
+                                       timestamp=start + timedelta(minutes=minutes))
+        self.assertEqual(segmentation.incremental().stats["berthings"], 1)
+        window = PortCongestion.objects.get(port=self.port)
+        self.assertAlmostEqual(window.wait_hours / window.wait_weight, 130 / 60)
+
+    def test_alert_only_when_a_port_becomes_congested(self):
+        for i in range(5, 25):
+            Vessel.objects.create(mmsi=str(200000000 + i), name=f"ANCHOR {i}", last_position_lat=1.05,
+                                  last_position_lon=1.0, speed=0.0, last_update=timezone.now())
+        fetch_unctad_ports()
+        fetch_unctad_ports()
+        zone = RiskZone.objects.get(name="Congestion: Port 1")
+        self.assertEqual((zone.latitude, zone.longitude), (1.0, 1.0))
+        self.assertEqual(Notification.objects.filter(type="Congestion Alert").count(), 1)
+
+        Vessel.objects.filter(name__startswith="ANCHOR").update(speed=12.0)
+        congestion.refresh(timezone.now() + timedelta(hours=12))  # let the smoothed count drain
+        fetch_unctad_ports()
+        self.assertFalse(RiskZone.objects.filter(risk_type="CONGESTION").exists())
+
+    def test_window_upserts_on_mysql_leave_the_conflict_target_to_the_primary_key(self):
+        now = timezone.now()
+        with mysql_upsert_features() as bulk_create:
+            congestion.record_waits([(self.port.id, now - timedelta(hours=10), now)])
+            fetch_unctad_ports()  # refresh() through the UNCTAD loader
+        upserts = [call.kwargs for call in bulk_create.call_args_list
+                   if call.kwargs.get("update_fields") == congestion.WINDOW_FIELDS]
+        self.assertEqual(len(upserts), 2)
+        self.assertTrue(all(upsert["unique_fields"] is None for upsert in upserts))
+
+
+class KpiTests(TestCase):
+    client_class = AnalystClient
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.vessels = create_fleet(vessel_count=6, tracks_per_vessel=1)
+        Vessel.objects.filter(id=cls.vessels[0].id).update(type="Tanker", cargo_type="Crude Oil")
+        Voyage.objects.filter(vessel=cls.vessels[1]).update(status="Completed")
+
+    def test_each_table_is_counted_once_in_one_query(self):
+        with self.assertNumQueries(1):
+            counters = kpis.fetch(
+                vessels=(Vessel.objects.all(), kpis.vessel_counters()),
+                voyages=(Voyage.objects.all(), kpis.voyage_counters()),
+                ports=(Port.objects.all(), kpis.port_counters()),
+                risks=(RiskZone.objects.none(), kpis.risk_counters()),
+            )
+        self.assertEqual(counters["vessels"]["total"], 6)
+        self.assertEqual(counters["voyages"]["in_transit"], 5)
+        self.assertEqual(counters["ports"]["high_congestion"], 0)  # scores run 50-90; only > 90 counts
+        self.assertAlmostEqual(counters["ports"]["avg_wait"], 3.0)
+        self.assertEqual(counters["risks"]["total"], 0)  # an empty table still yields its row
+
+    def test_endpoints_match_per_counter_queries(self):
+        with self.assertNumQueries(2):
+            dashboard = self.client.get("/api/dashboard/").json()
+        self.assertEqual(
+            (dashboard["total_vessels"], dashboard["active_voyages"], dashboard["active_risks"]),
+            (Vessel.objects.count(), Voyage.objects.filter(status="In Transit").count(), RiskZone.objects.count()),
+        )
+        with self.assertNumQueries(3):
+            analytics = self.client.get("/api/analytics/", {"days": "30", "type": "Container Ship"}).json()
+        self.assertEqual(analytics["kpis"]["total_ships"], 5)
+        self.assertEqual(analytics["kpis"]["active_voyages"], 4)
+        self.assertEqual(analytics["kpis"]["avg_wait_time"], 3.0)
+        self.assertEqual(set(analytics["daily_traffic"][0]), {"date", "count"})
+        self.assertEqual(set(analytics["congested_ports"][0]), {"name", "country", "congestion_score", "avg_wait_time"})
+
+
+class TokenAuthTests(QueryBudgetTestMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.vessels = create_fleet(vessel_count=4, tracks_per_vessel=1)
+        Vessel.objects.filter(id__in=[v.id for v in cls.vessels[:2]]).update(operator="Maersk Line")
+        User = get_user_model()
+        cls.operator = User.objects.create_user(username="ops", password="pw-12345!", role="Operator",
+                                                fleet_operator="Maersk Line")
+        cls.analyst = User.objects.create_user(username="analyst", password="pw-12345!", role="Analyst")
+
+    def bearer(self, user):
+        return {"HTTP_AUTHORIZATION": f"Bearer {RoleRefreshToken.for_user(user).access_token}"}
+
+    def test_login_token_carries_role_claims(self):
+        response = self.client.post("/api/login/", {"username": "ops", "password": "pw-12345!"},
+                                    content_type="application/json")
+        self.assertEqual(response.status_code, 200)
+        refreshed = self.client.post("/api/token/refresh/", {"refresh": response.json()["refresh"]},
+                                     content_type="application/json")
+        self.assertEqual(refreshed.status_code, 200)
+        headers = {"HTTP_AUTHORIZATION": f"Bearer {refreshed.json()['access']}"}
+        self.assertEqual(self.client.get("/api/vessels/", **headers).json()["count"], 2)
+
+    def test_refresh_reloads_claims_and_refuses_inactive_users(self):
+        refresh = str(RoleRefreshToken.for_user(self.operator))
+        self.operator.fleet_operator = None
+        self.operator.role = "Analyst"
+        self.operator.save()
+        response = self.client.post("/api/token/refresh/", {"refresh": refresh}, content_type="application/json")
+        headers = {"HTTP_AUTHORIZATION": f"Bearer {response.json()['access']}"}
+        self.assertEqual(self.client.get("/api/vessels/", **headers).json()["count"], 4)
+
+        self.operator.is_active = False
+        self.operator.save()
+        response = self.client.post("/api/token/refresh/", {"refresh": refresh}, content_type="application/json")
+        self.assertEqual(response.status_code, 401)
+
+    def test_operator_sees_only_their_fleet(self):
+        headers = self.bearer(self.operator)
+        self.assertEqual(self.client.get("/api/vessels/", **headers).json()["count"], 2)
+        self.assertEqual(self.client.get("/api/vessels/", **self.bearer(self.analyst)).json()["count"], 4)
+        self.assertEqual(self.client.get(f"/api/vessels/{self.vessels[3].id}/", **headers).status_code, 404)
+        dashboard = self.client.get("/api/dashboard/", **headers).json()
+        self.assertEqual((dashboard["total_vessels"], dashboard["active_voyages"]), (2, 2))
+        voyages = self.client.get("/api/voyages/", **headers)
+        self.assertEqual({v["vessel_id"] for v in voyages.json()}, {v.id for v in self.vessels[:2]})
+        self.assertNotEqual(voyages["ETag"], self.client.get("/api/voyages/", **self.bearer(self.analyst))["ETag"])
+
+    def test_operator_without_a_fleet_sees_no_vessels(self):
+        unassigned = get_user_model().objects.create_user(username="new-ops", password="pw-12345!", role="Operator")
+        headers = self.bearer(unassigned)
+        self.assertEqual(self.client.get("/api/vessels/", **headers).json()["count"], 0)
+        self.assertEqual(self.client.get("/api/vessels/search/?q=vessel", **headers).json()["count"], 0)
+        self.assertEqual(self.client.get("/api/voyages/", **headers).json(), [])
+        self.assertEqual(self.client.get("/api/dashboard/", **headers).json()["total_vessels"], 0)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "fleet.snap")
+            fleet_snapshot.publish(path)
+            with override_settings(FLEET_SNAPSHOT_PATH=path):
+                self.assertEqual(self.client.get("/api/vessels/", **headers).json()["count"], 0)
+
+    def test_tokens_add_no_queries(self):
+        for route in ("api/vessels/", "api/dashboard/"):
+            with self.assertQueryBudget(route, duplicate_limit=1) as operator:
+                self.client.get(f"/{route}", **self.bearer(self.operator))
+            with self.assertQueryBudget(route, duplicate_limit=1) as analyst:
+                self.client.get(f"/{route}", **self.bearer(self.analyst))
+            self.assertEqual(len(operator.queries), len(analyst.queries))
+
+    def test_fleet_scoped_endpoints_require_a_token(self):
+        routes = ["/api/vessels/", f"/api/vessels/{self.vessels[0].id}/", "/api/vessels/search/?q=a",
+                  "/api/voyages/", "/api/events/", "/api/voyage-track/1/",
+                  "/api/export/vessels/", "/api/dashboard/", "/api/analytics/", "/api/alerts/"]
+        for route in routes:
+            with self.subTest(route=route):
+                self.assertEqual(self.client.get(route).status_code, 401)
+        self.assertEqual(self.client.get("/api/ports/").status_code, 200)
+
+    def test_alerts_are_fleet_scoped(self):
+        fleet = {vessel.name for vessel in self.vessels[:2]}
+        alerts = self.client.get("/api/alerts/", {"page_size": 100}, **self.bearer(self.operator)).json()
+        self.assertEqual({alert["vessel_name"] for alert in alerts["results"]}, fleet)
+        self.assertEqual(alerts["pagination"]["count"], Notification.objects.filter(vessel__name__in=fleet).count())
+        everything = self.client.get("/api/alerts/", **self.bearer(self.analyst)).json()
+        self.assertEqual(everything["pagination"]["count"], Notification.objects.count())
+
+    def test_invalid_token_is_rejected(self):
+        response = self.client.get("/api/vessels/", HTTP_AUTHORIZATION="Bearer not-a-token")
+        self.assertEqual(response.status_code, 401)
+
+
+class RoleResolverTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        User = get_user_model()
+        cls.admin = User.objects.create_user(username="root", password="pw-12345!", role="Admin",
+                                             is_staff=True, is_superuser=True)
+        cls.users = [User.objects.create_user(username=f"user{i}", password="pw-12345!", role="Operator")
+                     for i in range(3)]
+        # Legacy grant: user0 is an analyst through roles / user_roles
+        legacy = AppUser.objects.create(username="user0", email="user0@example.com", password="x")
+        UserRole.objects.create(user=legacy, role=Role.objects.create(role_name="Analyst"))
+
+    def setUp(self):
+        roles.invalidate(self.admin.id, *[user.id for user in self.users])
+        self.headers = {"HTTP_AUTHORIZATION": f"Bearer {RoleRefreshToken.for_user(self.admin).access_token}"}
+
+    def test_effective_role_merges_all_sources(self):
+        access = roles.resolve_many([self.admin.id] + [user.id for user in self.users])
+        self.assertEqual(access[self.admin.id].role, "Admin")
+        self.assertIn(roles.MANAGE_USERS, access[self.admin.id].permissions)
+        self.assertEqual(access[self.users[0].id].role, "Analyst")
+        self.assertEqual(access[self.users[1].id].permissions, roles.ROLE_PERMISSIONS["Operator"])
+        with self.assertNumQueries(0):
+            roles.resolve(self.users[0].id)
+
+    def test_users_list_batch_loads_roles(self):
+        roles.resolve(self.admin.id)
+        with self.assertNumQueries(3):  # the page, then one batch (users + grants) for all cache misses
+            response = self.client.get("/api/users/", **self.headers)
+        self.assertEqual(response.status_code, 200)
+        by_name = {user["username"]: user for user in response.json()}
+        self.assertEqual(by_name["user0"]["role"], "Analyst")
+        with self.assertNumQueries(1):
+            self.client.get("/api/users/", **self.headers)
+
+    def test_role_and_status_writes_invalidate(self):
+        user = self.users[1]
+        self.assertEqual(roles.resolve(user.id).role, "Operator")
+        self.client.post(f"/api/users/{user.id}/role/", {"role": "Super Admin"}, content_type="application/json",
+                         **self.headers)
+        self.assertEqual(roles.resolve(user.id).role, "Admin")
+        self.client.post(f"/api/users/{user.id}/status/", **self.headers)
+        self.assertFalse(roles.resolve(user.id).permissions)
+
+    def test_user_management_requires_permission(self):
+        operator = {"HTTP_AUTHORIZATION": f"Bearer {RoleRefreshToken.for_user(self.users[1]).access_token}"}
+        self.assertEqual(self.client.get("/api/users/", **operator).status_code, 403)
+        self.assertEqual(self.client.get("/api/users/").status_code, 401)
+
+    def test_registration_cannot_pick_a_privileged_role(self):
+        response = self.client.post("/api/register/", {"username": "mallory", "email": "m@example.com",
+                                                       "password": "pw-12345!", "role": "Admin"},
+                                    content_type="application/json")
+        self.assertEqual(response.status_code, 201)
+        mallory = get_user_model().objects.get(username="mallory")
+        self.assertEqual(roles.resolve(mallory.id).role, "Operator")
+        headers = {"HTTP_AUTHORIZATION": f"Bearer {RoleRefreshToken.for_user(mallory).access_token}"}
+        self.assertEqual(self.client.get("/api/users/", **headers).status_code, 403)
+
+
+class AuditLogTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        User = get_user_model()
+        cls.admin = User.objects.create_user(username="root", password="pw-12345!", role="Admin",
+                                             email="root@example.com", is_staff=True, is_superuser=True)
+        User.objects.bulk_create([
+            User(username=f"crew{i:02d}", email=f"crew{i:02d}@example.com", role="Operator",
+                 is_staff=i % 3 == 0) for i in range(30)
+        ])
+
+    def setUp(self):
+        audit.writer.flush()  # anything queued by earlier tests lands in this (rolled back) transaction
+        self.headers = {"HTTP_AUTHORIZATION": f"Bearer {RoleRefreshToken.for_user(self.admin).access_token}"}
+
+    def test_admin_actions_are_recorded(self):
+        self.client.post("/api/login/", {"username": "root", "password": "pw-12345!"},
+                         content_type="application/json")
+        crew = get_user_model().objects.get(username="crew01")
+        self.client.post(f"/api/users/{crew.id}/role/", {"role": "Analyst"}, content_type="application/json",
+                         **self.headers)
+        self.client.post(f"/api/users/{crew.id}/status/", **self.headers)
+        self.client.delete(f"/api/users/{crew.id}/delete/", **self.headers)
+        self.assertEqual(AuditEvent.objects.count(), 4)  # AUDIT_ASYNC off: written by record() itself
+        self.assertEqual(audit.writer.flush(), 0)
+
+        logs = self.client.get("/api/audit-logs/", **self.headers).json()["results"]
+        self.assertEqual([log["action"] for log in logs],
+                         ["User Deleted", "Status Changed", "Role Changed", "User Logged In"])
+        self.assertEqual((logs[0]["user"], logs[0]["target"]), ("root", "crew01"))
+
+    @override_settings(AUDIT_ASYNC=True)
+    def test_async_writer_queues_until_flushed(self):
+        writer = audit.AuditWriter(flush_size=2)
+        with mock.patch.object(writer, "_start") as start:  # no writer thread inside a test transaction
+            for _ in range(3):
+                writer.record(audit.LOGIN, actor=self.admin)
+        self.assertEqual(start.call_count, 3)
+        self.assertFalse(AuditEvent.objects.exists())
+        self.assertEqual(writer.flush(), 3)
+        self.assertEqual(AuditEvent.objects.filter(actor_name="root").count(), 3)
+
+    def test_cursor_pages_through_equal_timestamps(self):
+        now = timezone.now()
+        AuditEvent.objects.bulk_create([
+            AuditEvent(timestamp=now - timedelta(minutes=i // 4), action=audit.LOGIN, actor_name=f"u{i}")
+            for i in range(22)
+        ])
+        seen, cursor = [], None
+        while True:
+            params = {"limit": 5, **({"cursor": cursor} if cursor else {})}
+            body = self.client.get("/api/audit-logs/", params, **self.headers).json()
+            seen += [log["id"] for log in body["results"]]
+            cursor = body["next_cursor"]
+            if not cursor:
+                break
+        self.assertEqual(seen, list(AuditEvent.objects.order_by("-timestamp", "-id").values_list("id", flat=True)))
+
+        since = (now - timedelta(minutes=1, seconds=30)).isoformat()
+        recent = self.client.get("/api/audit-logs/", {"since": since}, **self.headers).json()["results"]
+        self.assertEqual(len(recent), 8)
+        bad = self.client.get("/api/audit-logs/", {"cursor": "nope"}, **self.headers)
+        self.assertEqual(bad.status_code, 400)
+
+    def test_user_list_pages_and_searches(self):
+        body = self.client.get("/api/users/", {"page_size": 10, "page": 2, "ordering": "username"},
+                               **self.headers).json()
+        self.assertEqual(body["pagination"]["count"], 31)
+        self.assertEqual([user["username"] for user in body["results"]][:2], ["crew10", "crew11"])
+        found = self.client.get("/api/users/", {"search": "CREW2"}, **self.headers).json()["results"]
+        self.assertEqual(len(found), 10)
+        analysts = self.client.get("/api/users/", {"role": "Analyst"}, **self.headers).json()
+        self.assertEqual(analysts["pagination"]["count"], 10)
+        self.assertEqual(len(self.client.get("/api/users/", **self.headers).json()), 31)  # unpaginated, as before
+
+
+@override_settings(RATE_LIMIT_ENABLED=True,
+                   RATE_LIMITS={"default": "100/min", "api/dashboard/": "3/min", "api/ports/": "3/min"})
+class RateLimitTests(TestCase):
+    client_class = AnalystClient
+
+    def setUp(self):
+        self.buckets = ratelimit.buckets("local")
+        self.buckets.clear()
+        self.now = 1000.0
+        self.buckets.clock = lambda: self.now
+        self.addCleanup(vars(self.buckets).pop, "clock")
+
+    def test_bucket_empties_then_refills(self):
+        statuses = [self.client.get("/api/dashboard/").status_code for _ in range(4)]
+        self.assertEqual(statuses, [200, 200, 200, 429])
+        throttled = self.client.get("/api/dashboard/")
+        self.assertEqual(throttled["Retry-After"], "20")  # one token per 20 s at 3/min
+        self.assertEqual(self.client.get("/api/ports/").status_code, 200)  # other endpoints keep their own bucket
+        self.now += 20
+        self.assertEqual(self.client.get("/api/dashboard/").status_code, 200)
+        self.assertEqual(self.client.get("/api/dashboard/").status_code, 429)
+
+    def test_clients_are_keyed_by_user_then_ip(self):
+        user = get_user_model().objects.create_user(username="ops", password="pw-12345!", role="Operator")
+        headers = {"HTTP_AUTHORIZATION": f"Bearer {RoleRefreshToken.for_user(user).access_token}"}
+        for _ in range(3):
+            self.client.get("/api/dashboard/")
+        self.assertEqual(self.client.get("/api/dashboard/").status_code, 429)
+        self.assertEqual(self.client.get("/api/dashboard/", **headers).status_code, 200)
+        anonymous = Client()  # only the unscoped endpoints answer without a token
+        for _ in range(3):
+            anonymous.get("/api/ports/")
+        self.assertEqual(anonymous.get("/api/ports/").status_code, 429)
+        self.assertEqual(anonymous.get("/api/ports/", REMOTE_ADDR="10.0.0.7").status_code, 200)
+
+    def test_spoofed_forwarded_for_does_not_reset_the_bucket(self):
+        anonymous = Client()
+        statuses = [anonymous.get("/api/ports/", HTTP_X_FORWARDED_FOR=f"198.51.100.{i}").status_code
+                    for i in range(4)]
+        self.assertEqual(statuses, [200, 200, 200, 429])
+        with override_settings(REST_FRAMEWORK={**settings.REST_FRAMEWORK, "NUM_PROXIES": 1}):
+            # Behind one proxy only the entry it appended counts, not what the client sent before it
+            self.assertEqual(anonymous.get("/api/ports/", REMOTE_ADDR="10.0.0.1",
+                                           HTTP_X_FORWARDED_FOR="198.51.100.9, 203.0.113.5").status_code, 200)
+            self.assertEqual([anonymous.get("/api/ports/", REMOTE_ADDR="10.0.0.1",
+                                            HTTP_X_FORWARDED_FOR=f"198.51.100.{i}, 203.0.113.5").status_code
+                              for i in range(3)], [200, 200, 429])
+
+    def test_idle_buckets_are_pruned(self):
+        buckets = ratelimit.LocalBuckets(max_keys=2)
+        buckets.clock = lambda: self.now
+        buckets.take("a", 1, 1.0)
+        buckets.take("b", 5, 0.1)
+        self.now += 2
+        buckets.take("c", 1, 1.0)  # "a" is full again and goes; "b" still remembers its use
+        self.assertEqual(set(buckets._buckets), {"b", "c"})
+
+    def test_busy_buckets_are_evicted_least_recently_used_first(self):
+        buckets = ratelimit.LocalBuckets(max_keys=20)
+        buckets.clock = lambda: self.now
+        for i in range(20):
+            buckets.take(f"ip{i}", 5, 0.1)  # none refills within the test
+        buckets.take("ip0", 5, 0.1)
+        buckets.take("new", 5, 0.1)
+        self.assertLessEqual(len(buckets._buckets), 20)
+        self.assertIn("ip0", buckets._buckets)  # used again, so kept
+        self.assertNotIn("ip1", buckets._buckets)
+        self.assertIn("new", buckets._buckets)
+        for i in range(100):
+            buckets.take(f"flood{i}", 5, 0.1)
+        self.assertLessEqual(len(buckets._buckets), 20)
+
+
+class SingleFlightTests(TestCase):
+    def run_concurrently(self, key, compute, callers=8):
+        """Start `callers` threads on one key; release compute() once all but the leader are waiting."""
+        group, release, results, errors = SingleFlight(), threading.Event(), [], []
+        name = self.id()
+
+        def call():
+            try:
+                results.append(group.do(key, lambda: compute(release), name=name))
+            except Exception as exc:
+                errors.append(exc)
+        threads = [threading.Thread(target=call) for _ in range(callers)]
+        for thread in threads:
+            thread.start()
+        deadline = time.monotonic() + 5
+        while SINGLEFLIGHT_CALLS.value(name=name, outcome="waited") < callers - 1 and time.monotonic() < deadline:
+            time.sleep(0.001)
+        release.set()
+        for thread in threads:
+            thread.join(5)
+        return group, results, errors
+
+    def test_concurrent_callers_share_one_run(self):
+        calls = []
+
+        def compute(release):
+            calls.append(1)
+            release.wait(5)
+            return {"total_vessels": 42}
+        group, results, _ = self.run_concurrently("dashboard:", compute)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, [{"total_vessels": 42}] * 8)
+        self.assertFalse(group._flights)  # nothing kept: the next call recomputes
+        self.assertEqual(group.do("dashboard:", lambda: "fresh"), "fresh")
+
+    def test_waiters_get_the_leaders_error(self):
+        def compute(release):
+            release.wait(5)
+            raise ValueError("db down")
+        _, results, errors = self.run_concurrently("analytics:7", compute, callers=4)
+        self.assertEqual((len(results), len(errors)), (0, 4))
+
+    @override_settings(SINGLEFLIGHT_SHARED=True, SINGLEFLIGHT_WAIT=0.5)
+    def test_shared_mode_waits_for_another_workers_result(self):
+        cache.add("singleflight:lock:analytics:30", 1)  # held by another worker...
+        cache.set("singleflight:result:analytics:30", ({"kpis": "theirs"},))  # ...which publishes
+        self.addCleanup(cache.delete_many, ["singleflight:lock:analytics:30", "singleflight:result:analytics:30"])
+        self.assertEqual(SingleFlight().do("analytics:30", lambda: {"kpis": "ours"}), {"kpis": "theirs"})
+
+        cache.delete("singleflight:result:analytics:30")  # gone without publishing: compute locally
+        self.assertEqual(SingleFlight().do("analytics:30", lambda: {"kpis": "ours"}), {"kpis": "ours"})
+
+    def test_async_callers_share_one_task(self):
+        group, calls = SingleFlight(), []
+
+        async def compute():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return {"total_vessels": 42}
+
+        async def herd():
+            return await asyncio.gather(*(group.ado("dashboard:", compute) for _ in range(8)))
+        self.assertEqual(asyncio.run(herd()), [{"total_vessels": 42}] * 8)
+        self.assertEqual(len(calls), 1)
+        self.assertFalse(group._tasks)
+
+
+class AsyncEndpointTests(TransactionTestCase):
+    """Transactional: the async views read on pool threads with their own connections."""
+    client_class = AnalystClient
+
+
+    def setUp(self):
+        self.vessels = create_fleet(vessel_count=4, tracks_per_vessel=1)
+        Vessel.objects.filter(id__in=[v.id for v in self.vessels[:2]]).update(operator="Maersk Line")
+        self.operator = get_user_model().objects.create_user(username="ops", password="pw-12345!",
+                                                             role="Operator", fleet_operator="Maersk Line")
+
+    def tearDown(self):
+        # Unmanaged tables are not flushed between transactional tests
+        for model in (VoyageTrack, Voyage, Vessel, RiskZone, Port, AppUser):
+            model.objects.all().delete()
+
+    def test_payloads_match_the_sync_views(self):
+        for sync_url, async_url in (("/api/dashboard/", "/api/async/dashboard/"),
+                                    ("/api/analytics/?days=30", "/api/async/analytics/?days=30")):
+            expected, response = self.client.get(sync_url).json(), self.client.get(async_url)
+            self.assertEqual(response.status_code, 200)
+            actual = response.json()
+            expected.pop("throughput", None), actual.pop("throughput", None)  # per-second request counter
+            self.assertEqual(actual, expected)
+
+    def test_token_scopes_and_rejects_like_the_sync_views(self):
+        headers = {"HTTP_AUTHORIZATION": f"Bearer {RoleRefreshToken.for_user(self.operator).access_token}"}
+        self.assertEqual(self.client.get("/api/async/dashboard/", **headers).json()["total_vessels"], 2)
+        kpis = self.client.get("/api/async/analytics/", **headers).json()["kpis"]
+        self.assertEqual((kpis["total_ships"], kpis["active_voyages"]), (2, 2))
+
+        # Same DRF exception handling: status, body and WWW-Authenticate
+        for client_headers in ({"HTTP_AUTHORIZATION": "Bearer not-a-token"}, {}):
+            expected = Client().get("/api/dashboard/", **client_headers)
+            refused = Client().get("/api/async/dashboard/", **client_headers)
+            self.assertEqual(refused.status_code, 401)
+            self.assertEqual(refused.json(), expected.json())
+            self.assertEqual(refused["WWW-Authenticate"], expected["WWW-Authenticate"])
+        self.assertEqual(self.client.post("/api/async/dashboard/").status_code, 405)
+
+    @override_settings(RATE_LIMIT_ENABLED=True, RATE_LIMITS={"default": "100/min", "api/async/dashboard/": "2/min"})
+    def test_throttled_by_the_rate_limiter(self):
+        ratelimit.buckets("local").clear()
+        statuses = [self.client.get("/api/async/dashboard/").status_code for _ in range(3)]
+        self.assertEqual(statuses, [200, 200, 429])
+        self.assertEqual(self.client.get("/api/async/dashboard/")["Retry-After"], "30")
+
+    @override_settings(DEBUG=True)
+    def test_pool_queries_count_against_the_query_budget(self):
+        for sync_url, async_url in (("/api/dashboard/", "/api/async/dashboard/"),
+                                    ("/api/analytics/?days=30", "/api/async/analytics/?days=30")):
+            expected = self.client.get(sync_url)["X-DB-Queries"]
+            self.assertEqual(self.client.get(async_url)["X-DB-Queries"], expected)
+
+
+class StartupProfileTests(TestCase):
+    def test_parse_importtime(self):
+        stderr = ("import time: self [us] | cumulative | imported package\n"
+                  "import time:       120 |        120 |     _json\n"
+                  "import time:       300 |        420 |   json\n"
+                  "import time:        50 |        470 | core.views\n")
+        self.assertEqual(startup.parse_importtime(stderr),
+                         [("_json", 120, 120, 2), ("json", 300, 420, 1), ("core.views", 50, 470, 0)])
+
+    def test_web_worker_skips_ingest_and_scraping_dependencies(self):
+        _, stderr, heavy = startup.run_target("web")
+        self.assertEqual(heavy, [])
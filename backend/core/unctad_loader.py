@@ -1,13 +1,17 @@
-import random
 from django.utils import timezone
 from core.models import Port, Notification, RiskZone, AppUser
+from core.conditional import bump_table_version
+from core.geo import parse_location, KM_PER_NM
+from core import congestion
+
+CONGESTION_ALERT_SCORE = 85
 
 def fetch_unctad_ports():
     """
-    Simulates fetching trade/congestion stats, updates Ports,
-    and creates notifications linked to a system user.
+    Refreshes port congestion from live vessel density (core/congestion.py),
+    keeps congestion risk zones in step and notifies when a port becomes congested.
     """
-    print("Simulating UNCTAD Data Stream...")
+    print("Refreshing port congestion from vessel positions...")
     
     # 1. FIX: Get a valid user from the database to assign alerts to
     # We use AppUser because your SQL maps the 'users' table to the AppUser model
@@ -17,42 +21,45 @@ def fetch_unctad_ports():
     if not system_user:
         print("CRITICAL WARNING: No users found in 'users' table. Notifications skipped to prevent crash.")
     
-    ports = Port.objects.all()
+    previous = dict(Port.objects.values_list("id", "congestion_score"))
+    scores = congestion.refresh()
+    ports = Port.objects.filter(id__in=[port_id for port_id, score in scores.items() if score > CONGESTION_ALERT_SCORE])
     
     for port in ports:
-        # Simulate data updates
-        new_congestion = random.randint(10, 95)
-        new_wait_time = round(random.uniform(2.5, 72.0), 1)
-        
-        port.congestion_score = new_congestion
-        port.avg_wait_time = new_wait_time
-        port.last_update = timezone.now()
-        port.save()
+        point = parse_location(port.location)
 
-        # Check for High Congestion (Task 3)
-        if new_congestion > 85:
-            # Create Map Overlay (Risk Zone)
-            RiskZone.objects.get_or_create(
-                name=f"Congestion: {port.name}",
-                defaults={
-                    'risk_type': 'CONGESTION',
-                    'latitude': 0.0, # ideally fetch real lat/lon from Port model
-                    'longitude': 0.0,
-                    'radius_km': 20,
-                    'severity': 'High',
-                    'description': f"Critical congestion at {port.name}"
-                }
+        # Create / move the Map Overlay (Risk Zone)
+        RiskZone.objects.update_or_create(
+            name=f"Congestion: {port.name}",
+            defaults={
+                'risk_type': 'CONGESTION',
+                'latitude': point[0],
+                'longitude': point[1],
+                'radius_km': congestion.PORT_RADIUS_NM * KM_PER_NM,
+                'severity': 'High',
+                'description': f"Critical congestion at {port.name}"
+            }
+        )
+        
+        # Notify only when the port crosses the threshold, not on every refresh
+        was_congested = (previous.get(port.id) or 0) > CONGESTION_ALERT_SCORE
+        if system_user and not was_congested:
+            Notification.objects.create(
+                user=system_user,  # <--- This fixes the IntegrityError
+                vessel=None,       
+                event=None,
+                message=f"CRITICAL: Port of {port.name} congestion at {port.congestion_score:.0f}%. "
+                        f"Wait time {port.avg_wait_time or 0}h.",
+                type="Congestion Alert",
+                timestamp=timezone.now()
             )
-            
-            # Create Notification ONLY if we have a user
-            if system_user:
-                Notification.objects.create(
-                    user=system_user,  # <--- This fixes the IntegrityError
-                    vessel=None,       
-                    event=None,
-                    message=f"CRITICAL: {port.name} congestion at {new_congestion}%. Wait time {new_wait_time}h.",
-                    type="Congestion Alert",
-                    timestamp=timezone.now()
-                )
 
-    print("UNCTAD Data Integrated and Notifications Processed.")
\ No newline at end of file
+    # Clear zones of ports that are no longer congested
+    congested = {f"Congestion: {port.name}" for port in ports}
+    RiskZone.objects.filter(risk_type='CONGESTION', name__startswith="Congestion: ").exclude(name__in=congested).delete()
+
+    # Invalidate cached ETags for /ports/ and /risks/
+    bump_table_version(Port)
+    bump_table_version(RiskZone)
+
+    print(f"Port congestion refreshed for {len(scores)} ports, {len(ports)} congested.")
\ No newline at end of file
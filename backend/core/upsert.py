@@ -0,0 +1,20 @@
+"""
+Bulk upsert that works on every backend we run (INSERT ... ON CONFLICT on
+SQLite / PostgreSQL, INSERT ... ON DUPLICATE KEY UPDATE on MySQL / TiDB).
+
+MySQL cannot name the conflict target (its features report
+supports_update_conflicts_with_target = False and bulk_create() raises
+NotSupportedError if unique_fields is passed); it updates on whichever
+unique key collides. Callers therefore upsert only on tables whose
+conflict key is their sole unique key - the primary key everywhere here.
+"""
+from django.db import connections, router
+
+
+def upsert(model, objects, unique_fields, update_fields, **kwargs):
+    """bulk_create(update_conflicts=True), naming `unique_fields` only where the backend allows it."""
+    connection = connections[router.db_for_write(model) or "default"]
+    if not connection.features.supports_update_conflicts_with_target:
+        unique_fields = None
+    return model.objects.bulk_create(objects, update_conflicts=True, unique_fields=unique_fields,
+                                     update_fields=update_fields, **kwargs)
@@ -1,8 +1,10 @@
 from django.urls import path
+from rest_framework_simplejwt.views import TokenRefreshView
+from .async_views import AsyncAnalyticsView, AsyncDashboardStatsView
 from .views import (
     home, RegisterView, LoginView,
-    VesselListView, PortListView, VoyageListView, EventListView, VoyageTrackView,
-    RiskZoneListView, DashboardStatsView, get_analyst_analytics,
+    VesselListView, VesselClusterView, VesselDetailView, VesselSearchView, PortListView, VoyageListView, EventListView, VoyageTrackView,
+    RiskZoneListView, DashboardStatsView, get_analyst_analytics, ColumnarExportView,
     get_all_users, get_audit_logs, delete_user, toggle_user_status, update_user_role,
     get_alerts, update_alert_status, create_alert
 )
@@ -11,14 +13,22 @@ urlpatterns = [
     path("", home),
     path("register/", RegisterView.as_view()),
     path("login/", LoginView.as_view()),
+    path("token/refresh/", TokenRefreshView.as_view()),
     path("vessels/", VesselListView.as_view()),
+    path("vessels/search/", VesselSearchView.as_view()),
+    path("vessels/clusters/", VesselClusterView.as_view()),
+    path("vessels/<int:vessel_id>/", VesselDetailView.as_view()),
     path("ports/", PortListView.as_view()),
     path("voyages/", VoyageListView.as_view()),
     path("events/", EventListView.as_view()),
     path("voyage-track/<int:voyage_id>/", VoyageTrackView.as_view()),
+    path("export/<str:dataset>/", ColumnarExportView.as_view()),
     path("dashboard/", DashboardStatsView.as_view()),
     path("risks/", RiskZoneListView.as_view()),
     path("analytics/", get_analyst_analytics),
+    # Same payloads, independent queries run concurrently (core/async_views.py)
+    path("async/dashboard/", AsyncDashboardStatsView.as_view()),
+    path("async/analytics/", AsyncAnalyticsView.as_view()),
     
     # Admin Panel
     path("users/", get_all_users), 
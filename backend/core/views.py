@@ -1,30 +1,45 @@
 import re
 from datetime import timedelta
 from django.utils import timezone
-from django.db.models import Count, Avg
+from django.utils.dateparse import parse_datetime
+from django.db.models import Count, Max, Window
 from django.db.models.functions import TruncDate
 from django.contrib.auth import get_user_model
 from django.contrib.auth.models import update_last_login
-from django.http import JsonResponse
+from django.http import JsonResponse, HttpResponse, StreamingHttpResponse
 
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
-from rest_framework.decorators import api_view
-from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAuthenticated
 from django.core.paginator import Paginator
 
-from .models import Vessel, Port, Voyage, Event, VoyageTrack, RiskZone, Alert, Notification
+from .models import Vessel, Port, Voyage, Event, VoyageTrack, RiskZone, Alert, Notification, VesselKinematics
 from .serializers import (
     RegisterSerializer, LoginSerializer, VesselSerializer, PortSerializer,
     VoyageSerializer, EventSerializer, VoyageTrackSerializer, RiskZoneSerializer,
-    AlertSerializer
+    AlertSerializer, VesselKinematicsSerializer, vessel_rows, port_rows, event_rows, track_rows,
+    VESSEL_COLUMNS, TRACK_COLUMNS
 )
-from .unctad_loader import fetch_unctad_ports
+from .streaming import EXPORT_FORMATS, stream_export
+from . import columnar
+from . import fleet_snapshot
+from .conditional import versioned_by
+from .db_router import use_read_replica
+from .auth import NO_FLEET, RoleRefreshToken, fleet_filter, request_fleet, scope_key
+from .roles import MANAGE_USERS, HasPermission, resolve_many
+from . import audit
+from . import kpis
+from . import singleflight
+from .search import vessel_index
+from django.utils.decorators import method_decorator
 from django.db.models import Q
+from . import metrics
 
 import time
 from django.core.cache import cache
+
 # -------------------------
 # HOME & AUTH
 # -------------------------
@@ -32,11 +47,28 @@ from django.core.cache import cache
 def home(request):
     return JsonResponse({"message": "Backend API is running"})
 
+
+def _vessel_position_lag():
+    latest = Vessel.objects.aggregate(latest=Max("last_update"))["latest"]
+    if latest is None:
+        return None
+    return (timezone.now() - latest).total_seconds()
+
+metrics.INGEST_LAG_SECONDS.set_function(_vessel_position_lag)
+
+
+def metrics_view(request):
+    """
+    Prometheus scrape endpoint for this worker's registry.
+    """
+    return HttpResponse(metrics.render_latest(), content_type=metrics.CONTENT_TYPE)
+
 class RegisterView(APIView):
     def post(self, request):
         serializer = RegisterSerializer(data=request.data)
         if serializer.is_valid():
-            serializer.save()
+            user = serializer.save()
+            audit.record(audit.REGISTER, actor=user, target=user)
             return Response({"message": "User registered successfully"}, status=201)
         return Response(serializer.errors, status=400)
 
@@ -45,16 +77,18 @@ class LoginView(APIView):
         serializer = LoginSerializer(data=request.data)
         if serializer.is_valid():
             user = serializer.validated_data["user"]
-            refresh = RefreshToken.for_user(user)
+            refresh = RoleRefreshToken.for_user(user)
             
             # Force update last login time
             update_last_login(None, user) 
+            audit.record(audit.LOGIN, actor=user)
             
             return Response({
                 "access": str(refresh.access_token),
                 "refresh": str(refresh),
                 "username": user.username,
-                "role": user.role
+                "role": user.role,
+                "fleet": user.fleet_operator
             })
         return Response(serializer.errors, status=400)
 
@@ -62,29 +96,177 @@ class LoginView(APIView):
 # OPERATIONAL DATA APIs
 # -------------------------
 
+def _export_format(request):
+    """?export=ndjson|csv switches a list view to a streamed download."""
+    fmt = request.GET.get("export")
+    if fmt and fmt not in EXPORT_FORMATS:
+        return None, Response({"error": f"Unsupported export format '{fmt}'"}, status=400)
+    return fmt, None
+
+def _bbox(request):
+    """?bbox=min_lon,min_lat,max_lon,max_lat (min_lon > max_lon crosses the antimeridian)."""
+    if not request.GET.get("bbox"):
+        return None
+    try:
+        bbox = tuple(float(part) for part in request.GET["bbox"].split(","))
+    except ValueError:
+        bbox = ()
+    if len(bbox) != 4 or bbox[1] > bbox[3]:
+        raise ValueError("bbox must be min_lon,min_lat,max_lon,max_lat")
+    return bbox
+
+def _in_bbox(bbox):
+    min_lon, min_lat, max_lon, max_lat = bbox
+    lon = Q(last_position_lon__gte=min_lon, last_position_lon__lte=max_lon) if min_lon <= max_lon \
+        else Q(last_position_lon__gte=min_lon) | Q(last_position_lon__lte=max_lon)
+    return lon & Q(last_position_lat__gte=min_lat, last_position_lat__lte=max_lat)
+
+@method_decorator(use_read_replica, name="get")
 class VesselListView(APIView):
+    permission_classes = [IsAuthenticated]
+
     def get(self, request):
-        vessels = Vessel.objects.all()
+        fmt, error = _export_format(request)
+        if error:
+            return error
+        try:
+            bbox = _bbox(request)
+        except ValueError as exc:
+            return Response({"error": str(exc)}, status=400)
+        visible = Vessel.objects.filter(fleet_filter(request.user))
+        if bbox:
+            visible = visible.filter(_in_bbox(bbox))
+        if fmt:
+            return stream_export(visible, VESSEL_COLUMNS, fmt, "vessels")
+
+        # Live positions come from the ingest's memory-mapped snapshot while it is fresh
+        fleet = request_fleet(request.user)
+        with fleet_snapshot.reader.current() as snapshot:
+            if fleet is NO_FLEET:
+                vessels = []
+            elif snapshot is not None:
+                vessels = snapshot.rows(fleet, bbox)
+            else:
+                vessels = vessel_rows(visible)
         return Response({
-            "count": vessels.count(),
-            "vessels": VesselSerializer(vessels, many=True).data
+            "count": len(vessels),
+            "vessels": vessels
         })
 
+# Cluster cells are 90 / 2**zoom degrees: about 64 px on 256 px map tiles
+MAX_CLUSTER_ZOOM = 20
+
+@method_decorator(use_read_replica, name="get")
+class VesselClusterView(APIView):
+    """
+    Vessel positions grouped for the map at ?zoom= (0-20, default 3), within
+    the optional ?bbox= of /vessels/. Reads the fleet snapshot like the list.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        try:
+            bbox = _bbox(request)
+        except ValueError as exc:
+            return Response({"error": str(exc)}, status=400)
+        zoom = request.GET.get("zoom", "3")
+        if not zoom.isdigit() or int(zoom) > MAX_CLUSTER_ZOOM:
+            return Response({"error": f"zoom must be an integer from 0 to {MAX_CLUSTER_ZOOM}"}, status=400)
+        zoom = int(zoom)
+        from . import geo  # numpy stays out of worker start-up (core/startup.py)
+
+        fleet = request_fleet(request.user)
+        with fleet_snapshot.reader.current() as snapshot:
+            if fleet is NO_FLEET:
+                lats = lons = ()
+            elif snapshot is not None:
+                lats, lons = snapshot.positions(fleet, bbox)
+            else:
+                visible = Vessel.objects.filter(fleet_filter(request.user))
+                if bbox:
+                    visible = visible.filter(_in_bbox(bbox))
+                points = list(visible.values_list('last_position_lat', 'last_position_lon'))
+                lats, lons = zip(*points) if points else ((), ())
+            clusters = geo.grid_clusters(lats, lons, 90 / 2 ** zoom)
+        return Response({
+            "zoom": zoom,
+            "count": sum(cluster["count"] for cluster in clusters),
+            "clusters": clusters
+        })
+
+def _kinematics_of(vessel):
+    """Derived speed/heading/ETA (core/kinematics.py), if computed yet."""
+    try:
+        return vessel.kinematics
+    except VesselKinematics.DoesNotExist:
+        return None
+
+@method_decorator(use_read_replica, name="get")
+class VesselDetailView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, vessel_id):
+        try:
+            vessels = Vessel.objects.filter(fleet_filter(request.user))
+            vessel = vessels.select_related("kinematics").get(id=vessel_id)
+        except Vessel.DoesNotExist:
+            return Response({"message": "Vessel not found"}, status=status.HTTP_404_NOT_FOUND)
+        data = VesselSerializer(vessel).data
+        kinematics = _kinematics_of(vessel)
+        data["kinematics"] = VesselKinematicsSerializer(kinematics).data if kinematics else None
+        return Response(data)
+
+@method_decorator(use_read_replica, name="get")
+class VesselSearchView(APIView):
+    """
+    Ranked search over name, MMSI, IMO and operator: /vessels/search/?q=maersk&limit=20
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        query = request.GET.get("q", "").strip()
+        try:
+            limit = max(1, min(int(request.GET.get("limit", 20)), 100))
+        except ValueError:
+            limit = 20
+
+        started = time.perf_counter()
+        vessel_index.ensure_fresh()
+        fleet = request_fleet(request.user)
+        results = vessel_index.search(query, limit=limit, operator=fleet) if query and fleet is not NO_FLEET else []
+        return Response({
+            "query": query,
+            "count": len(results),
+            "results": results,
+            "took_ms": round((time.perf_counter() - started) * 1000, 2),
+        })
+
+@method_decorator(use_read_replica, name="get")
+@method_decorator(versioned_by(Port), name="get")
 class PortListView(APIView):
     def get(self, request):
-        ports = Port.objects.all()
-        return Response(PortSerializer(ports, many=True).data)
+        return Response(port_rows(Port.objects.all()))
 
+@method_decorator(use_read_replica, name="get")
+@method_decorator(versioned_by(Voyage, scope=scope_key), name="get")
 class VoyageListView(APIView):
+    permission_classes = [IsAuthenticated]
+
     def get(self, request):
-        voyages = Voyage.objects.order_by("-departure_time")[:10]
+        voyages = Voyage.objects.filter(fleet_filter(request.user, "vessel__")).select_related(
+            "vessel", "port_from", "port_to").order_by("-departure_time")[:10]
         return Response(VoyageSerializer(voyages, many=True).data)
 
+@method_decorator(use_read_replica, name="get")
 class EventListView(APIView):
+    permission_classes = [IsAuthenticated]
+
     def get(self, request):
-        events = Event.objects.order_by("-timestamp")[:20]
-        return Response(EventSerializer(events, many=True).data)
+        events = Event.objects.filter(fleet_filter(request.user, "vessel__")).order_by("-timestamp")[:20]
+        return Response(event_rows(events))
 
+@method_decorator(use_read_replica, name="get")
+@method_decorator(versioned_by(RiskZone), name="get")
 class RiskZoneListView(APIView):
     def get(self, request):
         risks = RiskZone.objects.all()
@@ -94,152 +276,326 @@ class RiskZoneListView(APIView):
 # VOYAGE TRACK (REPLAY)
 # -------------------------
 
+@method_decorator(use_read_replica, name="get")
 class VoyageTrackView(APIView):
     """
     Returns AIS track points for a voyage (via vessel)
     """
+    permission_classes = [IsAuthenticated]
+
     def get(self, request, voyage_id):
         try:
-            voyage = Voyage.objects.get(id=voyage_id)
+            voyages = Voyage.objects.filter(fleet_filter(request.user, "vessel__"))
+            voyage = voyages.select_related("vessel").get(id=voyage_id)
         except Voyage.DoesNotExist:
             return Response({"message": "Voyage not found"}, status=status.HTTP_404_NOT_FOUND)
 
-        tracks = VoyageTrack.objects.filter(vessel=voyage.vessel).order_by("timestamp")
+        fmt, error = _export_format(request)
+        if error:
+            return error
 
-        if not tracks.exists():
+        vessel_name = voyage.vessel.name if voyage.vessel else None
+        if fmt:
+            return stream_export(
+                VoyageTrack.objects.filter(vessel=voyage.vessel), TRACK_COLUMNS, fmt,
+                f"voyage_{voyage_id}_track", order_by=("timestamp", "id"),
+                extra={"vessel_name": vessel_name},
+            )
+
+        tracks = track_rows(VoyageTrack.objects.filter(vessel=voyage.vessel).order_by("timestamp"), vessel_name)
+
+        if not tracks:
             return Response({"message": "No voyage track data found"}, status=status.HTTP_404_NOT_FOUND)
 
-        serializer = VoyageTrackSerializer(tracks, many=True)
-        return Response(serializer.data)
+        return Response(tracks)
 
 
+# -------------------------
+# COLUMNAR EXPORT (PARQUET / ARROW)
+# -------------------------
 
-# backend/core/views.py
+@method_decorator(use_read_replica, name="get")
+class ColumnarExportView(APIView):
+    """
+    vessels / voyages / tracks as a streamed Parquet (default) or Arrow IPC
+    file: ?export=parquet|arrow&since=...&until=... (ISO datetimes, on the
+    dataset's time column).
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, dataset):
+        if dataset not in columnar.DATASETS:
+            return Response({"error": f"Unknown dataset '{dataset}'"}, status=status.HTTP_404_NOT_FOUND)
+        fmt = request.GET.get("export", "parquet")
+        if fmt not in columnar.FORMATS:
+            return Response({"error": f"Unsupported export format '{fmt}'"}, status=400)
+        if not columnar.available():
+            return Response({"error": "Columnar export needs pyarrow installed"},
+                            status=status.HTTP_501_NOT_IMPLEMENTED)
+
+        bounds = {}
+        for param in ('since', 'until'):
+            if request.GET.get(param):
+                bounds[param] = parse_datetime(request.GET[param])
+                if bounds[param] is None:
+                    return Response({"error": f"Invalid '{param}' datetime"}, status=400)
+
+        queryset = columnar.export_queryset(dataset, request.user, **bounds)
+        # Resolve the database now: the body is produced after the replica routing has returned
+        queryset = queryset.using(queryset.db)
+        response = StreamingHttpResponse(columnar.export_chunks(dataset, queryset, fmt),
+                                         content_type=columnar.FORMATS[fmt])
+        response["Content-Disposition"] = f'attachment; filename="{dataset}.{fmt}"'
+        return response
 
-# backend/core/views.py
 
-from rest_framework.views import APIView
-from rest_framework.response import Response
-from .models import Vessel, RiskZone, Port, Voyage 
-import time
-from django.core.cache import cache
+# -------------------------
+# DASHBOARD
+# -------------------------
+
+def _recent_voyages(in_transit):
+    # The last 5 'In Transit' voyages for the dashboard table
+    recent_qs = in_transit.select_related('vessel__kinematics', 'port_from', 'port_to').order_by('-departure_time')[:5]
+
+    recent_data = []
+    for v in recent_qs:
+        kinematics = _kinematics_of(v.vessel) if v.vessel else None
+        recent_data.append({
+            "id": v.id,
+            "vessel_name": v.vessel.name if v.vessel else "Unknown",
+            "origin": v.port_from.name if v.port_from else "Sea",
+            "destination": v.port_to.name if v.port_to else "Sea",
+            "status": v.status,
+            "speed_knots": round(kinematics.speed_knots, 1) if kinematics else None,
+            "eta": kinematics.eta if kinematics else None
+        })
+    return recent_data
+
+
+def _requests_last_second():
+    last_second = int(time.time()) - 1
+    real_http_requests = cache.get(f"throughput_{last_second}")
+    metrics.record_cache_lookup("throughput", real_http_requests is not None)
+    return real_http_requests or 0
+
+
+def dashboard_queries(user):
+    """
+    The independent reads behind /dashboard/, by name. The sync view runs them
+    one after another, core/async_views.py concurrently.
+    """
+    in_transit = Voyage.objects.filter(fleet_filter(user, 'vessel__'), kpis.IN_TRANSIT)
+    return {
+        # Every counter on the page, all four tables, in one query (core/kpis.py)
+        "kpis": lambda: kpis.fetch(
+            vessels=(Vessel.objects.filter(fleet_filter(user)), kpis.vessel_counters()),
+            voyages=(in_transit, {"in_transit": kpis.rows()}),
+            ports=(Port.objects.all(), kpis.port_counters()),
+            risks=(RiskZone.objects.all(), kpis.risk_counters()),
+        ),
+        "requests_last_second": _requests_last_second,
+        "recent_voyages": lambda: _recent_voyages(in_transit),
+    }
+
+
+def dashboard_payload(results):
+    counters = results["kpis"]
+    total_vessels = counters["vessels"]["total"]
+    # Throughput: real requests in the last second plus simulated background processing
+    background_processing = int(total_vessels / 5) if total_vessels > 0 else 0
+    return {
+        "total_vessels": total_vessels,
+        "active_voyages": counters["voyages"]["in_transit"],
+        "active_risks": counters["risks"]["total"],
+        "high_congestion_ports": counters["ports"]["high_congestion"],
+        "throughput": results["requests_last_second"] + background_processing,
+        "recent_voyages": results["recent_voyages"], # 👈 Sending the list to frontend!
+        "system_status": "Operational"
+    }
+
+
+def run_queries(queries):
+    return {name: query() for name, query in queries.items()}
 
+
+@method_decorator(use_read_replica, name="get")
 class DashboardStatsView(APIView):
+    permission_classes = [IsAuthenticated]
+
     def get(self, request):
-        # 1. Basic Counts
-        total_vessels = Vessel.objects.count()
-        active_risks = RiskZone.objects.count()
-        active_voyages_count = Voyage.objects.filter(status='In Transit').count()
-        high_congestion = Port.objects.filter(congestion_score__gt=90).count()
-
-        # 2. Throughput Simulation
-        last_second = int(time.time()) - 1
-        real_http_requests = cache.get(f"throughput_{last_second}", 0)
-        background_processing = int(total_vessels / 5) if total_vessels > 0 else 0
-        total_throughput = real_http_requests + background_processing
-
-        # 3. NEW: Get Recent Voyages List for the Table
-        # We grab the last 5 'In Transit' voyages
-        recent_qs = Voyage.objects.filter(status='In Transit').select_related('vessel', 'port_from', 'port_to').order_by('-departure_time')[:5]
-        
-        recent_data = []
-        for v in recent_qs:
-            recent_data.append({
-                "id": v.id,
-                "vessel_name": v.vessel.name if v.vessel else "Unknown",
-                "origin": v.port_from.name if v.port_from else "Sea",
-                "destination": v.port_to.name if v.port_to else "Sea",
-                "status": v.status
-            })
+        # Every open dashboard polls this: identical concurrent requests share one computation
+        return Response(singleflight.do(f"dashboard:{scope_key(request)}", lambda: self.stats(request),
+                                        name="dashboard"))
 
-        return Response({
-            "total_vessels": total_vessels,
-            "active_voyages": active_voyages_count,
-            "active_risks": active_risks,
-            "high_congestion_ports": high_congestion,
-            "throughput": total_throughput,
-            "recent_voyages": recent_data, # 👈 Sending the list to frontend!
-            "system_status": "Operational"
-        })
+    def stats(self, request):
+        return dashboard_payload(run_queries(dashboard_queries(request.user)))
 # -------------------------
 # ANALYST ANALYTICS
 # -------------------------
 
-@api_view(['GET'])
-def get_analyst_analytics(request):
+def analytics_params(request):
+    """(days, vessel type) from the query string; 'region' is accepted but not applied yet."""
     days_param = request.GET.get('days', '7')
     vessel_type_param = request.GET.get('type', 'All Vessel Types')
-    region_param = request.GET.get('region', 'All Regions')
 
     days_match = re.search(r'\d+', days_param)
     days = int(days_match.group()) if days_match else 7
-    
+    return days, vessel_type_param
+
+
+def analytics_queries(user, days, vessel_type_param):
+    """
+    The independent reads behind /analytics/, by name (see dashboard_queries).
+    KPI totals come out of the breakdowns: ships from the cargo groups, voyages
+    in transit from the daily groups, the mean wait from a window over ports.
+    """
     start_date = timezone.now() - timedelta(days=days)
 
-    vessels = Vessel.objects.all()
-    voyages = Voyage.objects.filter(arrival_time__gte=start_date)
+    vessels = Vessel.objects.filter(fleet_filter(user))
+    voyages = Voyage.objects.filter(fleet_filter(user, 'vessel__'), arrival_time__gte=start_date)
 
     if vessel_type_param != 'All Vessel Types':
         vessels = vessels.filter(type=vessel_type_param)
         voyages = voyages.filter(vessel__type=vessel_type_param)
 
-    # Calculate KPIs
-    total_ships = vessels.count()
-    active_voyages = voyages.filter(status='In Transit').count()
-    
-    avg_wait = Port.objects.aggregate(Avg('avg_wait_time'))['avg_wait_time__avg']
-    avg_wait_time = round(avg_wait, 1) if avg_wait else 0
-    
-    ships_at_risk = int(total_ships * 0.05)
-
-    cargo_counts = vessels.values('cargo_type').annotate(count=Count('id'))
+    cargo_counts = vessels.values('cargo_type').annotate(count=kpis.vessel_counters()["total"])
 
     daily_traffic = voyages \
         .annotate(date=TruncDate('arrival_time')) \
         .values('date') \
-        .annotate(count=Count('id')) \
+        .annotate(count=Count('id'), **kpis.voyage_counters()) \
         .order_by('date')
 
-    congested_ports = Port.objects.order_by('-congestion_score')[:5].values(
-        'name', 'country', 'congestion_score', 'avg_wait_time'
+    congested_ports = Port.objects.annotate(
+        all_ports_avg_wait=Window(kpis.port_counters()["avg_wait"]),  # over every port, before the LIMIT
+    ).order_by('-congestion_score')[:5].values(
+        'name', 'country', 'congestion_score', 'avg_wait_time', 'all_ports_avg_wait'
     )
 
-    data = {
+    return {
+        "cargo_distribution": lambda: list(cargo_counts),
+        "daily_traffic": lambda: list(daily_traffic),
+        "congested_ports": lambda: list(congested_ports),
+    }
+
+
+def analytics_payload(results):
+    cargo_distribution = results["cargo_distribution"]
+    daily_traffic = results["daily_traffic"]
+    congested_ports = results["congested_ports"]
+
+    total_ships = sum(row["count"] for row in cargo_distribution)
+    avg_wait = congested_ports[0].pop("all_ports_avg_wait") if congested_ports else None
+    for port in congested_ports[1:]:
+        del port["all_ports_avg_wait"]
+    return {
         "kpis": {
             "total_ships": total_ships,
-            "active_voyages": active_voyages,
-            "avg_wait_time": avg_wait_time,
-            "ships_at_risk": ships_at_risk
+            "active_voyages": sum(day.pop("in_transit") for day in daily_traffic),
+            "avg_wait_time": round(avg_wait, 1) if avg_wait else 0,
+            "ships_at_risk": int(total_ships * 0.05)
         },
-        "cargo_distribution": list(cargo_counts),
-        "congested_ports": list(congested_ports),
-        "daily_traffic": list(daily_traffic)
+        "cargo_distribution": cargo_distribution,
+        "congested_ports": congested_ports,
+        "daily_traffic": daily_traffic
     }
-    return Response(data)
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+@use_read_replica
+def get_analyst_analytics(request):
+    days, vessel_type_param = analytics_params(request)
+    # Keyed on what the numbers depend on
+    key = f"analytics:{days}:{vessel_type_param}:{scope_key(request)}"
+    return Response(singleflight.do(
+        key, lambda: analytics_payload(run_queries(analytics_queries(request.user, days, vessel_type_param))),
+        name="analytics"))
 
 # -------------------------
 # ADMIN: USER MANAGEMENT
 # -------------------------
 
+USER_LIST_PARAMS = ('page', 'page_size', 'search', 'role', 'ordering')
+USER_ORDERINGS = {
+    'username': ('username', 'id'),
+    '-username': ('-username', '-id'),
+    'last_login': ('last_login', 'id'),
+    '-last_login': ('-last_login', '-id'),
+}
+# Role filter values as shown in the admin panel (see update_user_role)
+USER_ROLE_FILTERS = {
+    'Super Admin': Q(is_superuser=True),
+    'Analyst': Q(is_staff=True, is_superuser=False),
+    'Operator': Q(is_staff=False, is_superuser=False),
+}
+
 @api_view(['GET'])
+@permission_classes([HasPermission.of(MANAGE_USERS)])
 def get_all_users(request):
+    """
+    Without query parameters: every user, as before. With any of
+    page / page_size / search / role / ordering: one page plus pagination info.
+    """
     User = get_user_model()
-    users = User.objects.all().values(
-        'id', 'username', 'email', 'is_staff', 'is_superuser', 'is_active', 'last_login'
-    )
-    return Response(list(users))
+    users = User.objects.all()
+    paginated = any(param in request.GET for param in USER_LIST_PARAMS)
+
+    if paginated:
+        search = request.GET.get('search', '').strip()
+        if search:
+            # Prefix match, so the username / email indexes apply
+            users = users.filter(Q(username__istartswith=search) | Q(email__istartswith=search))
+        role = request.GET.get('role')
+        if role in USER_ROLE_FILTERS:
+            users = users.filter(USER_ROLE_FILTERS[role])
+        users = users.order_by(*USER_ORDERINGS.get(request.GET.get('ordering'), USER_ORDERINGS['-last_login']))
+        try:
+            page_size = max(1, min(int(request.GET.get('page_size', 25)), 200))
+        except ValueError:
+            page_size = 25
+        paginator = Paginator(users.values(
+            'id', 'username', 'email', 'is_staff', 'is_superuser', 'is_active', 'last_login'
+        ), page_size)
+        page_obj = paginator.get_page(request.GET.get('page', 1))
+        rows = list(page_obj)
+    else:
+        rows = list(users.values(
+            'id', 'username', 'email', 'is_staff', 'is_superuser', 'is_active', 'last_login'
+        ))
+
+    # Effective role per user from the resolver cache, misses loaded in one batch
+    access = resolve_many([user['id'] for user in rows])
+    for user in rows:
+        user['role'] = access[user['id']].role
+        user['permissions'] = sorted(access[user['id']].permissions)
+
+    if not paginated:
+        return Response(rows)
+    return Response({
+        "results": rows,
+        "pagination": {
+            "count": paginator.count,
+            "total_pages": paginator.num_pages,
+            "current_page": page_obj.number,
+            "page_size": page_size
+        }
+    })
 
 @api_view(['DELETE'])
+@permission_classes([HasPermission.of(MANAGE_USERS)])
 def delete_user(request, user_id):
     User = get_user_model()
     try:
         user = User.objects.get(id=user_id)
+        audit.record(audit.USER_DELETE, actor=request.user, target=user)
         user.delete()
         return Response({"message": "User deleted successfully"})
     except User.DoesNotExist:
         return Response({"error": "User not found"}, status=404)
 
 @api_view(['POST'])
+@permission_classes([HasPermission.of(MANAGE_USERS)])
 def toggle_user_status(request, user_id):
     User = get_user_model()
     try:
@@ -247,11 +603,13 @@ def toggle_user_status(request, user_id):
         user.is_active = not user.is_active
         user.save()
         status = "activated" if user.is_active else "deactivated"
+        audit.record(audit.STATUS_CHANGE, actor=request.user, target=user, details=status)
         return Response({"message": f"User {status}"})
     except User.DoesNotExist:
         return Response({"error": "User not found"}, status=404)
 
 @api_view(['POST'])
+@permission_classes([HasPermission.of(MANAGE_USERS)])
 def update_user_role(request, user_id):
     User = get_user_model()
     new_role = request.data.get("role")
@@ -272,38 +630,42 @@ def update_user_role(request, user_id):
             user.role = "Operator"
             
         user.save()
+        audit.record(audit.ROLE_CHANGE, actor=request.user, target=user, details=f"Role set to {new_role}")
         return Response({"message": f"Role updated to {new_role}"})
     except User.DoesNotExist:
         return Response({"error": "User not found"}, status=404)
 
 @api_view(['GET'])
+@permission_classes([HasPermission.of(MANAGE_USERS)])
 def get_audit_logs(request):
-    User = get_user_model()
-    logs = []
-
-    # Recent Logins
-    recent_logins = User.objects.filter(last_login__isnull=False).order_by('-last_login')[:5]
-    for user in recent_logins:
-        logs.append({
-            "id": f"login_{user.id}",
-            "time": user.last_login.strftime("%H:%M %p"),
-            "action": "User Logged In",
-            "user": user.username,
-            "type": "info"
-        })
-
-    # Recent Joins
-    recent_joins = User.objects.order_by('-date_joined')[:5]
-    for user in recent_joins:
-        logs.append({
-            "id": f"join_{user.id}",
-            "time": user.date_joined.strftime("%H:%M %p"),
-            "action": "New User Registered",
-            "user": user.username,
-            "type": "alert"
-        })
-
-    return Response(logs[:50])
+    """
+    Audit events, newest first: ?since=&until= (ISO datetimes), ?action=,
+    ?limit= and ?cursor= (next_cursor of the previous page).
+    """
+    try:
+        bounds = {}
+        for param in ('since', 'until'):
+            if request.GET.get(param):
+                bounds[param] = parse_datetime(request.GET[param])
+                if bounds[param] is None:
+                    raise ValueError(f"Invalid '{param}' datetime")
+        limit = int(request.GET.get('limit', 50))
+        events, next_cursor = audit.page(action=request.GET.get('action'), cursor=request.GET.get('cursor'),
+                                         limit=limit, **bounds)
+    except ValueError as exc:
+        return Response({"error": str(exc)}, status=400)
+
+    logs = [{
+        "id": event.id,
+        "time": timezone.localtime(event.timestamp).strftime("%H:%M %p"),
+        "timestamp": event.timestamp,
+        "action": audit.LABELS.get(event.action, event.action),
+        "user": event.actor_name or "system",
+        "target": event.target_name,
+        "details": event.details,
+        "type": "alert" if event.action == audit.REGISTER else "info"
+    } for event in events]
+    return Response({"results": logs, "next_cursor": next_cursor})
 
 # -------------------------
 # ALERT SYSTEM (Paginated & Linked to Notifications)
@@ -311,13 +673,16 @@ def get_audit_logs(request):
 
 
 @api_view(['GET'])
+@permission_classes([IsAuthenticated])
+@use_read_replica
 def get_alerts(request):
     # 1. Base Query
     query = request.GET.get('search', '')
     severity_filter = request.GET.get('severity', 'all')
     page_size = int(request.GET.get('page_size', 10)) # ✅ Support dynamic size
     
-    notifications = Notification.objects.all().order_by('-timestamp')
+    notifications = Notification.objects.filter(fleet_filter(request.user, 'vessel__')).select_related(
+        'vessel').order_by('-timestamp')
 
     # 2. Search & Filter
     if query:
@@ -329,18 +694,18 @@ def get_alerts(request):
         notifications = notifications.exclude(message__icontains='CRITICAL')
 
     # 3. Insights (Last 100 records)
-    recent_batch = notifications[:100]
+    recent_batch = notifications.values_list('message', flat=True)[:100]
     total_wait = 0
     wait_count = 0
     port_congestion = {}
     
-    for n in recent_batch:
-        wait_match = re.search(r'Wait time (\d+\.?\d*)h', n.message)
+    for message in recent_batch:
+        wait_match = re.search(r'Wait time (\d+\.?\d*)h', message)
         if wait_match:
             total_wait += float(wait_match.group(1))
             wait_count += 1
             
-        port_match = re.search(r'Port of (.*?) congestion', n.message)
+        port_match = re.search(r'Port of (.*?) congestion', message)
         if port_match:
             port = port_match.group(1)
             port_congestion[port] = port_congestion.get(port, 0) + 1
@@ -385,28 +750,10 @@ def get_alerts(request):
             "warning": notifications.exclude(message__icontains='CRITICAL').count(),
             "avg_wait": avg_wait,
             "worst_port": worst_port,
-            "total": notifications.count()
+            "total": paginator.count
         }
     })
 
-# ... keep update_alert_status and create_alert ...
-@api_view(['POST'])
-def update_alert_status(request, alert_id):
-    return Response({"message": "Status update simulated"})
-
-@api_view(['POST'])
-def create_alert(request):
-    return Response({"message": "Alert created"}, status=201)
-
-# ... (keep update_alert_status and create_alert functions below) ...
-@api_view(['POST'])
-def update_alert_status(request, alert_id):
-    return Response({"message": "Status update simulated"})
-
-@api_view(['POST'])
-def create_alert(request):
-    return Response({"message": "Alert created"}, status=201)
-
 @api_view(['POST'])
 def update_alert_status(request, alert_id):
     # Since we are using read-only Notifications, we return success 
@@ -416,4 +763,4 @@ def update_alert_status(request, alert_id):
 @api_view(['POST'])
 def create_alert(request):
     # Dummy endpoint to prevent URL errors
-    return Response({"message": "Alert created"}, status=201)
\ No newline at end of file
+    return Response({"message": "Alert created"}, status=201)
@@ -12,11 +12,30 @@ const getHeaders = () => {
   };
 };
 
+// ✅ Access tokens expire: on a 401, swap the refresh token for a new one and retry once
+export async function authFetch(url, options = {}) {
+  const res = await fetch(url, { ...options, headers: getHeaders() });
+  const refresh = localStorage.getItem("refresh_token");
+  if (res.status !== 401 || !refresh) return res;
+
+  const renewed = await fetch(`${API_BASE}/token/refresh/`, {
+    method: "POST",
+    headers: { "Content-Type": "application/json" },
+    body: JSON.stringify({ refresh })
+  });
+  if (!renewed.ok) {
+    localStorage.removeItem("access_token");
+    return fetch(url, { ...options, headers: getHeaders() });
+  }
+  localStorage.setItem("access_token", (await renewed.json()).access);
+  return fetch(url, { ...options, headers: getHeaders() });
+}
+
 // --- DATA FETCHING ---
 
 export async function fetchLiveVessels() {
   try {
-    const res = await fetch(`${API_BASE}/vessels/`, { headers: getHeaders() });
+    const res = await authFetch(`${API_BASE}/vessels/`);
     if (!res.ok) throw new Error("Failed to fetch vessels");
     return await res.json();
   } catch (err) {
@@ -27,7 +46,7 @@ export async function fetchLiveVessels() {
 
 export async function fetchRiskZones() {
   try {
-    const res = await fetch(`${API_BASE}/risks/`, { headers: getHeaders() });
+    const res = await authFetch(`${API_BASE}/risks/`);
     if (!res.ok) throw new Error("Failed to fetch risks");
     return await res.json();
   } catch (err) {
@@ -38,7 +57,7 @@ export async function fetchRiskZones() {
 
 export async function fetchDashboardStats() {
   try {
-    const res = await fetch(`${API_BASE}/dashboard/`, { headers: getHeaders() });
+    const res = await authFetch(`${API_BASE}/dashboard/`);
     if (!res.ok) throw new Error("Failed to fetch stats");
     return await res.json();
   } catch (err) {
@@ -47,25 +66,29 @@ export async function fetchDashboardStats() {
   }
 }
 
-export async function fetchUsers() {
+// ✅ Server-side paging: { page, page_size, search, role, ordering } -> { results, pagination }
+export async function fetchUsers(params = { page: 1 }) {
   try {
-    const res = await fetch(`${API_BASE}/users/`, { headers: getHeaders() });
+    const query = new URLSearchParams(params).toString();
+    const res = await authFetch(`${API_BASE}/users/?${query}`);
     if (!res.ok) throw new Error("Failed to fetch users");
     return await res.json();
   } catch (err) {
     console.error("API Error (Users):", err);
-    return [];
+    return { results: [], pagination: { count: 0, total_pages: 1 } };
   }
 }
 
-export async function fetchAuditLogs() {
+// ✅ Newest first; pass the previous page's next_cursor to load older events
+export async function fetchAuditLogs(cursor = null) {
   try {
-    const res = await fetch(`${API_BASE}/audit-logs/`, { headers: getHeaders() });
+    const query = cursor ? `?cursor=${encodeURIComponent(cursor)}` : "";
+    const res = await authFetch(`${API_BASE}/audit-logs/${query}`);
     if (!res.ok) throw new Error("Failed to fetch logs");
     return await res.json();
   } catch (err) {
     console.error("API Error (Logs):", err);
-    return [];
+    return { results: [], next_cursor: null };
   }
 }
 
@@ -82,23 +105,20 @@ export async function loginUser(credentials) {
 }
 
 export async function deleteUser(userId) {
-    await fetch(`${API_BASE}/users/${userId}/delete/`, {
-        method: "DELETE",
-        headers: getHeaders()
+    await authFetch(`${API_BASE}/users/${userId}/delete/`, {
+        method: "DELETE"
     });
 }
 
 export async function toggleUserStatus(userId) {
-    await fetch(`${API_BASE}/users/${userId}/status/`, {
-        method: "POST",
-        headers: getHeaders()
+    await authFetch(`${API_BASE}/users/${userId}/status/`, {
+        method: "POST"
     });
 }
 
 export async function updateUserRole(userId, newRole) {
-    await fetch(`${API_BASE}/users/${userId}/role/`, {
+    await authFetch(`${API_BASE}/users/${userId}/role/`, {
         method: "POST",
-        headers: getHeaders(),
         body: JSON.stringify({ role: newRole })
     });
 }
@@ -107,9 +127,8 @@ export async function updateUserRole(userId, newRole) {
 
 export async function broadcastAlert(alertData) {
     try {
-        const res = await fetch(`${API_BASE}/alerts/create/`, {
+        const res = await authFetch(`${API_BASE}/alerts/create/`, {
             method: "POST",
-            headers: getHeaders(),
             body: JSON.stringify(alertData)
         });
         if (!res.ok) throw new Error("Failed to broadcast alert");
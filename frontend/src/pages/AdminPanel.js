@@ -15,7 +15,9 @@ const AdminPanel = () => {
   const [throughput, setThroughput] = useState(0);
 
   const [realUsers, setRealUsers] = useState([]); 
+  const [totalPages, setTotalPages] = useState(1);
   const [auditLogs, setAuditLogs] = useState([]);
+  const [logCursor, setLogCursor] = useState(null);
   const [loadingUsers, setLoadingUsers] = useState(true);
   
   // --- UI STATE ---
@@ -61,9 +63,15 @@ const AdminPanel = () => {
   const refreshData = async () => {
       setLoadingUsers(true);
       try {
-        const userData = await fetchUsers();
-        if (Array.isArray(userData)) {
-          const formatted = userData.map(u => ({
+        // ✅ Only the visible page is fetched; search & role filter run on the server
+        const params = { page: currentPage, page_size: usersPerPage, ordering: sortConfig.direction === 'asc' ? 'last_login' : '-last_login' };
+        if (sortConfig.key === 'name') params.ordering = sortConfig.direction === 'asc' ? 'username' : '-username';
+        if (userSearch) params.search = userSearch;
+        if (roleFilter !== "All") params.role = roleFilter;
+        const userData = await fetchUsers(params);
+        if (Array.isArray(userData.results)) {
+          setTotalPages(userData.pagination.total_pages);
+          const formatted = userData.results.map(u => ({
             id: u.id,
             name: u.username,
             role: u.is_superuser ? "Super Admin" : (u.is_staff ? "Analyst" : "Operator"),
@@ -94,25 +102,40 @@ const AdminPanel = () => {
     };
     const loadLogs = async () => {
         const logs = await fetchAuditLogs();
-        if (Array.isArray(logs)) setAuditLogs(logs);
+        setAuditLogs(logs.results);
+        setLogCursor(logs.next_cursor);
     };
 
     loadStats();
-    refreshData();
     loadLogs();
 
-    // Poll for updates every 2 seconds
+    // Poll for updates every 5 seconds, while the tab is visible
     const interval = setInterval(() => {
+      if (document.hidden) return;
       loadStats(); // ✅ Refresh stats (throughput) constantly
       
       setServerLoad(prev => {
         const change = Math.floor(Math.random() * 10) - 4; 
         return Math.min(Math.max(prev + change, 5), 95); 
       });
-    }, 2000);
+    }, 5000);
     return () => clearInterval(interval);
   }, []);
 
+  // ✅ Re-query the server whenever the page, filters or sort change
+  useEffect(() => {
+    const timer = setTimeout(refreshData, userSearch ? 300 : 0); // debounce typing
+    return () => clearTimeout(timer);
+    // eslint-disable-next-line react-hooks/exhaustive-deps
+  }, [currentPage, userSearch, roleFilter, sortConfig]);
+
+  const loadOlderLogs = async () => {
+      if (!logCursor) return;
+      const logs = await fetchAuditLogs(logCursor);
+      setAuditLogs(prev => [...prev, ...logs.results]);
+      setLogCursor(logs.next_cursor);
+  };
+
   const getLoadColor = (load) => {
     if (load < 50) return '#10b981'; 
     if (load < 75) return '#f59e0b'; 
@@ -203,13 +226,10 @@ const AdminPanel = () => {
     setSortConfig({ key, direction });
   };
 
+  // Name / last-login order comes from the server; role & status sort within the page
   const sortedUsers = () => {
-    let filtered = realUsers.filter(u => {
-        const matchesSearch = u.name.toLowerCase().includes(userSearch.toLowerCase());
-        const matchesRole = roleFilter === "All" || u.role === roleFilter;
-        return matchesSearch && matchesRole;
-    });
-    return filtered.sort((a, b) => {
+    if (!['role', 'status'].includes(sortConfig.key)) return realUsers;
+    return [...realUsers].sort((a, b) => {
         let valA = sortConfig.key === 'lastLogin' ? a.rawLogin : a[sortConfig.key];
         let valB = sortConfig.key === 'lastLogin' ? b.rawLogin : b[sortConfig.key];
         if (valA < valB) return sortConfig.direction === 'asc' ? -1 : 1;
@@ -218,8 +238,7 @@ const AdminPanel = () => {
     });
   };
 
-  const currentUsers = sortedUsers().slice((currentPage - 1) * usersPerPage, currentPage * usersPerPage);
-  const totalPages = Math.ceil(sortedUsers().length / usersPerPage);
+  const currentUsers = sortedUsers();
 
   const getLogType = (action) => {
       if (action.includes("Log")) return "login";
@@ -403,6 +422,7 @@ const AdminPanel = () => {
                             <p>No audit events yet.</p>
                         </div>
                     )}
+                    {logCursor && <button className="tiny-btn outline" onClick={loadOlderLogs}>Load older</button>}
                 </div>
             </div>
         </div>
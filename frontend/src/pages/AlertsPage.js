@@ -1,6 +1,7 @@
 import React, { useState, useEffect, useCallback, useMemo } from "react";
 import { useNavigate } from "react-router-dom";
 import "./AlertsPage.css"; 
+import { authFetch } from "../api/api";
 
 // ✅ CHANGED: Point to Render Backend
 const API_BASE = "https://maritime-backend-0521.onrender.com/api"; 
@@ -91,7 +92,7 @@ const AlertsPage = () => {
   const loadAlerts = useCallback(async () => {
     setLoading(true);
     try {
-      const res = await fetch(`${API_BASE}/alerts/?page_size=100`);
+      const res = await authFetch(`${API_BASE}/alerts/?page_size=100`);
       const data = await res.json();
       setAlerts(data.results);
     } catch (err) { console.error("Load failed", err); }
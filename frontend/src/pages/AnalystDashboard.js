@@ -1,5 +1,6 @@
 import React, { useEffect, useState } from "react";
 import { useNavigate } from "react-router-dom"; 
+import { authFetch } from "../api/api";
 import { Line, Doughnut, Bar } from "react-chartjs-2";
 import {
   Chart as ChartJS,
@@ -83,16 +84,8 @@ export default function AnalystDashboard() {
     const BASE_URL = "https://maritime-backend-0521.onrender.com"; 
     const url = `${BASE_URL}/api/analytics/?days=${selectedDays}&type=${selectedType}&region=${selectedRegion}`;
     
-    // ✅ RETRIEVE TOKEN (Crucial Fix)
-    const token = localStorage.getItem("access_token");
-
-    fetch(url, {
-        headers: {
-            "Content-Type": "application/json",
-            // ✅ ADD AUTHORIZATION HEADER
-            "Authorization": token ? `Bearer ${token}` : ""
-        }
-    })
+    // ✅ Bearer token, refreshed on expiry
+    authFetch(url)
       .then(res => {
           if (!res.ok) throw new Error("Server error");
           return res.json();
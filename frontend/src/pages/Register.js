@@ -7,7 +7,6 @@ const Register = () => {
     email: "",
     password: "",
     confirmPassword: "",
-    role: "Operator", 
   });
 
   // ✅ 1. State for Messages & Loading
@@ -46,7 +45,6 @@ const Register = () => {
           username: formData.username,
           email: formData.email,
           password: formData.password,
-          role: formData.role, 
         }),
       });
 
@@ -54,7 +52,7 @@ const Register = () => {
 
       if (response.ok) {
         // ✅ Success: Show Green Box
-        setSuccess(`Registration Successful as ${formData.role}! Redirecting to login...`);
+        setSuccess("Registration Successful! An admin can grant you more access. Redirecting to login...");
         
         // Wait 2 seconds then redirect
         setTimeout(() => {
@@ -108,10 +106,6 @@ const Register = () => {
       width: "100%", padding: "12px", borderRadius: "6px", border: "1px solid #ddd",
       fontSize: "15px", boxSizing: "border-box", transition: "border 0.3s",
     },
-    select: {
-      width: "100%", padding: "12px", borderRadius: "6px", border: "1px solid #ddd",
-      backgroundColor: "#fff", fontSize: "15px", cursor: "pointer",
-    },
     button: {
       width: "100%", padding: "12px", backgroundColor: "#003366", color: "white",
       border: "none", borderRadius: "6px", cursor: "pointer", fontSize: "16px",
@@ -143,15 +137,6 @@ const Register = () => {
             <input type="email" name="email" placeholder="name@example.com" value={formData.email} onChange={handleChange} style={styles.input} required />
           </div>
 
-          <div style={styles.inputGroup}>
-            <label style={styles.label}>Select Role</label>
-            <select name="role" value={formData.role} onChange={handleChange} style={styles.select}>
-              <option value="Operator">Operator (Standard)</option>
-              <option value="Analyst">Analyst (Reports)</option>
-              <option value="Admin">Admin (Control Center)</option>
-            </select>
-          </div>
-
           <div style={styles.inputGroup}>
             <label style={styles.label}>Password</label>
             <input type="password" name="password" placeholder="••••••••" value={formData.password} onChange={handleChange} style={styles.input} required />
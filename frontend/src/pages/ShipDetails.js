@@ -1,6 +1,7 @@
 import React, { useEffect, useState } from "react";
 import { Link, useParams } from "react-router-dom";
 import Loader from "../components/Loader";
+import { authFetch } from "../api/api";
 
 export default function ShipDetails() {
   const { id } = useParams(); // Get ID from URL
@@ -9,7 +10,7 @@ export default function ShipDetails() {
 
   useEffect(() => {
     // Fetch individual vessel data
-    fetch(`http://127.0.0.1:8000/api/vessels/${id}/`) // Ensure your API supports detail view
+    authFetch(`http://127.0.0.1:8000/api/vessels/${id}/`) // Ensure your API supports detail view
       .then(res => {
          // Fallback: If API returns list, find the item (depends on your backend)
          // Assuming standard DRF ModelViewSet here:
@@ -3,12 +3,10 @@ import { MapContainer, TileLayer, Marker, Popup, Polyline, useMap, Tooltip } fro
 import L from "leaflet";
 import "leaflet/dist/leaflet.css";
 import "./VoyageReplay.css";
+import { authFetch } from "../api/api";
 
 // ✅ CHANGED: Point to Render Backend
 const API_BASE = "https://maritime-backend-0521.onrender.com/api";
-const getHeaders = () => ({
-  "Content-Type": "application/json",
-});
 
 // ... (Rest of the file logic remains exactly the same below) ...
 
@@ -58,7 +56,7 @@ export default function VoyageReplay() {
 
   // 1. Fetch Voyages
   useEffect(() => {
-    fetch(`${API_BASE}/voyages/`, { headers: getHeaders() })
+    authFetch(`${API_BASE}/voyages/`)
       .then(res => res.json())
       .then(data => {
         setVoyages(data);
@@ -76,7 +74,7 @@ export default function VoyageReplay() {
     setLoading(true);
     setError("");
     
-    fetch(`${API_BASE}/voyage-track/${selectedVoyageId}/`, { headers: getHeaders() })
+    authFetch(`${API_BASE}/voyage-track/${selectedVoyageId}/`)
       .then(res => {
           if (res.status === 404) throw new Error("No track history found.");
           if (!res.ok) throw new Error("Failed to load data.");